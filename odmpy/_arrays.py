@@ -0,0 +1,31 @@
+"""Private helpers shared by the NumPy-based bulk processing modules."""
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def datetime64(epoch):
+    """Convert epochs to a ``datetime64[us]`` array.
+
+    `epoch` may be a :py:class:`~datetime.datetime`, a sequence of them, or
+    anything NumPy already understands as a datetime64. Time zone aware
+    datetimes are converted to UTC, and naive datetimes are taken to be UTC.
+    """
+    epoch = np.asarray(epoch)
+    if epoch.dtype == object:
+        epoch = np.array([_naive_utc(e) if isinstance(e, datetime) else e
+                          for e in epoch.ravel()],
+                         dtype='datetime64[us]').reshape(epoch.shape)
+    return epoch.astype('datetime64[us]')
+
+
+def _naive_utc(epoch):
+    """Convert a time zone aware datetime to naive UTC."""
+    if epoch.tzinfo is None or epoch.utcoffset() is None:
+        return epoch.replace(tzinfo=None)
+    return epoch.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_datetime(epoch):
+    """Convert a ``datetime64`` scalar to :py:class:`~datetime.datetime`."""
+    return np.datetime64(epoch, 'us').astype(datetime)
@@ -0,0 +1,417 @@
+"""
+Module for a compact binary encoding of OPMs and OEM ephemeris segments.
+
+The encoding is meant for passing messages between programs, without
+formatting and parsing KVN text. Messages can be concatenated, and each
+starts with a header carrying the format version and a digest of the
+keywords of every section, so that messages written for another schema
+are rejected.
+
+Each section stores its float keywords as a little-endian float64 array,
+8-byte aligned, so :py:func:`numeric_sections` and :py:func:`loads_segment`
+map numeric data into NumPy arrays without copying it. Values are stored
+exactly, so an OPM read from KVN is written back unchanged after a round
+trip through this encoding.
+
+Recommended import syntax:
+import odmpy.binary as binary
+"""
+import struct
+from datetime import datetime, timedelta
+from enum import Enum
+from math import nan
+
+import odmpy.oem as oem
+from odmpy.opm import (
+    DataBlock, Opm, _DATA_BLOCKS, _SECTIONS, _schema_digest)
+
+__all__ = [
+    'FORMAT_VERSION',
+    'MAGIC',
+    'dump',
+    'dumps',
+    'dumps_segment',
+    'iter_loads',
+    'load',
+    'loads',
+    'loads_segment',
+    'numeric_sections',
+]
+
+MAGIC = b'ODMB'
+FORMAT_VERSION = 1
+
+# Message kinds.
+_OPM = 0
+_OEM_SEGMENT = 1
+
+# Sections of each kind of message, in the order of their identifiers.
+_KIND_SECTIONS = {
+    _OPM: list(_SECTIONS.items()),
+    _OEM_SEGMENT: [('metadata', oem.Metadata)],
+}
+
+_SCHEMAS = {kind: _schema_digest(sections)
+            for kind, sections in _KIND_SECTIONS.items()}
+
+# Magic, format version, kind, schema digest, message length and number of
+# sections.
+_HEADER = struct.Struct('<4sHH8sII')
+
+# Section identifier, 1 if the block has a name, padding, section length
+# and bit mask of the keywords which are set.
+_SECTION = struct.Struct('<BBHIQ')
+
+_LENGTH = struct.Struct('<I')
+_COUNT = struct.Struct('<Q')
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class _SectionCodec:
+
+    """Encode and decode the keyword values of a section.
+
+    Float keywords are stored first, as float64, then datetime keywords as
+    int64 microseconds since 1970 and int keywords as int64, then strings
+    and enumeration values as length-prefixed UTF-8.
+    """
+
+    def __init__(self, container):
+        self.container = container
+        schema = container.schema
+        self.floats = [field.index for field in schema if field.type is float]
+        self.integers = [field for field in schema
+                         if field.type in (int, datetime)]
+        self.strings = [field for field in schema
+                        if field.type not in (float, int, datetime)]
+        self.float_struct = struct.Struct('<{}d'.format(len(self.floats)))
+        self.integer_struct = struct.Struct('<{}q'.format(len(self.integers)))
+
+    def pack(self, values, name):
+        """Return (bit mask, body) for the values of a block and its name."""
+        presence = 0
+        for index, value in enumerate(values):
+            if value is not None:
+                presence |= 1 << index
+
+        parts = [self.float_struct.pack(*[
+            nan if values[index] is None else values[index]
+            for index in self.floats])]
+        integers = []
+        for field in self.integers:
+            value = values[field.index]
+            if value is None:
+                value = 0
+            elif field.type is datetime:
+                value = (value.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+            integers.append(value)
+        parts.append(self.integer_struct.pack(*integers))
+
+        if name is not None:
+            parts.append(_pack_string(name))
+        for field in self.strings:
+            value = values[field.index]
+            if value is not None:
+                if isinstance(value, Enum):
+                    value = value.value
+                parts.append(_pack_string(value))
+        return presence, b''.join(parts)
+
+    def unpack(self, data, offset, presence, has_name):
+        """Return a block decoded from data[offset:], with its name."""
+        values = [None] * len(self.container.schema)
+        for index, value in zip(self.floats,
+                                self.float_struct.unpack_from(data, offset)):
+            if presence >> index & 1:
+                values[index] = value
+        offset += self.float_struct.size
+
+        for field, value in zip(
+                self.integers, self.integer_struct.unpack_from(data, offset)):
+            if presence >> field.index & 1:
+                if field.type is datetime:
+                    value = _EPOCH + value * _MICROSECOND
+                values[field.index] = value
+        offset += self.integer_struct.size
+
+        name = None
+        if has_name:
+            name, offset = _unpack_string(data, offset)
+        for field in self.strings:
+            if presence >> field.index & 1:
+                value, offset = _unpack_string(data, offset)
+                values[field.index] = (value if field.type is str
+                                       else field.type(value))
+
+        block = self.container.__new__(self.container)
+        block._values = values
+        if isinstance(block, DataBlock):
+            block.name = name
+        return block
+
+
+_CODECS = {container: _SectionCodec(container)
+           for sections in _KIND_SECTIONS.values()
+           for _, container in sections if container is not dict}
+
+
+def _pack_string(text):
+    encoded = text.encode('utf-8')
+    return _LENGTH.pack(len(encoded)) + encoded
+
+
+def _unpack_string(data, offset):
+    length, = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    end = offset + length
+    return bytes(data[offset:end]).decode('utf-8'), end
+
+
+def _pad(body):
+    """Pad `body` to a multiple of 8 bytes, to align the next section."""
+    return body + b'\0' * (-len(body) % 8)
+
+
+def _pack_section(kind, section, block):
+    """Encode a section, with its header."""
+    identifier = [name for name, _ in _KIND_SECTIONS[kind]].index(section)
+    if section == 'user_defined':
+        presence = 0
+        body = _COUNT.pack(len(block)) + b''.join(
+            _pack_string(str(key)) + _pack_string(str(value))
+            for key, value in block.items())
+        has_name = False
+    else:
+        name = block.name if isinstance(block, DataBlock) else None
+        has_name = name is not None
+        presence, body = _CODECS[type(block)].pack(block._values, name)
+    body = _pad(body)
+    return _SECTION.pack(identifier, has_name, 0, _SECTION.size + len(body),
+                         presence) + body
+
+
+def _pack_message(kind, sections, extra=b''):
+    body = b''.join(sections) + extra
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, kind, _SCHEMAS[kind],
+                        _HEADER.size + len(body), len(sections)) + body
+
+
+def _unpack_header(data, offset, kind):
+    """Check the header of the message at `offset`.
+
+    :return: (message length, number of sections).
+    """
+    magic, version, found_kind, schema, length, count = _HEADER.unpack_from(
+        data, offset)
+    if magic != MAGIC:
+        raise ValueError('not an odmpy binary message.')
+    if version != FORMAT_VERSION:
+        raise ValueError('unsupported format version {}.'.format(version))
+    if found_kind != kind:
+        raise ValueError('unexpected message kind {}.'.format(found_kind))
+    if schema != _SCHEMAS[kind]:
+        raise ValueError('message written for a different keyword schema.')
+    return length, count
+
+
+def _sections(data, offset, kind, count):
+    """Yield (section, container, body offset, presence, has name, end) for
+    each section, starting at `offset`."""
+    sections = _KIND_SECTIONS[kind]
+    for _ in range(count):
+        identifier, has_name, _, length, presence = _SECTION.unpack_from(
+            data, offset)
+        section, container = sections[identifier]
+        yield (section, container, offset + _SECTION.size, presence,
+               has_name, offset + length)
+        offset += length
+
+
+def _unpack_sections(data, offset, kind, count):
+    """Decode sections into a dictionary, as for
+    :py:meth:`odmpy.opm.Opm.from_dict`.
+
+    :return: (sections, offset after the last section).
+    """
+    sections = {}
+    for section, container, body, presence, has_name, offset in _sections(
+            data, offset, kind, count):
+        if section == 'user_defined':
+            items, = _COUNT.unpack_from(data, body)
+            body += _COUNT.size
+            value = {}
+            for _ in range(items):
+                key, body = _unpack_string(data, body)
+                value[key], body = _unpack_string(data, body)
+            sections[section] = value
+        elif section == 'maneuver_parameters':
+            sections.setdefault(section, []).append(
+                _CODECS[container].unpack(data, body, presence, has_name))
+        else:
+            sections[section] = _CODECS[container].unpack(
+                data, body, presence, has_name)
+    return sections, offset
+
+
+def dumps(opm):
+    """Encode an OPM.
+
+    :param opm: Instance of :py:class:`odmpy.opm.Opm`.
+    :return: bytes
+    :raises TypeError: if a keyword value does not have the keyword's type.
+    """
+    sections = [_pack_section(_OPM, 'header', opm.header),
+                _pack_section(_OPM, 'metadata', opm.metadata)]
+    for section in _DATA_BLOCKS:
+        blocks = getattr(opm.data, section).block
+        if blocks is None:
+            continue
+        if isinstance(blocks, DataBlock):
+            blocks = [blocks]
+        for block in blocks:
+            sections.append(_pack_section(_OPM, section, block))
+    if opm.user_defined is not None:
+        sections.append(_pack_section(_OPM, 'user_defined', opm.user_defined))
+    return _pack_message(_OPM, sections)
+
+
+def loads(data, offset=0, validate=True):
+    """Decode an OPM encoded by :py:func:`dumps`.
+
+    :param data: bytes-like object, e.g. bytes or a :py:class:`mmap.mmap`.
+    :param int offset: Offset of the message in `data`.
+    :param bool validate: Validate the keywords and blocks, as for
+        :py:class:`odmpy.opm.Opm`. Messages from trusted writers need not
+        be validated.
+    :return: Instance of :py:class:`odmpy.opm.Opm`.
+    :raises ValueError: if `data` is not an OPM in this format and schema.
+    """
+    _, count = _unpack_header(data, offset, _OPM)
+    sections, _ = _unpack_sections(data, offset + _HEADER.size, _OPM, count)
+    if validate:
+        for section, value in sections.items():
+            if section == 'maneuver_parameters':
+                for block in value:
+                    block.validate_keywords()
+            elif section != 'user_defined':
+                value.validate_keywords()
+    opm = Opm._from_sections(sections)
+    if validate:
+        opm.data.validate_blocks()
+    return opm
+
+
+def iter_loads(data, validate=True):
+    """Decode each of a sequence of concatenated OPMs.
+
+    :return: Iterator of :py:class:`odmpy.opm.Opm`.
+
+    See :py:func:`loads`.
+    """
+    offset = 0
+    while offset < len(data):
+        yield loads(data, offset, validate=validate)
+        length, _ = _unpack_header(data, offset, _OPM)
+        offset += length
+
+
+def dump(opm, fp):
+    """Write an encoded OPM to `fp` (a ``.write()``-supporting binary
+    :py:term:`file-like object`)."""
+    fp.write(dumps(opm))
+
+
+def load(fp, validate=True):
+    """Read an encoded OPM from `fp` (a ``.read()``-supporting binary
+    :py:term:`file-like object`).
+
+    See :py:func:`loads`.
+    """
+    return loads(fp.read(), validate=validate)
+
+
+def numeric_sections(data, offset=0):
+    """Map the float keywords of each section of an encoded OPM into NumPy
+    arrays, without copying.
+
+    Requires numpy (pip install odmpy[numpy])
+
+    :param data: bytes-like object, e.g. bytes or a :py:class:`mmap.mmap`.
+    :param int offset: Offset of the message in `data`.
+    :return: list of (section, names, values) tuples for the sections with
+        float keywords, in message order, where names lists the attribute
+        names of the float keywords, and values is a float64 array with NaN
+        for keywords which are not set.
+        For example, the values of 'covariance_matrix' are in the order of
+        :py:meth:`odmpy.opm.DataBlockCovarianceMatrix.to_packed`.
+    """
+    import numpy as np
+
+    _, count = _unpack_header(data, offset, _OPM)
+    arrays = []
+    for section, container, body, _, _, _ in _sections(
+            data, offset + _HEADER.size, _OPM, count):
+        if section == 'user_defined':
+            continue
+        codec = _CODECS[container]
+        if not codec.floats:
+            continue
+        names = [container.schema[index].name for index in codec.floats]
+        arrays.append((section, names, np.frombuffer(
+            data, dtype='<f8', count=len(names), offset=body)))
+    return arrays
+
+
+def dumps_segment(metadata, epochs, states):
+    """Encode an OEM ephemeris segment.
+
+    Requires numpy (pip install odmpy[numpy])
+
+    :param metadata: Instance of :py:class:`odmpy.oem.Metadata`.
+    :param epochs: Sequence of :py:class:`~datetime.datetime`-like objects,
+        or a ``numpy.datetime64`` array.
+    :param states: (T, 6) array of (X, Y, Z, X_DOT, Y_DOT, Z_DOT) rows in
+        km and km/s.
+    :return: bytes
+    """
+    import numpy as np
+    from odmpy._arrays import datetime64
+
+    epochs = datetime64(epochs).astype('<M8[us]', copy=False)
+    states = np.ascontiguousarray(states, dtype='<f8')
+    if states.shape != (len(epochs), 6):
+        raise ValueError('states must have shape (T, 6), for T epochs.')
+    section = _pack_section(_OEM_SEGMENT, 'metadata', metadata)
+    return _pack_message(
+        _OEM_SEGMENT, [section],
+        _COUNT.pack(len(epochs)) + epochs.tobytes() + states.tobytes())
+
+
+def loads_segment(data, offset=0):
+    """Decode an OEM ephemeris segment encoded by :py:func:`dumps_segment`.
+
+    The epochs and states are mapped into NumPy arrays, without copying.
+
+    Requires numpy (pip install odmpy[numpy])
+
+    :param data: bytes-like object, e.g. bytes or a :py:class:`mmap.mmap`.
+    :param int offset: Offset of the message in `data`.
+    :return: (metadata, epochs, states), where epochs is a
+        ``datetime64[us]`` array of shape (T,) and states a float64 array of
+        shape (T, 6).
+    :raises ValueError: if `data` is not an OEM segment in this format and
+        schema.
+    """
+    import numpy as np
+
+    _, count = _unpack_header(data, offset, _OEM_SEGMENT)
+    sections, offset = _unpack_sections(
+        data, offset + _HEADER.size, _OEM_SEGMENT, count)
+    n, = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    epochs = np.frombuffer(data, dtype='<M8[us]', count=n, offset=offset)
+    states = np.frombuffer(data, dtype='<f8', count=6 * n,
+                           offset=offset + 8 * n).reshape(n, 6)
+    return sections['metadata'], epochs, states
@@ -0,0 +1,324 @@
+"""
+Module for caching parsed OPM files.
+
+:py:class:`DiskCache` keeps the OPMs parsed from each file in a directory,
+so that files which are read again, by this process or another, are not
+parsed again until they change.
+
+:py:class:`MessageCache` keeps parsed messages in memory, bounded by their
+estimated size, for services which are asked for the same messages often.
+
+Recommended import syntax:
+import odmpy.cache as cache
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from enum import Enum
+from functools import partial
+from types import FunctionType, MethodType, ModuleType
+
+import odmpy.binary as binary
+import odmpy.kvn as kvn
+from odmpy.opm import _SECTIONS, _schema_digest
+
+__all__ = [
+    'CacheStats',
+    'DiskCache',
+    'MessageCache',
+    'estimate_size',
+]
+
+# Size of the start of each file which is hashed to detect changes that
+# keep its size and modification time.
+_PREFIX_SIZE = 64 * 1024
+
+_SUFFIX = '.opmcache'
+
+# Entries written for other keywords are not used.
+_VERSION = _schema_digest(sorted(_SECTIONS.items())).hex()
+
+
+class DiskCache:
+
+    """On-disk cache of parsed OPM files.
+
+    The OPMs in each file are stored in the :py:mod:`odmpy.binary`
+    encoding, after a line of JSON identifying the file, keyed on the
+    file's path. An entry is only used if the file's size, modification
+    time and the digest of its first 64 KiB are unchanged, and it was
+    written for the same OPM keywords. Otherwise, the file is parsed again
+    and the entry replaced. Neither format can run code when it is read, so
+    a damaged or tampered entry is at worst treated as a miss.
+
+    The total size of the entries is bounded by evicting the least recently
+    used entries, using the modification time of each entry as the time of
+    its last use.
+
+    :param str directory: Cache directory, created if it does not exist.
+    :param int max_size: Maximum total size of the entries [bytes].
+    """
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Estimated total size of the entries, which other processes may
+        # change. None until the directory is first scanned.
+        self._size = None
+
+    def load(self, path):
+        """Return the OPMs in the file at `path`, from the cache if the file
+        is unchanged.
+
+        :param str path: OPM file path.
+        :return: list of :py:class:`~odmpy.opm.Opm`, in file order.
+
+        Exceptions are as for :py:func:`odmpy.kvn.loads`.
+        """
+        path = os.path.abspath(path)
+        entry = os.path.join(
+            self.directory,
+            hashlib.sha256(path.encode('utf-8')).hexdigest()[:32] + _SUFFIX)
+
+        with open(path, 'rb') as fp:
+            stat = os.fstat(fp.fileno())
+            prefix = fp.read(_PREFIX_SIZE)
+            identity = [_VERSION, path, stat.st_size, stat.st_mtime_ns,
+                        hashlib.sha256(prefix).hexdigest()]
+            try:
+                with open(entry, 'rb') as cached:
+                    if json.loads(cached.readline()) == identity:
+                        opms = list(binary.iter_loads(cached.read(),
+                                                      validate=False))
+                    else:
+                        opms = None
+            except (OSError, ValueError, IndexError, struct.error):
+                opms = None
+            if opms is not None:
+                self.hits += 1
+                os.utime(entry)
+                return opms
+
+            self.misses += 1
+            data = prefix + fp.read()
+
+        opms = [kvn.loads(data[offset:offset + length].decode('utf-8'))
+                for offset, length in kvn.split_messages(data)]
+        self._store(entry, identity, opms)
+        return opms
+
+    def _store(self, entry, identity, opms):
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(json.dumps(identity).encode('utf-8') + b'\n')
+                for opm in opms:
+                    binary.dump(opm, fp)
+                size = fp.tell()
+            try:
+                size -= os.path.getsize(entry)
+            except OSError:
+                pass
+            os.replace(temporary, entry)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        # The directory is only scanned when the estimate is exceeded, so
+        # that storing an entry does not list every entry.
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_size:
+            self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until the total size is
+        at most `max_size`."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for dir_entry in it:
+                if dir_entry.name.endswith(_SUFFIX):
+                    stat = dir_entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size,
+                                    dir_entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+        """Remove every entry."""
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                os.remove(os.path.join(self.directory, name))
+        self._size = 0
+
+
+# Objects shared between messages, which are not counted in their size.
+_SHARED_TYPES = (type(None), bool, type, Enum, FunctionType, MethodType,
+                 ModuleType)
+
+# Objects which do not refer to other objects.
+_ATOMIC_TYPES = {int, float, complex, str, bytes, date, datetime}
+
+
+def estimate_size(obj):
+    """Estimate the memory used by `obj` and the objects it refers to, e.g.
+    an :py:class:`~odmpy.opm.Opm`.
+
+    Each object is counted once, with :py:func:`sys.getsizeof`. Classes,
+    enumeration members, functions and singletons such as None are shared,
+    so they are not counted.
+
+    :return: Size [bytes].
+    """
+    size = 0
+    # Visited objects, kept alive so that their ids are not reused.
+    seen = {}
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen[id(item)] = item
+        if type(item) in _ATOMIC_TYPES:
+            size += sys.getsizeof(item)
+            continue
+        if isinstance(item, _SHARED_TYPES):
+            continue
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, partial):
+            stack.extend((item.args, item.keywords))
+        if hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+        for name in getattr(type(item), '__slots__', ()):
+            if hasattr(item, name):
+                stack.append(getattr(item, name))
+    return size
+
+
+CacheStats = namedtuple('CacheStats', 'hits misses evictions count size')
+CacheStats.__doc__ = """Statistics of a :py:class:`MessageCache`.
+
+:param int hits: Number of lookups which found an entry.
+:param int misses: Number of lookups which did not find an entry.
+:param int evictions: Number of entries evicted to make space.
+:param int count: Number of entries.
+:param int size: Estimated total size of the entries [bytes].
+"""
+
+
+class MessageCache:
+
+    """In-memory least recently used cache of parsed messages, bounded by
+    their estimated size instead of the number of entries.
+
+    The cache can be shared by threads. Keys are chosen by the caller, e.g.
+    file paths or OBJECT_IDs.
+
+    :param int max_size: Maximum total size of the entries [bytes].
+    :param sizeof: Function estimating the size of a value [bytes].
+        Defaults to :py:func:`estimate_size`.
+    """
+
+    def __init__(self, max_size=64 * 1024 * 1024, sizeof=estimate_size):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return the value for `key`, or `default` if it is not cached."""
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache `value` for `key`, evicting the least recently used entries
+        if the cache is full.
+
+        Values larger than `max_size` are not cached.
+        """
+        size = self.sizeof(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            if size > self.max_size:
+                return
+            self._entries[key] = value, size
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+    def fetch(self, key, load):
+        """Return the value for `key`, calling `load` with no arguments and
+        caching its result if it is not cached.
+
+        `load` is called without holding the lock, so threads missing the
+        same key at the same time may each call it.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = load()
+            self.put(key, value)
+        return value
+
+    def remove(self, key):
+        """Remove the entry for `key`, if there is one."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[1]
+
+    def clear(self):
+        """Remove every entry. Statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def stats(self):
+        """:py:class:`CacheStats` of the cache."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions,
+                              len(self._entries), self._size)
@@ -0,0 +1,510 @@
+"""
+Module for keeping a directory of OPM files up to date with a catalog.
+
+Each OPM is written to its own file, named by OBJECT_ID. A manifest of
+canonical digests (see :py:meth:`odmpy.opm.Opm.digest`) records what each
+file contains, so that only new or changed OPMs are written on each run.
+
+Files are written in batches, which are staged and synced to disk before
+being renamed into place. Large catalogs can be spread over subdirectories
+with a sharded layout, such as :py:class:`HashLayout`.
+
+An archive of OPM files can be indexed in an SQLite database with
+:py:class:`Index`, to find messages without reading every file.
+
+Recommended import syntax:
+import odmpy.catalog as catalog
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from collections import namedtuple
+
+import odmpy.kvn as kvn
+from odmpy.opm import MissingKeywordError, format_date, validate_object_id
+
+__all__ = [
+    'BatchWriter',
+    'FlatLayout',
+    'HashLayout',
+    'Index',
+    'IndexEntry',
+    'LaunchYearLayout',
+    'MANIFEST',
+    'locate',
+    'read_manifest',
+    'regenerate',
+]
+
+# Default manifest file name, in the output directory.
+MANIFEST = 'manifest.json'
+
+
+def read_manifest(path):
+    """Read a manifest of OBJECT_ID to digest.
+
+    :param str path: Manifest file path.
+    :return: dict, empty if the file does not exist.
+    """
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {}
+
+
+class FlatLayout:
+
+    """Layout with every file in the output directory.
+
+    A layout is called with an OBJECT_ID and returns the file's path,
+    relative to the output directory.
+
+    :param str filename: Format string for file names, given `object_id`.
+    """
+
+    def __init__(self, filename='{object_id}.opm'):
+        self.filename = filename
+
+    def __call__(self, object_id):
+        return self.filename.format(object_id=object_id)
+
+
+class HashLayout(FlatLayout):
+
+    """Layout fanning files out into subdirectories named by a hash of
+    OBJECT_ID, e.g. ``3f/2010-026A.opm``.
+
+    :param int levels: Number of nested subdirectories.
+    :param int width: Number of hex digits in each subdirectory name, so
+        that each level has up to 16 ** `width` subdirectories.
+    :param str filename: Format string for file names, given `object_id`.
+    """
+
+    def __init__(self, levels=1, width=2, filename='{object_id}.opm'):
+        super().__init__(filename)
+        self.levels = levels
+        self.width = width
+
+    def __call__(self, object_id):
+        digest = hashlib.sha1(object_id.encode('utf-8')).hexdigest()
+        width = self.width
+        shards = [digest[i * width:(i + 1) * width]
+                  for i in range(self.levels)]
+        return os.path.join(*shards, super().__call__(object_id))
+
+
+class LaunchYearLayout(FlatLayout):
+
+    """Layout with subdirectories named by the launch year prefix of the
+    International Designator, e.g. ``2010/2010-026A.opm``.
+
+    OBJECT_IDs in another format are put in the subdirectory `other`.
+
+    :param str other: Subdirectory name for other OBJECT_IDs.
+    :param str filename: Format string for file names, given `object_id`.
+    """
+
+    def __init__(self, other='other', filename='{object_id}.opm'):
+        super().__init__(filename)
+        self.other = other
+
+    def __call__(self, object_id):
+        year = object_id[:4] if validate_object_id(object_id) else self.other
+        return os.path.join(year, super().__call__(object_id))
+
+
+def locate(directory, object_id, layout=FlatLayout()):
+    """Return the path of an object's file, without listing directories.
+
+    :param str directory: Output directory.
+    :param str object_id: OBJECT_ID.
+    :param layout: Layout the directory was written with.
+    """
+    return os.path.join(directory, layout(object_id))
+
+
+class BatchWriter:
+
+    """Write a batch of files so that they appear all at once.
+
+    Files are staged in a temporary directory inside `directory` and
+    synced to disk in groups, which bounds the number of open files while
+    letting the file system write back a whole group before it is synced.
+    On :py:meth:`commit`, they are renamed into place, in the order they
+    were added, and `directory` and its subdirectories are each synced
+    once. Consumers never see a partially written file.
+
+    Use as a context manager to commit on success, or discard the staged
+    files if an exception is raised::
+
+        with BatchWriter(directory) as batch:
+            for opm in opms:
+                batch.add(opm.metadata.object_id.value + '.opm', opm.write)
+
+    :param str directory: Existing output directory.
+    :param int group_size: Number of files to sync together.
+    """
+
+    def __init__(self, directory, group_size=256):
+        self.directory = directory
+        self.group_size = group_size
+        self._staging = tempfile.mkdtemp(prefix='.staging-', dir=directory)
+        self._staged = []
+        self._group = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def __len__(self):
+        return len(self._staged)
+
+    def add(self, name, write):
+        """Stage a file.
+
+        :param str name: File name, relative to `directory`. Missing
+            subdirectories are created on commit.
+        :param write: Function writing the contents to a text file object,
+            such as :py:meth:`odmpy.opm.Opm.write`.
+        """
+        staged = os.path.join(self._staging, str(len(self._staged)))
+        fp = open(staged, 'w')
+        self._group.append(fp)
+        self._staged.append((staged, os.path.join(self.directory, name)))
+        write(fp)
+        if len(self._group) >= self.group_size:
+            self._sync_group()
+
+    def _sync_group(self):
+        for fp in self._group:
+            fp.flush()
+            os.fsync(fp.fileno())
+            fp.close()
+        self._group = []
+
+    def commit(self):
+        """Sync any remaining files, rename every staged file into place,
+        and sync the directories they were renamed into.
+
+        :return: list of file paths written.
+        """
+        self._sync_group()
+        directories = {self.directory}
+        for staged, path in self._staged:
+            parent = os.path.dirname(path)
+            if parent not in directories:
+                os.makedirs(parent, exist_ok=True)
+                while parent not in directories:
+                    directories.add(parent)
+                    parent = os.path.dirname(parent)
+            os.replace(staged, path)
+        # Sync subdirectories before the parents that may link to them.
+        for directory in sorted(directories, key=len, reverse=True):
+            _fsync_directory(directory)
+        os.rmdir(self._staging)
+        paths = [path for _, path in self._staged]
+        self._staged = []
+        return paths
+
+    def abort(self):
+        """Discard the staged files."""
+        for fp in self._group:
+            fp.close()
+        self._group = []
+        self._staged = []
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+
+def _fsync_directory(directory):
+    """Sync directory entries, where the platform supports it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def regenerate(opms, directory, layout=FlatLayout(), manifest=MANIFEST):
+    """Write the OPMs whose content changed since the last run.
+
+    Each OPM's canonical digest is compared with the manifest in memory,
+    and files are only written for new or changed OPMs, or if they are
+    missing. Files and the manifest are written in one
+    :py:class:`BatchWriter` batch, so nothing is replaced if an OPM fails
+    validation.
+
+    :param opms: Iterable of :py:class:`~odmpy.opm.Opm` objects with unique
+        OBJECT_ID.
+    :param str directory: Existing output directory.
+    :param layout: :py:class:`FlatLayout`, :py:class:`HashLayout`,
+        :py:class:`LaunchYearLayout`, or other function returning the path
+        of an object's file relative to `directory`, given its OBJECT_ID.
+    :param str manifest: Manifest file name, in `directory`.
+    :return: list of file paths written.
+    """
+    manifest_path = os.path.join(directory, manifest)
+    digests = read_manifest(manifest_path)
+
+    paths = []
+    with BatchWriter(directory) as batch:
+        for opm in opms:
+            object_id = opm.metadata.object_id.value
+            # Rendered once, for both the digest and the file.
+            text, digest = opm._render()
+            name = layout(object_id)
+            path = os.path.join(directory, name)
+            if digests.get(object_id) == digest and os.path.exists(path):
+                continue
+            batch.add(name, lambda fp: fp.write(text))
+            digests[object_id] = digest
+            paths.append(path)
+
+        if paths:
+            # Renamed last, once every file it describes is in place.
+            batch.add(manifest, lambda fp: json.dump(
+                digests, fp, indent=0, sort_keys=True))
+    return paths
+
+
+IndexEntry = namedtuple(
+    'IndexEntry',
+    'path offset length object_id object_name epoch creation_date '
+    'originator ref_frame')
+IndexEntry.__doc__ = """Location and summary of an indexed OPM.
+
+:param str path: File path.
+:param int offset: Byte offset of the OPM in the file.
+:param int length: Length of the OPM in bytes.
+:param str object_id: OBJECT_ID.
+:param str object_name: OBJECT_NAME.
+:param str epoch: State vector EPOCH, formatted as in the file.
+:param str creation_date: CREATION_DATE, formatted as in the file.
+:param str originator: ORIGINATOR.
+:param str ref_frame: REF_FRAME.
+"""
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    object_id TEXT NOT NULL,
+    object_name TEXT NOT NULL,
+    epoch TEXT NOT NULL,
+    creation_date TEXT NOT NULL,
+    originator TEXT NOT NULL,
+    ref_frame TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_object_epoch
+    ON messages (object_id, epoch);
+CREATE INDEX IF NOT EXISTS messages_path ON messages (path);
+"""
+
+# Keywords stored in the index, found with a quick scan of each OPM.
+_INDEX_KEYWORDS = ('OBJECT_ID', 'OBJECT_NAME', 'EPOCH', 'CREATION_DATE',
+                   'ORIGINATOR', 'REF_FRAME')
+
+
+class Index:
+
+    """SQLite index of the OPMs in an archive of files.
+
+    Each OPM's OBJECT_ID, OBJECT_NAME, EPOCH, CREATION_DATE, ORIGINATOR and
+    REF_FRAME are stored with its file path and byte range, so that lookups
+    use the database instead of reading files. Only these keywords are
+    read when indexing a file (see :py:func:`odmpy.kvn.scan_bytes`). Dates
+    are stored as formatted by :py:func:`odmpy.opm.format_date`, which
+    sorts in time order.
+
+    :param str database: SQLite database path. Defaults to an in-memory
+        database.
+    """
+
+    def __init__(self, database=':memory:'):
+        self.connection = sqlite3.connect(database)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(_INDEX_SCHEMA)
+        self.errors = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, directory, pattern='*.opm'):
+        """Bring the index up to date with the files in `directory` and its
+        subdirectories.
+
+        Files whose size and modification time are unchanged are skipped,
+        and files whose content hash is unchanged are not parsed again.
+        Files which no longer exist are removed from the index.
+
+        Files which cannot be indexed, e.g. because they cannot be read or
+        an OPM is missing a keyword, are left out of the index and tried again on the next
+        update. Their exceptions are kept in :py:attr:`errors`, a dict
+        keyed on file path, which is replaced by each update.
+
+        :param str directory: Archive directory.
+        :param str pattern: :py:mod:`fnmatch` pattern for file names.
+        :return: list of file paths (re)indexed.
+        """
+        directory = os.path.abspath(directory)
+        prefix = os.path.join(directory, '')
+        known = {path: (mtime_ns, size, digest)
+                 for path, mtime_ns, size, digest in self.connection.execute(
+                     'SELECT path, mtime_ns, size, digest FROM files')
+                 if path.startswith(prefix)}
+
+        indexed = []
+        self.errors = {}
+        with self.connection:
+            for root, _, names in os.walk(directory):
+                for name in fnmatch.filter(names, pattern):
+                    path = os.path.join(root, name)
+                    previous = known.pop(path, None)
+                    try:
+                        stat = os.stat(path)
+                        if previous is not None and previous[:2] == (
+                                stat.st_mtime_ns, stat.st_size):
+                            continue
+                        with open(path, 'rb') as fp:
+                            data = fp.read()
+                    except OSError as exc:
+                        # Deleted or unreadable since the walk listed it.
+                        self.errors[path] = exc
+                        known[path] = previous
+                        continue
+                    digest = hashlib.sha256(data).hexdigest()
+                    if previous is not None and previous[2] == digest:
+                        # Replacing the row would delete its messages.
+                        self.connection.execute(
+                            'UPDATE files SET mtime_ns = ?, size = ? '
+                            'WHERE path = ?',
+                            (stat.st_mtime_ns, stat.st_size, path))
+                        continue
+                    try:
+                        rows = self._scan_file(path, data)
+                    except (MissingKeywordError, ValueError) as exc:
+                        self.errors[path] = exc
+                        known[path] = previous
+                        continue
+                    self.connection.execute(
+                        'INSERT INTO files VALUES (?, ?, ?, ?) '
+                        'ON CONFLICT (path) DO UPDATE SET '
+                        'mtime_ns = excluded.mtime_ns, size = excluded.size, '
+                        'digest = excluded.digest',
+                        (path, stat.st_mtime_ns, stat.st_size, digest))
+                    self.connection.execute(
+                        'DELETE FROM messages WHERE path = ?', (path,))
+                    self.connection.executemany(
+                        'INSERT INTO messages '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                    indexed.append(path)
+
+            # Removed files, and files which could not be indexed, with
+            # their messages.
+            self.connection.executemany(
+                'DELETE FROM files WHERE path = ?',
+                [(path,) for path in known])
+        return indexed
+
+    @staticmethod
+    def _scan_file(path, data):
+        """Return the messages rows of the OPMs in a file."""
+        rows = []
+        for offset, length, values in kvn.scan_bytes(data, _INDEX_KEYWORDS):
+            missing = [keyword for keyword in _INDEX_KEYWORDS
+                       if keyword not in values]
+            if missing:
+                raise MissingKeywordError(
+                    '{} missing from OPM at offset {} of {}.'.format(
+                        ', '.join(missing), offset, path))
+            rows.append((
+                path, offset, length,
+                values['OBJECT_ID'],
+                values['OBJECT_NAME'],
+                format_date(values['EPOCH']),
+                format_date(values['CREATION_DATE']),
+                values['ORIGINATOR'],
+                values['REF_FRAME'].value))
+        return rows
+
+    def entries(self, object_id=None, start=None, end=None):
+        """Return index entries in order of epoch.
+
+        :param str object_id: Only return entries for this OBJECT_ID.
+        :param start: Only return entries with EPOCH at or after `start`.
+        :type start: :py:class:`~datetime.datetime`
+        :param end: Only return entries with EPOCH at or before `end`.
+        :type end: :py:class:`~datetime.datetime`
+        :return: list of :py:class:`IndexEntry`.
+        """
+        conditions = []
+        parameters = []
+        if object_id is not None:
+            conditions.append('object_id = ?')
+            parameters.append(object_id)
+        if start is not None:
+            conditions.append('epoch >= ?')
+            parameters.append(format_date(start))
+        if end is not None:
+            conditions.append('epoch <= ?')
+            parameters.append(format_date(end))
+        query = 'SELECT * FROM messages'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY epoch, creation_date'
+        return [IndexEntry(*row)
+                for row in self.connection.execute(query, parameters)]
+
+    def latest(self, object_id):
+        """Return the OPM with the latest EPOCH for `object_id`, or None.
+
+        Of OPMs with the same EPOCH, the latest created is returned.
+        """
+        row = self.connection.execute(
+            'SELECT * FROM messages WHERE object_id = ? '
+            'ORDER BY epoch DESC, creation_date DESC LIMIT 1',
+            (object_id,)).fetchone()
+        return None if row is None else self.load(IndexEntry(*row))
+
+    def find(self, object_id=None, start=None, end=None):
+        """Return OPMs in order of epoch, as selected by :py:meth:`entries`.
+
+        :return: list of :py:class:`~odmpy.opm.Opm`.
+        """
+        return [self.load(entry)
+                for entry in self.entries(object_id, start, end)]
+
+    @staticmethod
+    def load(entry):
+        """Read the OPM of an :py:class:`IndexEntry` from its file."""
+        with open(entry.path, 'rb') as fp:
+            fp.seek(entry.offset)
+            return kvn.loads(fp.read(entry.length).decode('utf-8'))
+
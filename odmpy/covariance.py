@@ -0,0 +1,387 @@
+"""
+Module for converting position/velocity covariances in bulk.
+
+Stacks of 6x6 covariance matrices are converted to and from
+:py:class:`~odmpy.opm.DataBlockCovarianceMatrix` blocks through a packed
+lower-triangular buffer of shape (N, 21), whose columns follow
+:py:data:`odmpy.opm.COVARIANCE_KEYWORDS`. Covariances can also be rotated
+between the inertial frame of each state vector and the RTN or TNW frames
+defined by it, and checked for positive definiteness in bulk.
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.covariance as covariance
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from odmpy.opm import (
+    COVARIANCE_KEYWORDS, DataBlockCovarianceMatrix, RefFrame,
+    _LOWER_TRIANGLE)
+
+__all__ = [
+    'CovarianceReport',
+    'LOCAL_FRAMES',
+    'covariance_matrices',
+    'from_arrays',
+    'is_positive_definite',
+    'nearest_positive_definite',
+    'pack',
+    'rotate',
+    'rotation_matrices',
+    'to_arrays',
+    'transform_covariances',
+    'unpack',
+    'validate_covariances',
+]
+
+#: Local orbital frames, defined by each object's own state vector.
+LOCAL_FRAMES = (RefFrame.RTN, RefFrame.RSW, RefFrame.TNW)
+
+_ROWS, _COLUMNS = (np.array(index) for index in zip(*_LOWER_TRIANGLE))
+
+
+def pack(covariances):
+    """Pack the lower triangles of a stack of 6x6 matrices.
+
+    :param covariances: Array of shape (N, 6, 6) or (6, 6).
+    :return: float64 array of shape (N, 21).
+    :raises ValueError: if the matrices are not 6x6.
+    """
+    covariances = np.asarray(covariances, dtype=np.float64)
+    if covariances.shape[-2:] != (6, 6):
+        raise ValueError('covariance matrices must be 6x6.')
+    return covariances.reshape(-1, 6, 6)[:, _ROWS, _COLUMNS]
+
+
+def unpack(packed):
+    """Expand packed lower triangles to a stack of symmetric 6x6 matrices.
+
+    :param packed: Array of shape (N, 21) or (21,).
+    :return: float64 array of shape (N, 6, 6).
+    """
+    packed = np.asarray(packed, dtype=np.float64).reshape(-1, len(_ROWS))
+    covariances = np.empty((len(packed), 6, 6))
+    covariances[:, _ROWS, _COLUMNS] = packed
+    covariances[:, _COLUMNS, _ROWS] = packed
+    return covariances
+
+
+def from_arrays(covariances, comment=None, cov_ref_frame=None):
+    """Create covariance matrix blocks from a stack of 6x6 matrices.
+
+    Only the lower triangle of each matrix is used.
+
+    :param covariances: Array of shape (N, 6, 6).
+    :param str comment: Optional comment for every block.
+    :param cov_ref_frame: Covariance reference frame for every block.
+    :type cov_ref_frame: :py:class:`~odmpy.opm.RefFrame`
+    :return: list of :py:class:`~odmpy.opm.DataBlockCovarianceMatrix`.
+    """
+    return [DataBlockCovarianceMatrix.from_packed(
+                values, comment=comment, cov_ref_frame=cov_ref_frame)
+            for values in pack(covariances).tolist()]
+
+
+def to_arrays(blocks):
+    """Return the covariances of `blocks` as an array of shape (N, 6, 6)."""
+    return unpack([block.to_packed() for block in blocks])
+
+
+def covariance_matrices(opms, covariances, comment=None, cov_ref_frame=None):
+    """Attach covariance matrix blocks to a fleet of OPMs.
+
+    :param opms: Sequence of :py:class:`~odmpy.opm.Opm` objects.
+    :param covariances: Array of shape (N, 6, 6), one matrix per OPM.
+    :return: list of the new
+        :py:class:`~odmpy.opm.DataBlockCovarianceMatrix` blocks.
+    :raises ValueError: if there is not one matrix per OPM.
+
+    See :py:func:`from_arrays` for the remaining parameters.
+    """
+    blocks = from_arrays(covariances, comment=comment,
+                         cov_ref_frame=cov_ref_frame)
+    if len(blocks) != len(opms):
+        raise ValueError('expected {} covariance matrices, got {}.'.format(
+            len(opms), len(blocks)))
+    for opm, block in zip(opms, blocks):
+        opm.data.covariance_matrix = block
+    return blocks
+
+
+def _unit(vectors):
+    return vectors / np.sqrt(np.einsum('ij,ij->i', vectors, vectors))[:, None]
+
+
+def rotation_matrices(r, v, frame):
+    """Return rotations from the state's frame to a local orbital frame.
+
+    :param r: Positions, array of shape (N, 3).
+    :param v: Velocities, array of shape (N, 3).
+    :param frame: One of :py:data:`LOCAL_FRAMES`, or any other frame for
+        the identity, as the state is assumed to be in that frame already.
+    :type frame: :py:class:`~odmpy.opm.RefFrame`
+    :return: Array of shape (N, 3, 3) whose rows are the local axes, so that
+        ``x_local = rotation @ x``.
+    """
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+
+    if frame in (RefFrame.RTN, RefFrame.RSW):
+        radial = _unit(r)
+        normal = _unit(np.cross(r, v))
+        axes = (radial, np.cross(normal, radial), normal)
+    elif frame == RefFrame.TNW:
+        tangential = _unit(v)
+        w = _unit(np.cross(r, v))
+        axes = (tangential, np.cross(w, tangential), w)
+    else:
+        return np.broadcast_to(np.eye(3), (len(r), 3, 3)).copy()
+    return np.stack(axes, axis=1)
+
+
+def _transformations(r, v, from_frames, to_frames):
+    """6x6 covariance transformations for per-object frame pairs."""
+    n = len(r)
+    rotations = {frame: rotation_matrices(r, v, frame)
+                 for frame in set(from_frames) | set(to_frames)}
+
+    def select(frames):
+        stacked = np.empty((n, 3, 3))
+        for frame, rotation in rotations.items():
+            members = np.array([f == frame for f in frames], dtype=bool)
+            stacked[members] = rotation[members]
+        return stacked
+
+    # Rotate back to the state's frame, then on to the target frame.
+    rotation = np.einsum('nij,nkj->nik', select(to_frames),
+                         select(from_frames))
+    transformation = np.zeros((n, 6, 6))
+    transformation[:, :3, :3] = rotation
+    transformation[:, 3:, 3:] = rotation
+    return transformation
+
+
+def rotate(covariances, r, v, from_frame, to_frame):
+    """Rotate a stack of covariances between an object's inertial frame and
+    its local orbital frames.
+
+    Position and velocity blocks are rotated alike, without the transport
+    term of the rotating frame.
+
+    :param covariances: Array of shape (N, 6, 6).
+    :param r: Positions, array of shape (N, 3), in the inertial frame.
+    :param v: Velocities, array of shape (N, 3), in the inertial frame.
+    :param from_frame: Current frame of the covariances.
+    :param to_frame: Target frame. Frames not in :py:data:`LOCAL_FRAMES`
+        stand for the frame of `r` and `v`.
+    :return: Array of shape (N, 6, 6).
+    """
+    covariances = np.asarray(covariances, dtype=np.float64).reshape(-1, 6, 6)
+    n = len(covariances)
+    transformation = _transformations(
+        np.asarray(r, dtype=np.float64).reshape(-1, 3),
+        np.asarray(v, dtype=np.float64).reshape(-1, 3),
+        [from_frame] * n, [to_frame] * n)
+    return np.einsum('nij,njk,nlk->nil', transformation, covariances,
+                     transformation, optimize=True)
+
+
+def transform_covariances(opms, frame=None):
+    """Re-express the covariance matrix blocks of a fleet of OPMs.
+
+    Every covariance is rotated in one batch, using each OPM's state
+    vector, and COV_REF_FRAME is updated. OPMs without a covariance matrix
+    block are skipped.
+
+    :param opms: Sequence of :py:class:`~odmpy.opm.Opm` objects.
+    :param frame: Target frame, one of :py:data:`LOCAL_FRAMES`, or None for
+        each OPM's own reference frame.
+    :type frame: :py:class:`~odmpy.opm.RefFrame`
+    :return: list of the updated
+        :py:class:`~odmpy.opm.DataBlockCovarianceMatrix` blocks.
+    :raises ValueError: if `frame` is another inertial frame, or an OPM's
+        covariance is in an inertial frame other than its state vector's.
+    """
+    if frame is not None and frame not in LOCAL_FRAMES:
+        raise ValueError('covariances can only be rotated to a local orbital '
+                         'frame, or back to the OPM reference frame.')
+
+    opms = [opm for opm in opms
+            if opm.data.covariance_matrix.block is not None]
+    if not opms:
+        return []
+
+    blocks = [opm.data.covariance_matrix.block for opm in opms]
+    ref_frames = [opm.metadata.ref_frame.value for opm in opms]
+    from_frames = []
+    for block, ref_frame in zip(blocks, ref_frames):
+        cov_ref_frame = block.cov_ref_frame.value
+        if cov_ref_frame is None:
+            cov_ref_frame = ref_frame
+        elif cov_ref_frame not in LOCAL_FRAMES and cov_ref_frame != ref_frame:
+            raise ValueError('cannot rotate covariance from {} with a state '
+                             'vector in {}.'.format(cov_ref_frame.value,
+                                                    ref_frame.value))
+        from_frames.append(cov_ref_frame)
+    to_frames = ref_frames if frame is None else [frame] * len(opms)
+
+    states = np.array([
+        [sv.x.value, sv.y.value, sv.z.value,
+         sv.x_dot.value, sv.y_dot.value, sv.z_dot.value]
+        for sv in (opm.data.state_vector.block for opm in opms)],
+        dtype=np.float64)
+
+    transformation = _transformations(states[:, :3], states[:, 3:],
+                                      from_frames, to_frames)
+    covariances = np.einsum('nij,njk,nlk->nil', transformation,
+                            to_arrays(blocks), transformation, optimize=True)
+
+    for block, to_frame, values in zip(blocks, to_frames,
+                                       pack(covariances).tolist()):
+        for name, value in zip(COVARIANCE_KEYWORDS, values):
+            setattr(block, name, value)
+        block.cov_ref_frame = to_frame
+    return blocks
+
+
+CovarianceReport = namedtuple(
+    'CovarianceReport',
+    ['index', 'positive_definite', 'min_eigenvalue', 'repaired'])
+CovarianceReport.__doc__ = """Result of validating one OPM's covariance.
+
+:param int index: Position of the OPM in the validated sequence.
+:param bool positive_definite: Whether the original matrix was positive
+    definite.
+:param min_eigenvalue: Smallest eigenvalue of a matrix that failed, or
+    None if it passed.
+:param bool repaired: Whether the block was replaced by its nearest
+    positive definite matrix.
+"""
+
+
+def _cholesky(covariances):
+    """Batched Cholesky decomposition of 6x6 matrices.
+
+    Unlike :py:func:`numpy.linalg.cholesky`, failures are flagged per matrix
+    instead of raising for the whole stack.
+
+    :return: (lower, success), arrays of shape (N, 6, 6) and (N,).
+    """
+    n = len(covariances)
+    lower = np.zeros((n, 6, 6))
+    success = np.ones(n, dtype=bool)
+    for j in range(6):
+        row = lower[:, j, :j]
+        diagonal = covariances[:, j, j] - np.einsum('ij,ij->i', row, row)
+        success &= diagonal > 0
+        # Failed matrices carry on with a unit pivot so the rest of the
+        # stack is unaffected.
+        pivot = np.sqrt(np.where(diagonal > 0, diagonal, 1.0))
+        lower[:, j, j] = pivot
+        for i in range(j + 1, 6):
+            lower[:, i, j] = (covariances[:, i, j] -
+                              np.einsum('ij,ij->i', lower[:, i, :j], row)
+                              ) / pivot
+    return lower, success
+
+
+def is_positive_definite(covariances, tolerance=1e-12):
+    """Check a stack of matrices for symmetry and positive definiteness.
+
+    :param covariances: Array of shape (N, 6, 6).
+    :param float tolerance: Allowed asymmetry, relative to the largest
+        element of each matrix.
+    :return: bool array of shape (N,).
+    """
+    covariances = np.asarray(covariances, dtype=np.float64).reshape(-1, 6, 6)
+    scale = np.abs(covariances).max(axis=(1, 2))
+    asymmetry = np.abs(covariances - covariances.transpose(0, 2, 1))
+    symmetric = asymmetry.max(axis=(1, 2)) <= tolerance * scale
+    return symmetric & _cholesky(covariances)[1]
+
+
+def nearest_positive_definite(covariances, epsilon=1e-10):
+    """Return the nearest symmetric positive definite matrices.
+
+    Each matrix is symmetrised and scaled to a correlation matrix with the
+    square roots of its diagonal, so that position and velocity terms are
+    compared on the same scale. Eigenvalues of the correlation matrix below
+    `epsilon` times its largest eigenvalue magnitude are raised to that
+    floor, which is the nearest such matrix in the Frobenius norm (Higham,
+    1988), and the result is scaled back. Matrices whose eigenvalues are all
+    above the floor are returned unchanged.
+
+    :param covariances: Array of shape (N, 6, 6).
+    :param float epsilon: Relative eigenvalue floor.
+    :return: Array of shape (N, 6, 6).
+    """
+    covariances = np.asarray(covariances, dtype=np.float64).reshape(-1, 6, 6)
+    symmetric = (covariances + covariances.transpose(0, 2, 1)) / 2
+    variances = np.abs(np.diagonal(symmetric, axis1=1, axis2=2))
+    # A zero variance has no scale of its own, so it is left unscaled.
+    sigma = np.sqrt(np.where(variances > 0, variances, 1.0))
+    correlation = symmetric / (sigma[:, :, None] * sigma[:, None, :])
+
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    floor = epsilon * np.abs(eigenvalues).max(axis=1, keepdims=True)
+    floor = np.maximum(floor, np.finfo(np.float64).tiny)
+    clipped = (eigenvalues < floor).any(axis=1)
+    eigenvalues = np.maximum(eigenvalues, floor)
+    repaired = np.einsum('nij,nj,nkj->nik', eigenvectors, eigenvalues,
+                         eigenvectors)
+    repaired *= sigma[:, :, None] * sigma[:, None, :]
+    # Remove round-off asymmetry from the reconstruction.
+    repaired = (repaired + repaired.transpose(0, 2, 1)) / 2
+    return np.where(clipped[:, None, None], repaired, symmetric)
+
+
+def validate_covariances(opms, repair=False, epsilon=1e-10):
+    """Check the covariance matrix blocks of a fleet of OPMs.
+
+    Every block is checked with a single batched Cholesky decomposition.
+    Blocks only store a lower triangle, so their matrices are symmetric by
+    construction. OPMs without a covariance matrix block are skipped.
+
+    :param opms: Sequence of :py:class:`~odmpy.opm.Opm` objects.
+    :param bool repair: Replace the values of each failing block with its
+        nearest positive definite matrix.
+    :param float epsilon: Relative eigenvalue floor for repairs, see
+        :py:func:`nearest_positive_definite`.
+    :return: list of :py:class:`CovarianceReport`, one per OPM with a
+        covariance matrix block.
+    """
+    indices = [index for index, opm in enumerate(opms)
+               if opm.data.covariance_matrix.block is not None]
+    if not indices:
+        return []
+
+    blocks = [opms[index].data.covariance_matrix.block for index in indices]
+    covariances = to_arrays(blocks)
+    success = _cholesky(covariances)[1]
+
+    failures = np.flatnonzero(~success)
+    min_eigenvalues = [None] * len(blocks)
+    repaired = [False] * len(blocks)
+    if failures.size:
+        failed = covariances[failures]
+        for position, value in zip(
+                failures.tolist(),
+                np.linalg.eigvalsh(failed).min(axis=1).tolist()):
+            min_eigenvalues[position] = value
+
+        if repair:
+            fixed = nearest_positive_definite(failed, epsilon=epsilon)
+            for position, values in zip(failures.tolist(),
+                                        pack(fixed).tolist()):
+                block = blocks[position]
+                for name, value in zip(COVARIANCE_KEYWORDS, values):
+                    setattr(block, name, value)
+                repaired[position] = True
+
+    return [CovarianceReport(index, positive_definite, min_eigenvalue,
+                             was_repaired)
+            for index, positive_definite, min_eigenvalue, was_repaired
+            in zip(indices, success.tolist(), min_eigenvalues, repaired)]
@@ -0,0 +1,137 @@
+"""
+Module for Monte Carlo dispersion of OPM state vectors.
+
+Dispersed states are drawn from the position/velocity covariance of a
+parent OPM. Each dispersed OPM shares the parent's header, metadata and
+spacecraft parameters instead of copying them.
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.dispersion as dispersion
+"""
+import os
+
+import numpy as np
+
+from odmpy.covariance import LOCAL_FRAMES, rotate
+from odmpy.opm import Data, DataBlockStateVector, Opm, suffix
+
+__all__ = [
+    'Dispersion',
+    'sample',
+]
+
+
+def sample(mean, covariance, n, seed=None):
+    """Draw states from a multivariate normal distribution.
+
+    :param mean: State of shape (6,), in km and km/s.
+    :param covariance: Covariance matrix of shape (6, 6).
+    :param int n: Number of samples.
+    :param seed: Seed for :py:func:`numpy.random.default_rng`, or a
+        :py:class:`numpy.random.Generator`.
+    :return: Array of shape (n, 6).
+    :raises ValueError: if `covariance` is not positive definite.
+    """
+    try:
+        lower = np.linalg.cholesky(np.asarray(covariance, dtype=np.float64))
+    except np.linalg.LinAlgError:
+        raise ValueError('covariance is not positive definite, see '
+                         'odmpy.covariance.validate_covariances.') from None
+    normal = np.random.default_rng(seed).standard_normal((int(n), 6))
+    return np.asarray(mean, dtype=np.float64) + normal @ lower.T
+
+
+class Dispersion:
+
+    """Dispersed states of a parent OPM.
+
+    Indexing or iterating creates :py:class:`~odmpy.opm.Opm` objects on
+    demand. They share the parent's header, metadata, spacecraft
+    parameters, maneuvers and user defined parameters, and have only a state
+    vector of their own.
+
+    :param parent: Instance of :py:class:`~odmpy.opm.Opm`.
+    :param states: Array of shape (N, 6), in the parent's reference frame.
+    """
+
+    def __init__(self, parent, states):
+        self.parent = parent
+        self.states = np.asarray(states, dtype=np.float64).reshape(-1, 6)
+
+    @classmethod
+    def from_opm(cls, parent, n, seed=None):
+        """Draw `n` states from the parent's covariance matrix block.
+
+        A covariance in a local orbital frame is rotated to the parent's
+        reference frame first.
+
+        :param parent: Instance of :py:class:`~odmpy.opm.Opm`.
+        :param int n: Number of samples.
+        :param seed: See :py:func:`sample`.
+        :raises ValueError: if the parent has no covariance matrix block, it
+            is in an inertial frame other than the parent's, or it is not
+            positive definite.
+        """
+        block = parent.data.covariance_matrix.block
+        if block is None:
+            raise ValueError('parent OPM has no covariance matrix block.')
+
+        sv = parent.data.state_vector.block
+        mean = [sv.x.value, sv.y.value, sv.z.value,
+                sv.x_dot.value, sv.y_dot.value, sv.z_dot.value]
+        covariance = block.to_array()
+        cov_ref_frame = block.cov_ref_frame.value
+        ref_frame = parent.metadata.ref_frame.value
+        if cov_ref_frame not in LOCAL_FRAMES + (None, ref_frame):
+            raise ValueError('cannot rotate covariance from {} with a state '
+                             'vector in {}.'.format(cov_ref_frame.value,
+                                                    ref_frame.value))
+        if cov_ref_frame in LOCAL_FRAMES:
+            covariance = rotate(covariance, mean[:3], mean[3:],
+                                cov_ref_frame, ref_frame)[0]
+
+        return cls(parent, sample(mean, covariance, n, seed=seed))
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, index):
+        parent = self.parent
+        state_vector = DataBlockStateVector(
+            parent.data.state_vector.block.epoch.value,
+            *self.states[index].tolist())
+        data = Data(
+            state_vector,
+            spacecraft_parameters=parent.data.spacecraft_parameters.block,
+            maneuver_parameters=parent.data.maneuver_parameters.block)
+        return Opm(parent.header, parent.metadata, data,
+                   user_defined=parent.user_defined)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def write_files(self, directory, filename='{index:06d}.opm'):
+        """Write each dispersed OPM to its own file.
+
+        OPMs are created and written one at a time, and the shared header
+        and metadata are only formatted once.
+
+        :param str directory: Existing output directory.
+        :param str filename: Format string for file names, given `index` and
+            the parent's `object_id`.
+        :return: list of file paths written.
+        """
+        preamble = list(suffix('\n', self.parent._output_header()))
+        object_id = self.parent.metadata.object_id.value
+        paths = []
+        for index, opm in enumerate(self):
+            path = os.path.join(directory, filename.format(
+                index=index, object_id=object_id))
+            with open(path, 'w') as fp:
+                fp.writelines(preamble)
+                fp.writelines(suffix('\n', opm._output_data()))
+            paths.append(path)
+        return paths
@@ -0,0 +1,366 @@
+"""
+Module for converting between state vectors and Keplerian elements in bulk.
+
+Conversions operate on whole arrays of objects at once with NumPy. Elements
+are returned in a dictionary keyed by the
+:py:class:`~odmpy.opm.DataBlockKeplerianElements` parameter names, so that
+each object's elements can be passed straight to the block.
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.elements as elements
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from odmpy.opm import DataBlockKeplerianElements
+
+__all__ = [
+    'KeplerSolution',
+    'cartesian_to_keplerian',
+    'convert_anomaly',
+    'keplerian_elements',
+    'mean_to_true',
+    'solve_kepler',
+    'true_to_mean',
+]
+
+# Eccentricity and inclination [rad] below which an orbit is treated as
+# circular or equatorial, and the undefined angles are set to zero.
+TOLERANCE = 1e-11
+
+
+def _true_to_mean(true_anomaly, eccentricity):
+    """Mean anomaly [rad] from true anomaly [rad], elliptic or hyperbolic."""
+    e = eccentricity
+    sin_nu = np.sin(true_anomaly)
+    cos_nu = np.cos(true_anomaly)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denominator = 1 + e * cos_nu
+        elliptic_e = np.arctan2(np.sqrt(np.abs(1 - e * e)) * sin_nu,
+                                e + cos_nu)
+        elliptic = elliptic_e - e * np.sin(elliptic_e)
+        hyperbolic_h = np.arcsinh(np.sqrt(np.abs(e * e - 1)) * sin_nu /
+                                  denominator)
+        hyperbolic = e * np.sinh(hyperbolic_h) - hyperbolic_h
+    return np.where(e < 1, elliptic, hyperbolic)
+
+
+KeplerSolution = namedtuple(
+    'KeplerSolution', ['anomaly', 'residual', 'iterations', 'converged'])
+KeplerSolution.__doc__ = """Result of :py:func:`solve_kepler`.
+
+:param anomaly: Eccentric (elliptic) or hyperbolic anomaly [rad].
+:param residual: Absolute residual of Kepler's equation [rad].
+:param int iterations: Newton iterations performed.
+:param converged: Boolean array, True where the residual is within
+    tolerance.
+"""
+
+
+def _newton(residual, derivative, x, m, tolerance, max_iterations):
+    """Newton iteration on arrays, freezing elements as they converge."""
+    scale = tolerance * np.maximum(1, np.abs(m))
+    f = residual(x)
+    iterations = 0
+    while iterations < max_iterations:
+        active = np.abs(f) > scale
+        if not active.any():
+            break
+        x = np.where(active, x - f / derivative(x), x)
+        f = residual(x)
+        iterations += 1
+    f = np.abs(f)
+    return x, f, iterations, f <= scale
+
+
+def solve_kepler(mean_anomaly, eccentricity, tolerance=1e-14,
+                 max_iterations=20):
+    """Solve Kepler's equation for arrays of mean anomalies.
+
+    Solves M = E - e*sin(E) for elliptic orbits and M = e*sinh(H) - H for
+    hyperbolic orbits with Newton's method, starting from Danby's initial
+    guesses. Elements are iterated together until all have converged or
+    `max_iterations` is reached, so the cost is bounded regardless of input.
+
+    :param mean_anomaly: Mean anomaly [rad].
+    :param eccentricity: Eccentricity [--], broadcast against
+        `mean_anomaly`. Parabolic orbits (e = 1) are not supported.
+    :param float tolerance: Convergence tolerance on the residual, relative
+        to the mean anomaly when its magnitude exceeds one radian.
+    :param int max_iterations: Maximum number of Newton iterations.
+    :return: :py:class:`KeplerSolution`. Elements that did not converge are
+        reported through its `converged` and `residual` fields rather than
+        by raising.
+    """
+    mean_anomaly, e = np.broadcast_arrays(
+        np.asarray(mean_anomaly, dtype=np.float64),
+        np.asarray(eccentricity, dtype=np.float64))
+
+    anomaly = np.empty(mean_anomaly.shape)
+    residual = np.empty(mean_anomaly.shape)
+    converged = np.empty(mean_anomaly.shape, dtype=bool)
+    iterations = 0
+
+    hyperbolic = e > 1
+    elliptic = ~hyperbolic
+
+    if elliptic.any():
+        m = mean_anomaly[elliptic]
+        ee = e[elliptic]
+        # Solve with mean anomaly in [-pi, pi), then add back the whole
+        # revolutions.
+        revolutions = np.floor((m + np.pi) / (2 * np.pi)) * (2 * np.pi)
+        m = m - revolutions
+        x, f, count, ok = _newton(
+            lambda x: x - ee * np.sin(x) - m,
+            lambda x: 1 - ee * np.cos(x),
+            m + 0.85 * ee * np.sign(np.sin(m)), m, tolerance,
+            max_iterations)
+        anomaly[elliptic] = x + revolutions
+        residual[elliptic] = f
+        converged[elliptic] = ok
+        iterations = count
+
+    if hyperbolic.any():
+        m = mean_anomaly[hyperbolic]
+        ee = e[hyperbolic]
+        x, f, count, ok = _newton(
+            lambda x: ee * np.sinh(x) - x - m,
+            lambda x: ee * np.cosh(x) - 1,
+            np.sign(m) * np.log(2 * np.abs(m) / ee + 1.8), m, tolerance,
+            max_iterations)
+        anomaly[hyperbolic] = x
+        residual[hyperbolic] = f
+        converged[hyperbolic] = ok
+        iterations = max(iterations, count)
+
+    return KeplerSolution(anomaly=anomaly, residual=residual,
+                          iterations=iterations, converged=converged)
+
+
+def mean_to_true(mean_anomaly, eccentricity, tolerance=1e-14,
+                 max_iterations=20):
+    """Convert mean anomaly [deg] to true anomaly [deg].
+
+    Elliptic true anomalies are in the range [0, 360). Hyperbolic true
+    anomalies are signed, in the range (-180, 180), negative before
+    pericenter.
+
+    :raises ValueError: if Kepler's equation did not converge for every
+        element.
+
+    See :py:func:`solve_kepler` for the remaining parameters.
+    """
+    e = np.asarray(eccentricity, dtype=np.float64)
+    solution = solve_kepler(np.radians(mean_anomaly), e, tolerance,
+                            max_iterations)
+    if not solution.converged.all():
+        raise ValueError(
+            "Kepler's equation did not converge within {} iterations "
+            "(largest residual {:.3g} rad).".format(
+                max_iterations, solution.residual.max()))
+
+    x = solution.anomaly
+    with np.errstate(invalid='ignore'):
+        true_anomaly = np.where(
+            e > 1,
+            2 * np.arctan(np.sqrt((e + 1) / (e - 1)) * np.tanh(x / 2)),
+            2 * np.arctan2(np.sqrt(1 + e) * np.sin(x / 2),
+                           np.sqrt(1 - e) * np.cos(x / 2)))
+    return np.where(e > 1, np.degrees(true_anomaly),
+                    np.degrees(true_anomaly) % 360)
+
+
+def true_to_mean(true_anomaly, eccentricity):
+    """Convert true anomaly [deg] to mean anomaly [deg].
+
+    Elliptic mean anomalies are in the range [0, 360). Hyperbolic mean
+    anomalies are signed, with the same sign as the true anomaly.
+    """
+    e = np.asarray(eccentricity, dtype=np.float64)
+    mean_anomaly = np.degrees(_true_to_mean(np.radians(true_anomaly), e))
+    return np.where(e < 1, mean_anomaly % 360, mean_anomaly)
+
+
+def cartesian_to_keplerian(r, v, gm, anomaly='true'):
+    """Convert arrays of state vectors to osculating Keplerian elements.
+
+    :param r: Positions [km], array of shape (N, 3).
+    :param v: Velocities [km/s], array of shape (N, 3).
+    :param gm: Gravitational coefficient [km**3/s**2], scalar or array of
+        shape (N,).
+    :param str anomaly: 'true' or 'mean', the anomaly to return.
+    :return: dict of arrays of shape (N,) with keys ``semi_major_axis``
+        [km], ``eccentricity``, ``inclination``, ``ra_of_asc_node``,
+        ``arg_of_pericenter``, ``true_anomaly`` or ``mean_anomaly`` [deg],
+        and ``gm``.
+    :raises ValueError: if `anomaly` is not 'true' or 'mean', or if any orbit
+        is parabolic or degenerate.
+
+    Angles that are undefined for circular or equatorial orbits are set to
+    zero, and the remaining angle takes up the difference:
+
+    - Equatorial orbits: RA_OF_ASC_NODE is zero and ARG_OF_PERICENTER is the
+      longitude of pericenter.
+    - Circular orbits: ARG_OF_PERICENTER is zero and the anomaly is the
+      argument of latitude.
+    - Circular equatorial orbits: both are zero and the anomaly is the true
+      longitude.
+
+    Hyperbolic orbits have a negative SEMI_MAJOR_AXIS and a signed anomaly,
+    negative before pericenter, as returned by :py:func:`mean_to_true` and
+    :py:func:`true_to_mean`. Elliptic anomalies are in the range [0, 360).
+    """
+    if anomaly not in ('true', 'mean'):
+        raise ValueError("anomaly must be 'true' or 'mean'.")
+
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    gm = np.broadcast_to(np.asarray(gm, dtype=np.float64), len(r))
+
+    r_mag = np.sqrt(np.einsum('ij,ij->i', r, r))
+    v_sq = np.einsum('ij,ij->i', v, v)
+    rv = np.einsum('ij,ij->i', r, v)
+
+    h = np.cross(r, v)
+    h_mag = np.sqrt(np.einsum('ij,ij->i', h, h))
+    if np.any(h_mag == 0) or np.any(r_mag == 0):
+        raise ValueError('state vectors must not be rectilinear.')
+
+    # Node vector, z x h.
+    n = np.stack((-h[:, 1], h[:, 0], np.zeros(len(h))), axis=1)
+    n_mag = np.hypot(n[:, 0], n[:, 1])
+
+    e_vec = (((v_sq - gm / r_mag)[:, None] * r - rv[:, None] * v) /
+             gm[:, None])
+    e = np.sqrt(np.einsum('ij,ij->i', e_vec, e_vec))
+
+    energy = v_sq / 2 - gm / r_mag
+    if np.any(energy == 0):
+        raise ValueError('parabolic orbits have no semi-major axis.')
+    a = -gm / (2 * energy)
+
+    i = np.arccos(np.clip(h[:, 2] / h_mag, -1, 1))
+
+    circular = e < TOLERANCE
+    equatorial = (np.sin(i) < TOLERANCE) | (n_mag < TOLERANCE * h_mag)
+
+    # Angles are measured with arctan2 from a reference direction in the
+    # orbit plane and the direction 90 degrees ahead of it (h x ref / |h|).
+    def angle(reference, target):
+        ahead = np.cross(h, reference) / h_mag[:, None]
+        return np.arctan2(np.einsum('ij,ij->i', ahead, target),
+                          np.einsum('ij,ij->i', reference, target))
+
+    x_axis = np.broadcast_to([1.0, 0.0, 0.0], r.shape)
+
+    raan = np.where(equatorial, 0.0, np.arctan2(n[:, 1], n[:, 0]))
+
+    # Unit vector along the line of nodes, or along X for equatorial orbits.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        node = np.where(equatorial[:, None], x_axis,
+                        n / n_mag[:, None])
+
+    argp = np.where(circular, 0.0, angle(node, e_vec))
+
+    # Anomaly from pericenter, or from the node (argument of latitude) or
+    # X axis (true longitude) when there is no pericenter.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        periapsis = np.where(circular[:, None], node,
+                             e_vec / e[:, None])
+    nu = angle(periapsis, r)
+
+    elements = {
+        'semi_major_axis': a,
+        'eccentricity': e,
+        'inclination': np.degrees(i),
+        'ra_of_asc_node': np.degrees(raan) % 360,
+        'arg_of_pericenter': np.degrees(argp) % 360,
+        'gm': np.array(gm),
+    }
+    if anomaly == 'true':
+        elements['true_anomaly'] = np.where(e < 1, np.degrees(nu) % 360,
+                                            np.degrees(nu))
+    else:
+        elements['mean_anomaly'] = true_to_mean(np.degrees(nu), e)
+    return elements
+
+
+def keplerian_elements(opms, gm, anomaly='true', comment=None):
+    """Compute and attach Keplerian elements blocks to a fleet of OPMs.
+
+    The state vector of each OPM is converted in a single batch, and each
+    OPM's keplerian_elements block is replaced.
+
+    :param opms: Sequence of :py:class:`~odmpy.opm.Opm` objects.
+    :param gm: Gravitational coefficient [km**3/s**2], scalar or one value
+        per OPM.
+    :param str anomaly: 'true' or 'mean', the anomaly keyword to populate.
+    :param str comment: Optional comment for every block.
+    :return: list of the new
+        :py:class:`~odmpy.opm.DataBlockKeplerianElements` blocks.
+    """
+    if not opms:
+        return []
+
+    states = np.array([
+        [sv.x.value, sv.y.value, sv.z.value,
+         sv.x_dot.value, sv.y_dot.value, sv.z_dot.value]
+        for sv in (opm.data.state_vector.block for opm in opms)],
+        dtype=np.float64)
+
+    elements = cartesian_to_keplerian(states[:, :3], states[:, 3:], gm,
+                                      anomaly=anomaly)
+
+    names = list(elements)
+    blocks = []
+    for opm, values in zip(opms, zip(*(elements[name].tolist()
+                                       for name in names))):
+        block = DataBlockKeplerianElements(comment=comment,
+                                           **dict(zip(names, values)))
+        opm.data.keplerian_elements = block
+        blocks.append(block)
+    return blocks
+
+
+def convert_anomaly(blocks, anomaly, **kwargs):
+    """Switch Keplerian elements blocks to true or mean anomaly in bulk.
+
+    All blocks are converted in a single batch. Blocks that already use the
+    requested anomaly are left unchanged.
+
+    :param blocks: Sequence of
+        :py:class:`~odmpy.opm.DataBlockKeplerianElements`.
+    :param str anomaly: 'true' or 'mean', the anomaly keyword to populate.
+    :param kwargs: Passed to :py:func:`mean_to_true`.
+    :raises ValueError: if `anomaly` is not 'true' or 'mean'.
+    """
+    if anomaly not in ('true', 'mean'):
+        raise ValueError("anomaly must be 'true' or 'mean'.")
+
+    if anomaly == 'true':
+        source, target = 'mean_anomaly', 'true_anomaly'
+    else:
+        source, target = 'true_anomaly', 'mean_anomaly'
+
+    pending = [block for block in blocks
+               if getattr(block, source).value is not None]
+    if not pending:
+        return
+
+    values = np.array([getattr(block, source).value for block in pending],
+                      dtype=np.float64)
+    e = np.array([block.eccentricity.value for block in pending],
+                 dtype=np.float64)
+
+    if anomaly == 'true':
+        converted = mean_to_true(values, e, **kwargs)
+    else:
+        converted = true_to_mean(values, e)
+
+    for block, value in zip(pending, converted.tolist()):
+        setattr(block, source, None)
+        setattr(block, target, value)
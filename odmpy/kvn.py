@@ -0,0 +1,423 @@
+"""
+Module for reading OPM files in KVN (keyword = value notation) format, as
+written by :py:meth:`odmpy.opm.Opm.write`.
+
+Each keyword line is dispatched through :py:data:`odmpy.opm.KEYWORDS` to
+its section and value type. A file may contain several OPMs, each starting
+with CCSDS_OPM_VERS.
+
+For sweeps over many files, :py:func:`scan` and :py:func:`scan_directory`
+only extract a few keywords from each OPM, without parsing the rest.
+
+Recommended import syntax:
+import odmpy.kvn as kvn
+"""
+import fnmatch
+import mmap
+import os
+import re
+from calendar import isleap
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import islice
+
+from odmpy.opm import (
+    BLOCK_NAMES, KEYWORDS, Data, DataBlockContainer, ManeuverTimeline,
+    MissingBlockError, Opm, _DATA_BLOCKS, _SECTIONS)
+
+__all__ = [
+    'LazyData',
+    'SCAN_KEYWORDS',
+    'load',
+    'loads',
+    'parse_date',
+    'parse_value',
+    'scan',
+    'scan_bytes',
+    'scan_directory',
+    'split_messages',
+]
+
+# Keywords extracted by the scan functions by default.
+SCAN_KEYWORDS = ('OBJECT_ID', 'EPOCH', 'CREATION_DATE')
+
+_KEYWORD = re.compile(r'[A-Z0-9_]+$')
+
+_DATE = re.compile(
+    r'(\d{4})-(?:(\d{2})-(\d{2})|(\d{3}))T(\d{2}):(\d{2}):(\d{2})'
+    r'(?:\.(\d{1,6}))?$')
+
+_MESSAGE_START = b'CCSDS_OPM_VERS'
+
+_VALUE = re.compile(br'[ \t]*=[ \t]*(.*?)[ \t]*(?:\[[^\]]*\])?[ \t]*\r?$')
+
+_USER_DEFINED = 'USER_DEFINED_'
+
+
+def parse_date(text):
+    """Parse a date in the formats of :py:func:`odmpy.opm.format_date` or
+    :py:func:`odmpy.opm.format_date_yyyyddd`.
+
+    :raises ValueError: if the date cannot be parsed.
+    """
+    match = _DATE.match(text)
+    if match is None:
+        raise ValueError('invalid date {!r}.'.format(text))
+    year, month, day, day_of_year, hour, minute, second, fraction = (
+        match.groups())
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+    if day_of_year is None:
+        return datetime(int(year), int(month), int(day), int(hour),
+                        int(minute), int(second), microsecond)
+    year, day_of_year = int(year), int(day_of_year)
+    if not 1 <= day_of_year <= 365 + isleap(year):
+        raise ValueError('invalid date {!r}.'.format(text))
+    return datetime(year, 1, 1, int(hour), int(minute), int(second),
+                    microsecond) + timedelta(days=day_of_year - 1)
+
+
+def parse_value(keyword, text):
+    """Convert the text of a keyword's value to its type.
+
+    :param str keyword: Keyword in :py:data:`odmpy.opm.KEYWORDS`.
+    :param str text: Value, without units.
+    """
+    value_type = KEYWORDS[keyword].type
+    if value_type is datetime:
+        return parse_date(text)
+    return value_type(text)
+
+
+def _keyword_lines(data, keyword, start, end):
+    """Find the lines of data[start:end] whose first word is `keyword`.
+
+    Uses :py:meth:`bytes.find` instead of a regular expression, which would
+    try to match at every position.
+
+    :param bytes keyword: Keyword to find.
+    :return: Iterator of (line start, keyword end, line end) offsets.
+    """
+    index = data.find(keyword, start, end)
+    while index != -1:
+        line_start = max(data.rfind(b'\n', start, index) + 1, start)
+        keyword_end = index + len(keyword)
+        following = data[keyword_end:keyword_end + 1]
+        if (not data[line_start:index].strip(b' \t')
+                and not (following.isalnum() or following == b'_')):
+            line_end = data.find(b'\n', keyword_end, end)
+            yield line_start, keyword_end, end if line_end == -1 else line_end
+        index = data.find(keyword, keyword_end, end)
+
+
+def split_messages(data):
+    """Find the OPMs in the contents of a file.
+
+    :param bytes data: File contents.
+    :return: list of (offset, length) byte ranges, one per OPM.
+    """
+    starts = [line_start for line_start, _, _ in _keyword_lines(
+        data, _MESSAGE_START, 0, len(data))]
+    if not starts:
+        return [(0, len(data))] if data.strip() else []
+    ends = starts[1:] + [len(data)]
+    return [(start, end - start) for start, end in zip(starts, ends)]
+
+
+def scan_bytes(data, keywords=SCAN_KEYWORDS):
+    """Extract keyword values from each OPM in `data`.
+
+    Each OPM is only searched until the first line of each keyword is
+    found, and other lines are not parsed.
+
+    :param data: File contents, as bytes or a :py:class:`mmap.mmap`.
+    :param keywords: Keywords in :py:data:`odmpy.opm.KEYWORDS`.
+    :return: list of (offset, length, values) tuples, one per OPM, where
+        values is a dict of parsed values of the keywords found.
+    """
+    tokens = [(keyword, keyword.encode('ascii')) for keyword in keywords]
+    messages = []
+    for offset, length in split_messages(data):
+        values = {}
+        for keyword, token in tokens:
+            for _, keyword_end, line_end in _keyword_lines(
+                    data, token, offset, offset + length):
+                match = _VALUE.match(data, keyword_end, line_end)
+                if match is not None:
+                    values[keyword] = parse_value(
+                        keyword, match.group(1).decode('utf-8'))
+                    break
+        messages.append((offset, length, values))
+    return messages
+
+
+def scan(path, keywords=SCAN_KEYWORDS):
+    """Extract keyword values from each OPM in a file, which is memory
+    mapped instead of read.
+
+    See :py:func:`scan_bytes`.
+    """
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return scan_bytes(data, keywords)
+
+
+def scan_directory(directory, keywords=SCAN_KEYWORDS, pattern='*.opm',
+                   workers=None):
+    """Scan every matching file in `directory` and its subdirectories, with
+    a thread pool.
+
+    :param str directory: Directory to scan.
+    :param keywords: Keywords in :py:data:`odmpy.opm.KEYWORDS`.
+    :param str pattern: :py:mod:`fnmatch` pattern for file names.
+    :param int workers: Number of threads. Defaults to the
+        :py:class:`~concurrent.futures.ThreadPoolExecutor` default.
+    :return: Iterator of (path, offset, length, values) tuples, in the order
+        the files are found. See :py:func:`scan_bytes`.
+
+    The directory is walked as results are taken, and files are scanned at
+    most ``2 * workers`` ahead, so memory use does not grow with the number
+    of files, and little work is left over if iteration stops early.
+    """
+    if workers is None:
+        # As ThreadPoolExecutor does.
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    paths = (os.path.join(root, name)
+             for root, _, names in os.walk(directory)
+             for name in fnmatch.filter(names, pattern))
+    keywords = tuple(keywords)
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque((path, executor.submit(scan, path, keywords))
+                        for path in islice(paths, 2 * workers))
+        while pending:
+            path, future = pending.popleft()
+            messages = future.result()
+            following = next(paths, None)
+            if following is not None:
+                pending.append(
+                    (following, executor.submit(scan, following, keywords)))
+            for offset, length, values in messages:
+                yield path, offset, length, values
+
+
+def _sections(text, start=0, end=None):
+    """Group the lines of text[start:end] into sections.
+
+    A section ends when a keyword of another section, or a keyword already
+    set, is found. Comment lines belong to the section that follows them,
+    except in the header, where they follow CCSDS_OPM_VERS. Values are not
+    parsed.
+
+    :return: Iterator of (section, comments, items, start, end) tuples,
+        where items is a list of (keyword, text after "=") pairs, and start and
+        end are the offsets in `text` of the section's lines, including the
+        comments before it.
+    """
+    section = None
+    comments = []
+    items = []
+    user_defined = []
+    offset = start
+    for line in text[start:end].splitlines(keepends=True):
+        line_start = offset
+        offset += len(line)
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith('COMMENT'):
+            if not comments:
+                comments_start = line_start
+            comments.append(stripped[8:])
+            continue
+
+        keyword, equals, value = stripped.partition('=')
+        keyword = keyword.rstrip()
+        info = KEYWORDS.get(keyword)
+        if info is None:
+            if not equals or not _KEYWORD.match(keyword):
+                raise ValueError('invalid line {!r}.'.format(line.rstrip()))
+            if not keyword.startswith(_USER_DEFINED):
+                raise ValueError('unknown keyword {!r}.'.format(keyword))
+            user_defined.append((keyword, value))
+            continue
+        if not equals:
+            raise ValueError('invalid line {!r}.'.format(line.rstrip()))
+
+        if info.section != section or keyword in keywords:
+            next_start = comments_start if comments else line_start
+            if section is not None:
+                yield (section, section_comments, items, section_start,
+                       next_start)
+            section = info.section
+            section_comments = []
+            section_start = next_start
+            items = []
+            keywords = set()
+        section_comments.extend(comments)
+        comments = []
+        keywords.add(keyword)
+        items.append((keyword, value))
+
+    if section is not None:
+        yield (section, section_comments + comments, items, section_start,
+               offset)
+    if user_defined:
+        yield 'user_defined', [], user_defined, None, None
+
+
+def _strip_value(text):
+    """Remove whitespace and units from the text after "=" in a line."""
+    text = text.strip()
+    if text.endswith(']') and '[' in text:
+        text = text[:text.rindex('[')].rstrip()
+    return text
+
+
+def _block(section, comments, items):
+    """Construct a section from the output of :py:func:`_sections`."""
+    if section == 'user_defined':
+        return {keyword[len(_USER_DEFINED):]: _strip_value(text)
+                for keyword, text in items}
+
+    arguments = {KEYWORDS[keyword].name: parse_value(keyword,
+                                                     _strip_value(text))
+                 for keyword, text in items}
+    name = None
+    if section in BLOCK_NAMES and comments:
+        name = comments.pop(0)
+    elif section == 'metadata' and comments[:1] == ['Metadata']:
+        del comments[0]
+    if comments:
+        arguments['comment'] = '\n'.join(comments)
+
+    cls = _SECTIONS[section]
+    values = dict.fromkeys(field.name for field in cls.schema)
+    values.update(arguments)
+    block = cls(**values)
+    if section in BLOCK_NAMES and name != BLOCK_NAMES[section]:
+        block.name = name
+    return block
+
+
+def _load_block(text, section, start, end):
+    """Construct and validate the data block `section` from its lines in
+    text[start:end]."""
+    blocks = [_block(*group[:3]) for group in _sections(text, start, end)
+              if group[0] == section]
+    for block in blocks:
+        block.validate_keywords()
+    if section == 'maneuver_parameters':
+        return ManeuverTimeline(blocks)
+    block, = blocks
+    return block
+
+
+class _LazyBlockContainer(DataBlockContainer):
+
+    """Data block container which calls `load` for its block when it is
+    first accessed."""
+
+    def __init__(self, container, load):
+        super().__init__(container.name, None, container.allow_multiple,
+                         container.mandatory, container.prerequisite,
+                         container.prerequisite_error)
+        self._load = load
+
+    @property
+    def loaded(self):
+        """True if the block has been parsed."""
+        return self._load is None
+
+    @property
+    def block(self):
+        if self._load is not None:
+            self._block = self._load()
+            self._load = None
+        return self._block
+
+    @block.setter
+    def block(self, value):
+        self._block = value
+        self._load = None
+
+
+class LazyData(Data):
+
+    """OPM data section whose blocks are parsed when first accessed, as
+    returned by :py:func:`loads` with ``lazy=True``.
+
+    Only the text of the OPM and the offsets of each block are kept until
+    then. Each block container has a `loaded` attribute, which is True once
+    its block has been parsed.
+
+    :param str text: OPM text.
+    :param dict ranges: Maps block names, e.g. 'state_vector', to the
+        (start, end) offsets of the block's lines in `text`.
+    """
+
+    def __init__(self, text, ranges):
+        super().__init__(state_vector=None)
+        for name, (start, end) in ranges.items():
+            attribute = '_' + name
+            setattr(self, attribute, _LazyBlockContainer(
+                getattr(self, attribute),
+                partial(_load_block, text, name, start, end)))
+        self.blocks = [getattr(self, name) for name in _DATA_BLOCKS]
+
+
+def loads(text, lazy=False):
+    """Read an OPM from a string.
+
+    The first comment of each data block is its name, as written by
+    :py:meth:`odmpy.opm.Opm.output`, so that the OPM is written back
+    unchanged.
+
+    :param bool lazy: Only parse the header, metadata and user defined
+        parameters, and parse each data block when it is first accessed.
+        The data section is then a :py:class:`LazyData`, and errors in a
+        data block are raised on first access instead.
+    :raises ValueError: if a line is invalid, a keyword is unknown or has an
+        invalid value, or a section other than maneuver parameters is
+        repeated.
+
+    Exceptions are otherwise as for :py:meth:`odmpy.opm.Opm.from_dict`.
+    """
+    sections = {}
+    ranges = {}
+    for section, comments, items, start, end in _sections(text):
+        if section != 'maneuver_parameters' and (
+                section in sections or section in ranges):
+            raise ValueError('duplicate {} section.'.format(section))
+
+        if lazy and section in BLOCK_NAMES:
+            # Maneuvers are parsed together, from the first to the last.
+            start = ranges.get(section, (start, end))[0]
+            ranges[section] = start, end
+        elif section == 'maneuver_parameters':
+            sections.setdefault(section, []).append(
+                _block(section, comments, items))
+        else:
+            sections[section] = _block(section, comments, items)
+
+    if not lazy:
+        return Opm.from_dict(sections)
+
+    for section in ('header', 'metadata'):
+        if section not in sections:
+            raise MissingBlockError(section)
+        sections[section].validate_keywords()
+    if 'state_vector' not in ranges:
+        raise MissingBlockError(BLOCK_NAMES['state_vector'])
+    return Opm._from_sections(sections, data=LazyData(text, ranges))
+
+
+def load(fp, lazy=False):
+    """Read an OPM from `fp` (a ``.read()``-supporting
+    :py:term:`file-like object`).
+
+    See :py:func:`loads`.
+    """
+    return loads(fp.read(), lazy=lazy)
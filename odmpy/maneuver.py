@@ -0,0 +1,151 @@
+"""
+Module for applying impulsive maneuvers to OPM state vectors in bulk.
+
+Velocity increments given in a local orbital frame are rotated to the
+reference frame of each state vector, using the state at ignition.
+Maneuvers are treated as impulsive, so MAN_DURATION is not used.
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.maneuver as maneuver
+"""
+import numpy as np
+
+from odmpy._arrays import datetime64, to_datetime
+from odmpy.covariance import LOCAL_FRAMES, rotation_matrices
+from odmpy.opm import (
+    Data, DataBlock, DataBlockSpacecraftParameters, DataBlockStateVector, Opm)
+from odmpy.twobody import _gravity, _initial_states, propagate
+
+__all__ = [
+    'apply',
+    'apply_maneuvers',
+]
+
+
+def apply(r, v, dv, frame):
+    """Apply impulsive velocity increments.
+
+    :param r: Positions [km], array of shape (N, 3).
+    :param v: Velocities [km/s], array of shape (N, 3).
+    :param dv: Velocity increments [km/s], array of shape (N, 3), with
+        components along the axes of `frame`.
+    :param frame: One of :py:data:`odmpy.covariance.LOCAL_FRAMES`, or the
+        frame of `r` and `v`.
+    :type frame: :py:class:`~odmpy.opm.RefFrame`
+    :return: Velocities after the maneuvers, array of shape (N, 3).
+    """
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    dv = np.asarray(dv, dtype=np.float64).reshape(-1, 3)
+    if frame not in LOCAL_FRAMES:
+        return v + dv
+    # Rows of the rotation are the local axes, so its transpose takes local
+    # components to the reference frame.
+    return v + np.einsum('nji,nj->ni', rotation_matrices(r, v, frame), dv)
+
+
+def _maneuver_blocks(opm):
+    """Return the maneuver blocks of `opm` in order of ignition."""
+    blocks = opm.data.maneuver_parameters.block
+    if blocks is None:
+        return []
+    if isinstance(blocks, DataBlock):
+        return [blocks]
+    return sorted(blocks, key=lambda block: block.man_epoch_ignition.value)
+
+
+def apply_maneuvers(opms, gm=None):
+    """Apply the maneuvers of a fleet of OPMs.
+
+    Each OPM's maneuvers are applied in order of ignition. Before each
+    maneuver, the state is propagated to the ignition epoch under two-body
+    motion if necessary. The k-th maneuvers of every OPM are applied
+    together, in one batch.
+
+    The post-maneuver OPMs share the original header and metadata. Their
+    state vector is at the last ignition epoch, and their spacecraft
+    parameters have MASS reduced by the MAN_DELTA_MASS of each maneuver.
+    Keplerian elements, covariance and the applied maneuvers are not
+    carried over. OPMs without maneuvers are returned unchanged.
+
+    :param opms: Sequence of :py:class:`~odmpy.opm.Opm` objects.
+    :param gm: Gravitational coefficient [km**3/s**2], scalar or one value
+        per OPM, used to propagate to ignition. Taken from each OPM's
+        keplerian elements block by default.
+    :return: list of :py:class:`~odmpy.opm.Opm`, one per input OPM.
+    :raises ValueError: if MAN_REF_FRAME is neither a local orbital frame nor
+        the OPM's reference frame, or GM is needed but not available.
+    """
+    opms = list(opms)
+    if not opms:
+        return []
+
+    epochs, states = _initial_states(opms)
+    maneuvers = [_maneuver_blocks(opm) for opm in opms]
+    delta_mass = np.zeros(len(opms))
+
+    for k in range(max(len(blocks) for blocks in maneuvers)):
+        members = np.array([i for i, blocks in enumerate(maneuvers)
+                            if len(blocks) > k])
+        blocks = [maneuvers[i][k] for i in members]
+
+        ignition = datetime64([block.man_epoch_ignition.value
+                               for block in blocks])
+        tof = (ignition - epochs[members]) / np.timedelta64(1, 's')
+        moving = members[tof != 0]
+        if moving.size:
+            if gm is None:
+                moving_gm = _gravity([opms[i] for i in moving], None)
+            else:
+                moving_gm = _gravity(opms, gm)[moving]
+            r, v = propagate(states[moving, :3], states[moving, 3:],
+                             moving_gm, tof[tof != 0, None])
+            states[moving, :3] = r[:, 0]
+            states[moving, 3:] = v[:, 0]
+
+        dv = np.array([[block.man_dv_1.value, block.man_dv_2.value,
+                        block.man_dv_3.value] for block in blocks],
+                      dtype=np.float64)
+
+        # Group by frame, with every inertial frame taking the identity.
+        groups = {}
+        for position, (i, block) in enumerate(zip(members, blocks)):
+            frame = block.man_ref_frame.value
+            if frame not in LOCAL_FRAMES:
+                if frame != opms[i].metadata.ref_frame.value:
+                    raise ValueError(
+                        'cannot apply maneuver in {} to a state vector in '
+                        '{}.'.format(frame.value,
+                                     opms[i].metadata.ref_frame.value))
+                frame = None
+            groups.setdefault(frame, []).append(position)
+
+        for frame, positions in groups.items():
+            i = members[positions]
+            states[i, 3:] = apply(states[i, :3], states[i, 3:],
+                                  dv[positions], frame)
+
+        epochs[members] = ignition
+        delta_mass[members] += [block.man_delta_mass.value
+                                for block in blocks]
+
+    return [opm if not blocks else _post_maneuver(opm, epoch, state, dm)
+            for opm, blocks, epoch, state, dm
+            in zip(opms, maneuvers, epochs, states.tolist(),
+                   delta_mass.tolist())]
+
+
+def _post_maneuver(opm, epoch, state, delta_mass):
+    spacecraft = opm.data.spacecraft_parameters.block
+    mass = spacecraft.mass.value
+    if mass is not None:
+        mass += delta_mass
+    spacecraft = DataBlockSpacecraftParameters(
+        mass, spacecraft.solar_rad_area.value,
+        spacecraft.solar_rad_coeff.value, spacecraft.drag_area.value,
+        spacecraft.drag_coeff.value, comment=spacecraft.comment.value)
+    data = Data(DataBlockStateVector(to_datetime(epoch), *state),
+                spacecraft_parameters=spacecraft)
+    return Opm(opm.header, opm.metadata, data, user_defined=opm.user_defined)
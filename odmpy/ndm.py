@@ -0,0 +1,164 @@
+"""
+Module for writing OPMs in the CCSDS NDM/XML format.
+
+The XML is generated line by line from the same sections as
+:py:meth:`odmpy.opm.Opm.output`, without building an element tree, so
+that batches of any number of OPMs are written in constant memory.
+
+Recommended import syntax:
+import odmpy.ndm as ndm
+"""
+from xml.sax.saxutils import escape, quoteattr
+
+from odmpy.opm import DataBlock, suffix
+
+__all__ = [
+    'Writer',
+    'output',
+    'write',
+    'write_ndm',
+]
+
+_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+_SCHEMA_ATTRIBUTES = (
+    ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"'
+    ' xsi:noNamespaceSchemaLocation='
+    '"http://sanaregistry.org/r/ndmxml/ndmxml-1.0-master.xsd"')
+
+_INDENT = '  '
+
+# Element names of the data blocks, in the order of the XML schema.
+_DATA_ELEMENTS = [
+    ('state_vector', 'stateVector'),
+    ('keplerian_elements', 'keplerianElements'),
+    ('spacecraft_parameters', 'spacecraftParameters'),
+    ('covariance_matrix', 'covarianceMatrix'),
+    ('maneuver_parameters', 'maneuverParameters'),
+]
+
+
+def _keywords(container, depth, name=None):
+    """Yield an element for each keyword which is set in `container`.
+
+    The CCSDS_OPM_VERS keyword is the version attribute of the opm element
+    instead. A block name is written as the first comment, like the KVN
+    output does.
+    """
+    container.validate_keywords()
+    indent = _INDENT * depth
+    if name is not None:
+        yield '{}<COMMENT>{}</COMMENT>'.format(indent, escape(name))
+    for field, _, value in container._set_values():
+        keyword = field.keyword
+        if keyword == 'CCSDS_OPM_VERS':
+            continue
+        text = field.formatter(value)
+        if keyword == 'COMMENT':
+            for line in text.splitlines():
+                yield '{}<COMMENT>{}</COMMENT>'.format(indent, escape(line))
+        elif field.units is None:
+            yield '{indent}<{keyword}>{text}</{keyword}>'.format(
+                indent=indent, keyword=keyword, text=escape(str(text)))
+        else:
+            yield '{indent}<{keyword} units={units}>{text}</{keyword}>'.format(
+                indent=indent, keyword=keyword, units=quoteattr(field.units),
+                text=escape(str(text)))
+
+
+def _opm_element(opm, depth, attributes=''):
+    """Yield the lines of an opm element."""
+    indent = _INDENT * depth
+    yield '{}<opm{} id="CCSDS_OPM_VERS" version={}>'.format(
+        indent, attributes, quoteattr(opm.header.opm_version.value))
+    yield indent + _INDENT + '<header>'
+    yield from _keywords(opm.header, depth + 2)
+    yield indent + _INDENT + '</header>'
+    yield indent + _INDENT + '<body>'
+    yield indent + _INDENT * 2 + '<segment>'
+    yield indent + _INDENT * 3 + '<metadata>'
+    yield from _keywords(opm.metadata, depth + 4)
+    yield indent + _INDENT * 3 + '</metadata>'
+    yield indent + _INDENT * 3 + '<data>'
+
+    block_indent = indent + _INDENT * 4
+    for section, element in _DATA_ELEMENTS:
+        blocks = getattr(opm.data, section).block
+        if blocks is None:
+            continue
+        if isinstance(blocks, DataBlock):
+            blocks = [blocks]
+        for block in blocks:
+            yield '{}<{}>'.format(block_indent, element)
+            yield from _keywords(block, depth + 5, name=block.name)
+            yield '{}</{}>'.format(block_indent, element)
+
+    if opm.user_defined is not None:
+        yield block_indent + '<userDefinedParameters>'
+        for key, value in opm.user_defined.items():
+            yield '{}<USER_DEFINED parameter={}>{}</USER_DEFINED>'.format(
+                block_indent + _INDENT, quoteattr(str(key)),
+                escape(str(value)))
+        yield block_indent + '</userDefinedParameters>'
+
+    yield indent + _INDENT * 3 + '</data>'
+    yield indent + _INDENT * 2 + '</segment>'
+    yield indent + _INDENT + '</body>'
+    yield indent + '</opm>'
+
+
+def output(opm):
+    """Return a line iterator for an XML document of one OPM.
+
+    :param opm: Instance of :py:class:`odmpy.opm.Opm`.
+    """
+    yield _DECLARATION
+    yield from _opm_element(opm, 0, _SCHEMA_ATTRIBUTES)
+
+
+def write(fp, opm):
+    """Write an XML document of one OPM to `fp` (a ``.write()``-supporting
+    :py:term:`file-like object`).
+
+    :param opm: Instance of :py:class:`odmpy.opm.Opm`.
+    """
+    fp.writelines(suffix('\n', output(opm)))
+
+
+class Writer:
+
+    """Streaming NDM writer, for a combined instantiation of many OPMs.
+
+    The opening ndm element is written immediately, and each call to
+    :py:meth:`write` appends an OPM, so only one OPM needs to be in memory
+    at a time. :py:meth:`close` writes the closing element.
+
+    :param fp: A ``.write()``-supporting :py:term:`file-like object`.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        fp.write('{}\n<ndm{}>\n'.format(_DECLARATION, _SCHEMA_ATTRIBUTES))
+
+    def write(self, opm):
+        """Write an OPM.
+
+        :param opm: Instance of :py:class:`odmpy.opm.Opm`.
+        """
+        self.fp.writelines(suffix('\n', _opm_element(opm, 1)))
+
+    def close(self):
+        """Write the closing ndm element. The file is not closed."""
+        self.fp.write('</ndm>\n')
+
+
+def write_ndm(fp, opms):
+    """Write an NDM of OPMs to `fp` (a ``.write()``-supporting
+    :py:term:`file-like object`).
+
+    :param opms: Iterable of :py:class:`odmpy.opm.Opm`. May be a generator.
+    """
+    writer = Writer(fp)
+    for opm in opms:
+        writer.write(opm)
+    writer.close()
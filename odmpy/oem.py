@@ -0,0 +1,206 @@
+"""
+Module for writing OEM files as specified in the Orbit Data Message
+Recommended Standard CCSDS 502.0-B-2
+
+Ephemerides are written one segment at a time, so that large ephemerides
+can be streamed to file without holding every segment in memory.
+
+Recommended import syntax:
+import odmpy.oem as oem
+"""
+from datetime import datetime
+
+from odmpy.opm import (
+    Field, KeywordContainer, format_date, suffix, validate_date,
+    validate_string)
+import odmpy.opm as opm
+
+__all__ = [
+    'Header',
+    'Metadata',
+    'Writer',
+    'write',
+]
+
+# Ephemeris data line: epoch followed by X, Y, Z, X_DOT, Y_DOT, Z_DOT.
+_DATA_LINE = '%s' + ' % .15e' * 6 + '\n'
+
+
+class Header(KeywordContainer):
+
+    """OEM Header object.
+
+    :param str originator: Creating agency or operator.
+    :param str oem_version: CCSDS OEM version.
+    :param creation_date: Creation date. Defaults to current time.
+    :type creation_date: :py:class:`~datetime.datetime`-like object
+    :param str comment: Single or multi-line comment.
+    """
+
+    oem_version = Field('CCSDS_OEM_VERS', type=str, validator=validate_string)
+    comment = Field('COMMENT', type=str, mandatory=False)
+    creation_date = Field(
+        'CREATION_DATE', type=datetime,
+        formatter=format_date, validator=validate_date)
+    originator = Field('ORIGINATOR', type=str, validator=validate_string)
+
+    def __init__(self, originator, oem_version='2.0', creation_date=None,
+                 comment=None):
+        """Initialise OEM Header.
+
+        Required keywords:
+        - oem_version
+        - creation_date
+        - originator
+
+        Optional keywords:
+        - comment
+        """
+        super().__init__()
+
+        if creation_date is None:
+            creation_date = datetime.utcnow()
+
+        self._values = [oem_version, comment, creation_date, originator]
+
+
+class Metadata(opm.Metadata):
+
+    """OEM segment Metadata object.
+
+    Takes the same parameters as :py:class:`odmpy.opm.Metadata`, plus:
+
+    :param start_time: Start of total time span covered by the segment.
+    :type start_time: :py:class:`~datetime.datetime`-like object
+    :param stop_time: End of total time span covered by the segment.
+    :type stop_time: :py:class:`~datetime.datetime`-like object
+    :param useable_start_time: Start of useable time span.
+    :type useable_start_time: :py:class:`~datetime.datetime`-like object
+    :param useable_stop_time: End of useable time span.
+    :type useable_stop_time: :py:class:`~datetime.datetime`-like object
+    :param str interpolation: Recommended interpolation method.
+    :param int interpolation_degree: Recommended interpolation degree.
+    """
+
+    start_time = Field(
+        'START_TIME', type=datetime,
+        formatter=format_date, validator=validate_date)
+    useable_start_time = Field(
+        'USEABLE_START_TIME', type=datetime, mandatory=False,
+        formatter=format_date, validator=validate_date)
+    useable_stop_time = Field(
+        'USEABLE_STOP_TIME', type=datetime, mandatory=False,
+        formatter=format_date, validator=validate_date)
+    stop_time = Field(
+        'STOP_TIME', type=datetime,
+        formatter=format_date, validator=validate_date)
+    interpolation = Field(
+        'INTERPOLATION', type=str, mandatory=False, validator=validate_string)
+    interpolation_degree = Field(
+        'INTERPOLATION_DEGREE', type=int, mandatory=False)
+
+    def __init__(self, object_name, object_id, center_name, ref_frame,
+                 time_system, start_time, stop_time, ref_frame_epoch=None,
+                 useable_start_time=None, useable_stop_time=None,
+                 interpolation=None, interpolation_degree=None,
+                 comment=None):
+        """Initialise OEM Metadata section.
+
+        Required keywords:
+        - object_name
+        - object_id
+        - center_name
+        - ref_frame
+        - time_system
+        - start_time
+        - stop_time
+
+        Optional keywords:
+        - comment
+        - ref_frame_epoch
+        - useable_start_time
+        - useable_stop_time
+        - interpolation
+        - interpolation_degree
+        """
+        super().__init__(object_name=object_name, object_id=object_id,
+                         center_name=center_name, ref_frame=ref_frame,
+                         time_system=time_system,
+                         ref_frame_epoch=ref_frame_epoch, comment=comment)
+
+        self._values += [start_time, useable_start_time, useable_stop_time,
+                         stop_time, interpolation, interpolation_degree]
+
+    @classmethod
+    def from_opm_metadata(cls, metadata, start_time, stop_time, **kwargs):
+        """Create OEM metadata for an object described by OPM metadata.
+
+        :param metadata: Instance of :py:class:`odmpy.opm.Metadata`.
+        :param start_time: Start of total time span covered by the segment.
+        :param stop_time: End of total time span covered by the segment.
+        :param kwargs: Optional OEM metadata keywords.
+        """
+        return cls(object_name=metadata.object_name.value,
+                   object_id=metadata.object_id.value,
+                   center_name=metadata.center_name.value,
+                   ref_frame=metadata.ref_frame.value,
+                   time_system=metadata.time_system.value,
+                   ref_frame_epoch=metadata.ref_frame_epoch.value,
+                   start_time=start_time, stop_time=stop_time, **kwargs)
+
+
+def _format_epochs(epochs):
+    """Format ephemeris epochs, converting NumPy datetime64 arrays in bulk."""
+    if getattr(getattr(epochs, 'dtype', None), 'kind', None) == 'M':
+        import numpy as np
+        return np.datetime_as_string(epochs, unit='us').tolist()
+    return [format_date(epoch) for epoch in epochs]
+
+
+class Writer:
+
+    """Streaming OEM writer.
+
+    The header is written immediately, and each call to
+    :py:meth:`write_segment` appends a segment, so an ephemeris can be
+    written as it is generated.
+
+    :param fp: A ``.write()``-supporting :py:term:`file-like object`.
+    :param header: Instance of :py:class:`odmpy.oem.Header`.
+    """
+
+    def __init__(self, fp, header):
+        self.fp = fp
+        fp.writelines(suffix('\n', header.create_output_align_equals()))
+
+    def write_segment(self, metadata, epochs, states):
+        """Write an ephemeris segment.
+
+        :param metadata: Instance of :py:class:`odmpy.oem.Metadata`.
+        :param epochs: Sequence of :py:class:`~datetime.datetime`-like
+            objects, or a ``numpy.datetime64`` array.
+        :param states: Sequence of (X, Y, Z, X_DOT, Y_DOT, Z_DOT) rows in km
+            and km/s, such as an array of shape (T, 6).
+        """
+        fp = self.fp
+        fp.write('\nMETA_START\n')
+        fp.writelines(suffix('\n', metadata.create_output_align_equals()))
+        fp.write('META_STOP\n\n')
+
+        if hasattr(states, 'tolist'):
+            states = states.tolist()
+        fp.writelines(_DATA_LINE % (epoch, *state)
+                      for epoch, state in zip(_format_epochs(epochs), states))
+
+
+def write(fp, header, segments):
+    """Write OEM to `fp` (a ``.write()``-supporting
+    :py:term:`file-like object`).
+
+    :param header: Instance of :py:class:`odmpy.oem.Header`.
+    :param segments: Iterable of (metadata, epochs, states) tuples, as
+        passed to :py:meth:`Writer.write_segment`. May be a generator.
+    """
+    writer = Writer(fp, header)
+    for metadata, epochs, states in segments:
+        writer.write_segment(metadata, epochs, states)
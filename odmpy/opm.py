@@ -5,10 +5,14 @@ Recommended Standard CCSDS 502.0-B-2
 Recommended import syntax:
 import odmpy.opm as opm
 """
+import hashlib
 import re
 import textwrap
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
 from datetime import datetime
 from enum import Enum
+from itertools import chain
 from math import floor, log10
 from numbers import Number
 
@@ -24,6 +28,7 @@ __all__ = [
     'DataBlockManeuverParameters',
     'DataBlockSpacecraftParameters',
     'DataBlockStateVector',
+    'ManeuverTimeline',
     'RefFrame',
     'TimeSystem',
 ]
@@ -283,6 +288,140 @@ class DataKeyword(Keyword):
                     units=self.units)
 
 
+class Field:
+
+    """Keyword declaration on a :py:class:`KeywordContainer` subclass.
+
+    The keyword name, units, 'mandatory', 'formatter', 'validator', and value
+    type are shared by every instance of the class, and instance values are kept in
+    a single list on the container. Accessing a field on an instance
+    returns a :py:class:`BoundKeyword`, and assigning to it sets the value::
+
+        >>> block.x.value
+        6655.9942
+        >>> block.x = 6656.0
+    """
+
+    def __init__(self, keyword, units=None, mandatory=True,
+                 formatter=lambda x: x, validator=lambda x: True,
+                 type=float):
+        self.keyword = keyword
+        self.units = units
+        self.mandatory = mandatory
+        self.formatter = formatter
+        self.validator = validator
+        self.type = type
+        self.name = None
+        self.index = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return BoundKeyword(instance, self)
+
+    def __set__(self, instance, value):
+        instance._values[self.index] = value
+
+    def __repr__(self):
+        return ('{name}('
+                'keyword={keyword!r}, '
+                'units={units!r}, '
+                'mandatory={mandatory!r})'
+               ).format(
+                    name=self.__class__.__name__,
+                    keyword=self.keyword,
+                    units=self.units,
+                    mandatory=self.mandatory)
+
+
+class ExclusiveField(Field):
+
+    """Field which cannot be set while another field is set.
+
+    :param str exclusive: Name of the other field.
+    :raises odmpy.opm.DuplicateKeywordError: on assignment if the other
+        field is set.
+    """
+
+    def __init__(self, keyword, exclusive, **kwargs):
+        super().__init__(keyword, **kwargs)
+        self.exclusive = exclusive
+
+    def __set__(self, instance, value):
+        if getattr(instance, self.exclusive).value is not None:
+            raise DuplicateKeywordError(
+                '{} already set'.format(self.exclusive))
+        super().__set__(instance, value)
+
+
+class BoundKeyword:
+
+    """Keyword of a :py:class:`Field` on a container instance.
+
+    Has the same interface as :py:class:`DataKeyword`, but reads and writes
+    its value on the container, so it is only created on access.
+    """
+
+    __slots__ = ('container', 'field')
+
+    def __init__(self, container, field):
+        self.container = container
+        self.field = field
+
+    def __repr__(self):
+        return ('{name}('
+                'keyword={keyword!r}, '
+                'value={value!r}, '
+                'mandatory={mandatory!r}, '
+                'units={units!r})'
+               ).format(
+                    name=self.__class__.__name__,
+                    keyword=self.keyword,
+                    value=self.value,
+                    mandatory=self.mandatory,
+                    units=self.units)
+
+    @property
+    def keyword(self):
+        return self.field.keyword
+
+    @property
+    def units(self):
+        return self.field.units
+
+    @property
+    def mandatory(self):
+        return self.field.mandatory
+
+    @property
+    def formatter(self):
+        return self.field.formatter
+
+    @property
+    def validator(self):
+        return self.field.validator
+
+    @property
+    def value(self):
+        return self.container._values[self.field.index]
+
+    @value.setter
+    def value(self, value):
+        self.field.__set__(self.container, value)
+
+    @property
+    def formatted_value(self):
+        """Format keyword value for writing to file."""
+        return self.field.formatter(self.value)
+
+    def is_valid(self):
+        """Check if keyword is valid."""
+        return self.field.validator(self.value)
+
+
 class KeywordContainer:
 
     """Base class of OPM keyword sections.
@@ -290,17 +429,50 @@ class KeywordContainer:
     The standard splits an orbital parameter message file into different
     sections, which will subclass KeywordContainer.
 
+    Subclasses declare their keywords as :py:class:`Field` class attributes,
+    in output order. Fields are collected into the class `schema`, after
+    those of the parent class, and each instance stores its values in the
+    list `_values`, in the same order.
+
     The main purpose of the base class is to implement the methods for
-    validating and formatting the list of keywords provided by each sublcass.
+    validating and formatting the keywords declared by each subclass.
     """
 
+    schema = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Collect the schema and precompute the keyword alignment."""
+        super().__init_subclass__(**kwargs)
+        schema = list(cls.schema)
+        names = [field.name for field in schema]
+        for name, attribute in vars(cls).items():
+            if isinstance(attribute, Field):
+                if name in names:
+                    schema[names.index(name)] = attribute
+                else:
+                    schema.append(attribute)
+                    names.append(name)
+
+        for index, field in enumerate(schema):
+            field.index = index
+
+        cls.schema = tuple(schema)
+        width = max((len(field.keyword) for field in schema), default=0)
+        cls._aligned_keywords = tuple(
+            field.keyword.ljust(width) for field in schema)
+
     def __init__(self):
-        """Initialise with empty keyword list.
+        """Initialise with unset values.
 
         Initialise super() for co-operative subclassing.
         """
         super().__init__()
-        self.keywords = list()
+        self._values = [None] * len(self.schema)
+
+    @property
+    def keywords(self):
+        """List of :py:class:`BoundKeyword`, in the order of the schema."""
+        return [BoundKeyword(self, field) for field in self.schema]
 
     def validate_keywords(self):
         """Ensures keywords are valid and set (if mandatory).
@@ -311,24 +483,25 @@ class KeywordContainer:
         This method should be called internally before data meant for output
         is produced.
         """
-        for keyword in self.keywords:
-            if keyword.mandatory and keyword.value is None:
-                raise MissingKeywordError(keyword.keyword)
-            if keyword.value is not None:
-                if not keyword.is_valid():
-                    raise ValueError('%s failed validation.' % keyword.keyword)
+        for field, value in zip(self.schema, self._values):
+            if value is None:
+                if field.mandatory:
+                    raise MissingKeywordError(field.keyword)
+            elif not field.validator(value):
+                raise ValueError('%s failed validation.' % field.keyword)
+
+    def _set_values(self):
+        """Yield (field, aligned keyword, value) for each set keyword."""
+        return ((field, keyword, value) for field, keyword, value
+                in zip(self.schema, self._aligned_keywords, self._values)
+                if value is not None)
 
     def create_output_align_equals(self):
         """Align keywords by equal sign."""
         self.validate_keywords()
-        longest_keyword_len = len(max(self.keywords,
-                                      key=lambda x: len(x.keyword)).keyword)
-        output = list()
-        for keyword in (key for key in self.keywords if key.value is not None):
-            keyword_name = keyword.keyword
-            aligned_keyword = keyword_name.ljust(longest_keyword_len)
-            value = keyword.formatted_value
-            if keyword.keyword == 'COMMENT':
+        for field, aligned_keyword, value in self._set_values():
+            value = field.formatter(value)
+            if field.keyword == 'COMMENT':
                 for comment_line in prefix('COMMENT ', value.splitlines()):
                     yield comment_line
             else:
@@ -346,8 +519,8 @@ class KeywordContainer:
         ut0 = re.compile(r'(\d)0+$')
 
         # Get all numerical keyword values for formatting.
-        numbers = (keyword.value for keyword in self.keywords
-                   if isinstance(keyword.value, Number))
+        numbers = (value for value in self._values
+                   if isinstance(value, Number))
 
         # Remove leading space
         aligned_numbers = iter(textwrap.dedent(
@@ -355,38 +528,29 @@ class KeywordContainer:
                 ut0.sub(r'\1', _align_decimal(x)) for x in numbers
             )).splitlines())
 
-        longest_keyword_len = len(
-            max(self.keywords, key=lambda x: len(x.keyword)).keyword)
-        output = list()
-
         # Already validated, so ignore unset keywords.
-        for keyword in (key for key in self.keywords if key.value is not None):
-            keyword_name = keyword.keyword
+        for field, aligned_keyword, value in self._set_values():
+            formatted_value = field.formatter(value)
 
-            if keyword_name == 'COMMENT':
-                value = keyword.formatted_value
-                for comment_line in prefix('COMMENT ', value.splitlines()):
+            if field.keyword == 'COMMENT':
+                for comment_line in prefix('COMMENT ',
+                                           formatted_value.splitlines()):
                     yield comment_line
             else:
-                aligned_keyword = keyword_name.ljust(longest_keyword_len)
-
                 # Loop through all keywords, consuming the decimal-aligned number
                 # from the iterator we made earlier.
-                if isinstance(keyword.value, Number):
+                if isinstance(value, Number):
                     # If number has not been formatted manually, use
                     # decimal-aligned number. In this case, formatted means that
                     # the formatted value is a string.
-                    if keyword.value == keyword.formatted_value:
-                        value = next(aligned_numbers)
+                    if value == formatted_value:
+                        formatted_value = next(aligned_numbers)
                     else:
                         # Consume next value from iterator, but use formatted value
                         _ = next(aligned_numbers)
-                        value = keyword.formatted_value
-                else:
-                    value = keyword.formatted_value
 
                 yield '{keyword} = {value}'.format(keyword=aligned_keyword,
-                                                   value=value)
+                                                   value=formatted_value)
 
 
 class Header(KeywordContainer):
@@ -400,6 +564,13 @@ class Header(KeywordContainer):
     :param str comment: Single or multi-line comment.
     """
 
+    opm_version = Field('CCSDS_OPM_VERS', type=str, validator=validate_string)
+    comment = Field('COMMENT', type=str, mandatory=False)
+    creation_date = Field(
+        'CREATION_DATE', type=datetime,
+        formatter=format_date, validator=validate_date)
+    originator = Field('ORIGINATOR', type=str, validator=validate_string)
+
     def __init__(self, originator, opm_version='2.0',
                  creation_date=None, comment=None):
         """Initialise OPM Header.
@@ -417,56 +588,7 @@ class Header(KeywordContainer):
         if creation_date is None:
             creation_date = datetime.utcnow()
 
-        self._opm_version = Keyword(
-            'CCSDS_OPM_VERS', opm_version, validator=validate_string)
-
-        self._comment = Keyword('COMMENT', comment, mandatory=False)
-
-        self._creation_date = Keyword(
-            'CREATION_DATE', creation_date,
-            formatter=format_date, validator=validate_date)
-
-        self._originator = Keyword(
-            'ORIGINATOR', originator, validator=validate_string)
-
-        self.keywords = [
-            self._opm_version,
-            self._comment,
-            self._creation_date,
-            self._originator
-        ]
-
-    @property
-    def opm_version(self):
-        return self._opm_version
-
-    @opm_version.setter
-    def opm_version(self, value):
-        self._opm_version.value = value
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def creation_date(self):
-        return self._creation_date
-
-    @creation_date.setter
-    def creation_date(self, value):
-        self._creation_date.value = value
-
-    @property
-    def originator(self):
-        return self._originator
-
-    @originator.setter
-    def originator(self, value):
-        self._originator.value = value
+        self._values = [opm_version, comment, creation_date, originator]
 
 
 class Metadata(KeywordContainer):
@@ -485,6 +607,17 @@ class Metadata(KeywordContainer):
     :param str comment: Single or multi-line comment.
     """
 
+    comment = Field('COMMENT', type=str, mandatory=False)
+    object_name = Field('OBJECT_NAME', type=str, validator=validate_string)
+    object_id = Field('OBJECT_ID', type=str, validator=validate_object_id)
+    center_name = Field('CENTER_NAME', type=str, validator=validate_string)
+    ref_frame = Field('REF_FRAME', type=RefFrame, formatter=lambda x: x.value)
+    ref_frame_epoch = Field(
+        'REF_FRAME_EPOCH', type=datetime, mandatory=False,
+        formatter=format_date, validator=validate_date)
+    time_system = Field(
+        'TIME_SYSTEM', type=TimeSystem, formatter=lambda x: x.value)
+
     def __init__(self, object_name, object_id, center_name, ref_frame,
                  time_system, ref_frame_epoch=None, comment=None):
         """Initialise OPM Metadata section.
@@ -501,91 +634,8 @@ class Metadata(KeywordContainer):
         - ref_frame_epoch
         """
         super().__init__()
-        self._comment = Keyword('COMMENT', comment, mandatory=False)
-        self._object_name = Keyword(
-            'OBJECT_NAME', object_name, validator=validate_string)
-
-        self._object_id = Keyword(
-            'OBJECT_ID', object_id, validator=validate_object_id)
-
-        self._center_name = Keyword(
-            'CENTER_NAME', center_name, validator=validate_string)
-
-        self._ref_frame = Keyword(
-            'REF_FRAME', ref_frame, formatter=lambda x: x.value)
-
-        self._ref_frame_epoch = Keyword(
-            'REF_FRAME_EPOCH', ref_frame_epoch, mandatory=False,
-            formatter=format_date, validator=validate_date)
-
-        self._time_system = Keyword(
-            'TIME_SYSTEM', time_system, formatter=lambda x: x.value)
-
-        self.keywords = [
-            self._comment,
-            self._object_name,
-            self._object_id,
-            self._center_name,
-            self._ref_frame,
-            self._ref_frame_epoch,
-            self._time_system
-        ]
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def object_name(self):
-        return self._object_name
-
-    @object_name.setter
-    def object_name(self, value):
-        self._object_name.value = value
-
-    @property
-    def object_id(self):
-        return self._object_id
-
-    @object_id.setter
-    def object_id(self, value):
-        self._object_id.value = value
-
-    @property
-    def center_name(self):
-        return self._center_name
-
-    @center_name.setter
-    def center_name(self, value):
-        self._center_name.value = value
-
-    @property
-    def ref_frame(self):
-        return self._ref_frame
-
-    @ref_frame.setter
-    def ref_frame(self, value):
-        self._ref_frame.value = value
-
-    @property
-    def ref_frame_epoch(self):
-        return self._ref_frame_epoch
-
-    @ref_frame_epoch.setter
-    def ref_frame_epoch(self, value):
-        self._ref_frame_epoch.value = value
-
-    @property
-    def time_system(self):
-        return self._time_system
-
-    @time_system.setter
-    def time_system(self, value):
-        self._time_system.value = value
+        self._values = [comment, object_name, object_id, center_name,
+                        ref_frame, ref_frame_epoch, time_system]
 
 
 class DataBlock:
@@ -615,6 +665,17 @@ class DataBlockStateVector(DataBlock, KeywordContainer):
     :param str comment: Single or multi-line comment.
     """
 
+    comment = Field('COMMENT', type=str, mandatory=False)
+    epoch   = Field(
+        'EPOCH', type=datetime, formatter=format_date,
+        validator=validate_date)
+    x       = Field('X', units='km')
+    y       = Field('Y', units='km')
+    z       = Field('Z', units='km')
+    x_dot   = Field('X_DOT', units='km/s')
+    y_dot   = Field('Y_DOT', units='km/s')
+    z_dot   = Field('Z_DOT', units='km/s')
+
     def __init__(self, epoch, x, y, z, x_dot, y_dot, z_dot, comment=None):
         """Initialise state vector data block.
 
@@ -631,91 +692,7 @@ class DataBlockStateVector(DataBlock, KeywordContainer):
         - comment
         """
         super().__init__()
-        self._comment = DataKeyword('COMMENT', comment, mandatory=False)
-        self._epoch   = DataKeyword(
-            'EPOCH', epoch, formatter=format_date,
-            validator=validate_date)
-        self._x       = DataKeyword('X', x, units='km')
-        self._y       = DataKeyword('Y', y, units='km')
-        self._z       = DataKeyword('Z', z, units='km')
-        self._x_dot   = DataKeyword('X_DOT', x_dot, units='km/s')
-        self._y_dot   = DataKeyword('Y_DOT', y_dot, units='km/s')
-        self._z_dot   = DataKeyword('Z_DOT', z_dot, units='km/s')
-
-        self.keywords = [
-            self._comment,
-            self._epoch,
-            self._x,
-            self._y,
-            self._z,
-            self._x_dot,
-            self._y_dot,
-            self._z_dot
-        ]
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def epoch(self):
-        return self._epoch
-
-    @epoch.setter
-    def epoch(self, value):
-        self._epoch.value = value
-
-    @property
-    def x(self):
-        return self._x
-
-    @x.setter
-    def x(self, value):
-        self._x.value = value
-
-    @property
-    def y(self):
-        return self._y
-
-    @y.setter
-    def y(self, value):
-        self._y.value = value
-
-    @property
-    def z(self):
-        return self._z
-
-    @z.setter
-    def z(self, value):
-        self._z.value = value
-
-    @property
-    def x_dot(self):
-        return self._x_dot
-
-    @x_dot.setter
-    def x_dot(self, value):
-        self._x_dot.value = value
-
-    @property
-    def y_dot(self):
-        return self._y_dot
-
-    @y_dot.setter
-    def y_dot(self, value):
-        self._y_dot.value = value
-
-    @property
-    def z_dot(self):
-        return self._z_dot
-
-    @z_dot.setter
-    def z_dot(self, value):
-        self._z_dot.value = value
+        self._values = [comment, epoch, x, y, z, x_dot, y_dot, z_dot]
 
 
 class DataBlockKeplerianElements(DataBlock, KeywordContainer):
@@ -738,6 +715,18 @@ class DataBlockKeplerianElements(DataBlock, KeywordContainer):
        validated (usually instigated by :py:class:`odmpy.opm.Opm`)
     """
 
+    comment = Field('COMMENT', type=str, mandatory=False)
+    semi_major_axis = Field('SEMI_MAJOR_AXIS', units='km')
+    eccentricity = Field('ECCENTRICITY')
+    inclination = Field('INCLINATION', units='deg')
+    ra_of_asc_node = Field('RA_OF_ASC_NODE', units='deg')
+    arg_of_pericenter = Field('ARG_OF_PERICENTER', units='deg')
+    true_anomaly = ExclusiveField(
+        'TRUE_ANOMALY', exclusive='mean_anomaly', units='deg')
+    mean_anomaly = ExclusiveField(
+        'MEAN_ANOMALY', exclusive='true_anomaly', units='deg')
+    gm = Field('GM', units='km**3/s**2')
+
     def __init__(self, semi_major_axis, eccentricity, inclination,
                  ra_of_asc_node, arg_of_pericenter, gm, true_anomaly=None,
                  mean_anomaly=None, comment=None):
@@ -756,49 +745,14 @@ class DataBlockKeplerianElements(DataBlock, KeywordContainer):
         - comment
         """
         super().__init__()
-        self._comment = DataKeyword(
-            'COMMENT', comment, mandatory=False)
-
-        self._semi_major_axis = DataKeyword(
-            'SEMI_MAJOR_AXIS', semi_major_axis, units='km')
-
-        self._eccentricity = DataKeyword(
-            'ECCENTRICITY', eccentricity)
-
-        self._inclination = DataKeyword(
-            'INCLINATION', inclination, units='deg')
-
-        self._ra_of_asc_node = DataKeyword(
-            'RA_OF_ASC_NODE', ra_of_asc_node, units='deg')
-
-        self._arg_of_pericenter = DataKeyword(
-            'ARG_OF_PERICENTER', arg_of_pericenter, units='deg')
 
         if true_anomaly is not None and mean_anomaly is not None:
             raise DuplicateKeywordError(
                 'mean_anomaly and true_anomaly cannot both be set')
 
-        self._true_anomaly = DataKeyword(
-            'TRUE_ANOMALY', true_anomaly, units='deg')
-
-        self._mean_anomaly = DataKeyword(
-            'MEAN_ANOMALY', mean_anomaly, units='deg')
-
-        self._gm = DataKeyword(
-            'GM', gm, units='km**3/s**2')
-
-        self.keywords = [
-            self._comment,
-            self._semi_major_axis,
-            self._eccentricity,
-            self._inclination,
-            self._ra_of_asc_node,
-            self._arg_of_pericenter,
-            self._true_anomaly,
-            self._mean_anomaly,
-            self._gm
-        ]
-
+        self._values = [comment, semi_major_axis, eccentricity, inclination,
+                        ra_of_asc_node, arg_of_pericenter, true_anomaly,
+                        mean_anomaly, gm]
 
     def validate_keywords(self):
         """Ensures keywords are valid and set (if mandatory).
@@ -813,95 +767,18 @@ class DataBlockKeplerianElements(DataBlock, KeywordContainer):
         case anomaly keywords.
         """
         missing_anomaly = 0
-        for keyword in self.keywords:
-            if keyword.mandatory and keyword.value is None:
-                if keyword.keyword == 'MEAN_ANOMALY' or keyword.keyword == 'TRUE_ANOMALY':
+        for field, value in zip(self.schema, self._values):
+            if value is None:
+                if field.keyword in ('MEAN_ANOMALY', 'TRUE_ANOMALY'):
                     missing_anomaly += 1
-                else:
-                    raise MissingKeywordError(keyword.keyword)
-            if keyword.value is not None:
-                if not keyword.is_valid():
-                    raise ValueError('%s failed validation.' % keyword.keyword)
+                elif field.mandatory:
+                    raise MissingKeywordError(field.keyword)
+            elif not field.validator(value):
+                raise ValueError('%s failed validation.' % field.keyword)
 
         if missing_anomaly != 1:
             raise MissingKeywordError('MEAN_ANOMALY or TRUE_ANOMALY')
 
-    @property
-    def true_anomaly(self):
-        return self._true_anomaly
-
-    @true_anomaly.setter
-    def true_anomaly(self, value):
-        if self._mean_anomaly.value is not None:
-            raise DuplicateKeywordError('mean_anomaly already set')
-        self._true_anomaly.value = value
-
-    @property
-    def mean_anomaly(self):
-        return self._mean_anomaly
-
-    @mean_anomaly.setter
-    def mean_anomaly(self, value):
-        if self._true_anomaly.value is not None:
-            raise DuplicateKeywordError('true_anomaly already set')
-        self._mean_anomaly.value = value
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def semi_major_axis(self):
-        return self._semi_major_axis
-
-    @semi_major_axis.setter
-    def semi_major_axis(self, value):
-        self._semi_major_axis.value = value
-
-    @property
-    def eccentricity(self):
-        return self._eccentricity
-
-    @eccentricity.setter
-    def eccentricity(self, value):
-        self._eccentricity.value = value
-
-    @property
-    def inclination(self):
-        return self._inclination
-
-    @inclination.setter
-    def inclination(self, value):
-        self._inclination.value = value
-
-    @property
-    def ra_of_asc_node(self):
-        return self._ra_of_asc_node
-
-    @ra_of_asc_node.setter
-    def ra_of_asc_node(self, value):
-        self._ra_of_asc_node.value = value
-
-    @property
-    def arg_of_pericenter(self):
-        return self._arg_of_pericenter
-
-    @arg_of_pericenter.setter
-    def arg_of_pericenter(self, value):
-        self._arg_of_pericenter.value = value
-
-    @property
-    def gm(self):
-        return self._gm
-
-    @gm.setter
-    def gm(self, value):
-        self._gm.value = value
-
 
 class DataBlockSpacecraftParameters(DataBlock, KeywordContainer):
 
@@ -915,6 +792,13 @@ class DataBlockSpacecraftParameters(DataBlock, KeywordContainer):
     :param str comment: Single or multi-line comment.
     """
 
+    comment = Field('COMMENT', type=str, mandatory=False)
+    mass = Field('MASS', units='kg', mandatory=False)
+    solar_rad_area = Field('SOLAR_RAD_AREA', units='m**2', mandatory=False)
+    solar_rad_coeff = Field('SOLAR_RAD_COEFF', mandatory=False)
+    drag_area = Field('DRAG_AREA', units='m**2', mandatory=False)
+    drag_coeff = Field('DRAG_COEFF', mandatory=False)
+
     def __init__(self, mass, solar_rad_area, solar_rad_coeff, drag_area,
                  drag_coeff, comment=None):
         """Initialise spacecraft parameters data block.
@@ -930,86 +814,23 @@ class DataBlockSpacecraftParameters(DataBlock, KeywordContainer):
         - comment
         """
         super().__init__()
-        self._comment = DataKeyword('COMMENT', comment, mandatory=False)
-
-        self._mass = DataKeyword('MASS', mass, units='kg', mandatory=False)
-
-        self._solar_rad_area = DataKeyword(
-            'SOLAR_RAD_AREA', solar_rad_area, units='m**2', mandatory=False)
-
-        self._solar_rad_coeff = DataKeyword(
-            'SOLAR_RAD_COEFF', solar_rad_coeff, mandatory=False)
-
-        self._drag_area = DataKeyword(
-            'DRAG_AREA', drag_area, units='m**2', mandatory=False)
-
-        self._drag_coeff = DataKeyword(
-            'DRAG_COEFF', drag_coeff, mandatory=False)
-
-        self.keywords = [
-            self._comment,
-            self._mass,
-            self._solar_rad_area,
-            self._solar_rad_coeff,
-            self._drag_area,
-            self._drag_coeff
-        ]
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def mass(self):
-        return self._mass
-
-    @mass.setter
-    def mass(self, value):
-        self._mass.value = value
-
-    @property
-    def solar_rad_area(self):
-        return self._solar_rad_area
-
-    @solar_rad_area.setter
-    def solar_rad_area(self, value):
-        self._solar_rad_area.value = value
-
-    @property
-    def y(self):
-        return self._y
-
-    @y.setter
-    def y(self, value):
-        self._y.value = value
-
-    @property
-    def solar_rad_coeff(self):
-        return self._solar_rad_coeff
-
-    @solar_rad_coeff.setter
-    def solar_rad_coeff(self, value):
-        self._solar_rad_coeff.value = value
-
-    @property
-    def drag_area(self):
-        return self._drag_area
-
-    @drag_area.setter
-    def drag_area(self, value):
-        self._drag_area.value = value
-
-    @property
-    def drag_coeff(self):
-        return self._drag_coeff
+        self._values = [comment, mass, solar_rad_area, solar_rad_coeff,
+                        drag_area, drag_coeff]
+
+
+# Covariance matrix keyword arguments in the order of the packed lower
+# triangle of the 6x6 matrix, i.e. row by row: (0, 0), (1, 0), (1, 1), ...
+COVARIANCE_KEYWORDS = [
+    'cx_x',
+    'cy_x', 'cy_y',
+    'cz_x', 'cz_y', 'cz_z',
+    'cx_dot_x', 'cx_dot_y', 'cx_dot_z', 'cx_dot_x_dot',
+    'cy_dot_x', 'cy_dot_y', 'cy_dot_z', 'cy_dot_x_dot', 'cy_dot_y_dot',
+    'cz_dot_x', 'cz_dot_y', 'cz_dot_z', 'cz_dot_x_dot', 'cz_dot_y_dot',
+    'cz_dot_z_dot',
+]
 
-    @drag_coeff.setter
-    def drag_coeff(self, value):
-        self._drag_coeff.value = value
+_LOWER_TRIANGLE = [(i, j) for i in range(6) for j in range(i + 1)]
 
 
 class DataBlockCovarianceMatrix(DataBlock, KeywordContainer):
@@ -1047,6 +868,31 @@ class DataBlockCovarianceMatrix(DataBlock, KeywordContainer):
        accepts them as `**cargs`.
     """
 
+    comment = Field('COMMENT', type=str, mandatory=False)
+    cov_ref_frame = Field('COV_REF_FRAME', type=RefFrame, mandatory=False,
+                          formatter=lambda x: x.value)
+    cx_x = Field('CX_X', units='km**2')
+    cy_x = Field('CY_X', units='km**2')
+    cy_y = Field('CY_Y', units='km**2')
+    cz_x = Field('CZ_X', units='km**2')
+    cz_y = Field('CZ_Y', units='km**2')
+    cz_z = Field('CZ_Z', units='km**2')
+    cx_dot_x = Field('CX_DOT_X', units='km**2/s')
+    cx_dot_y = Field('CX_DOT_Y', units='km**2/s')
+    cx_dot_z = Field('CX_DOT_Z', units='km**2/s')
+    cx_dot_x_dot = Field('CX_DOT_X_DOT', units='km**2/s**2')
+    cy_dot_x = Field('CY_DOT_X', units='km**2/s')
+    cy_dot_y = Field('CY_DOT_Y', units='km**2/s')
+    cy_dot_z = Field('CY_DOT_Z', units='km**2/s')
+    cy_dot_x_dot = Field('CY_DOT_X_DOT', units='km**2/s**2')
+    cy_dot_y_dot = Field('CY_DOT_Y_DOT', units='km**2/s**2')
+    cz_dot_x = Field('CZ_DOT_X', units='km**2/s')
+    cz_dot_y = Field('CZ_DOT_Y', units='km**2/s')
+    cz_dot_z = Field('CZ_DOT_Z', units='km**2/s')
+    cz_dot_x_dot = Field('CZ_DOT_X_DOT', units='km**2/s**2')
+    cz_dot_y_dot = Field('CZ_DOT_Y_DOT', units='km**2/s**2')
+    cz_dot_z_dot = Field('CZ_DOT_Z_DOT', units='km**2/s**2')
+
     def __init__(self, comment=None, cov_ref_frame=None, **cargs):
         """Initialise covariance matrix data block.
 
@@ -1078,255 +924,61 @@ class DataBlockCovarianceMatrix(DataBlock, KeywordContainer):
         - cov_ref_frame
         """
         super().__init__()
-        self._comment = DataKeyword('COMMENT', comment, mandatory=False)
-        self._cov_ref_frame = DataKeyword('COV_REF_FRAME', cov_ref_frame,
-                                          mandatory=False, formatter=lambda x: x.value)
-        self._cx_x = DataKeyword('CX_X', cargs['cx_x'], units='km**2')
-        self._cy_x = DataKeyword('CY_X', cargs['cy_x'], units='km**2')
-        self._cy_y = DataKeyword('CY_Y', cargs['cy_y'], units='km**2')
-        self._cz_x = DataKeyword('CZ_X', cargs['cz_x'], units='km**2')
-        self._cz_y = DataKeyword('CZ_Y', cargs['cz_y'], units='km**2')
-        self._cz_z = DataKeyword('CZ_Z', cargs['cz_z'], units='km**2')
-        self._cx_dot_x = DataKeyword(
-            'CX_DOT_X', cargs['cx_dot_x'], units='km**2/s')
-        self._cx_dot_y = DataKeyword(
-            'CX_DOT_Y', cargs['cx_dot_y'], units='km**2/s')
-        self._cx_dot_z = DataKeyword(
-            'CX_DOT_Z', cargs['cx_dot_z'], units='km**2/s')
-        self._cx_dot_x_dot = DataKeyword(
-            'CX_DOT_X_DOT', cargs['cx_dot_x_dot'], units='km**2/s**2')
-        self._cy_dot_x = DataKeyword(
-            'CY_DOT_X', cargs['cy_dot_x'], units='km**2/s')
-        self._cy_dot_y = DataKeyword(
-            'CY_DOT_Y', cargs['cy_dot_y'], units='km**2/s')
-        self._cy_dot_z = DataKeyword(
-            'CY_DOT_Z', cargs['cy_dot_z'], units='km**2/s')
-        self._cy_dot_x_dot = DataKeyword(
-            'CY_DOT_X_DOT', cargs['cy_dot_x_dot'], units='km**2/s**2')
-        self._cy_dot_y_dot = DataKeyword(
-            'CY_DOT_Y_DOT', cargs['cy_dot_y_dot'], units='km**2/s**2')
-        self._cz_dot_x = DataKeyword(
-            'CZ_DOT_X', cargs['cz_dot_x'], units='km**2/s')
-        self._cz_dot_y = DataKeyword(
-            'CZ_DOT_Y', cargs['cz_dot_y'], units='km**2/s')
-        self._cz_dot_z = DataKeyword(
-            'CZ_DOT_Z', cargs['cz_dot_z'], units='km**2/s')
-        self._cz_dot_x_dot = DataKeyword(
-            'CZ_DOT_X_DOT', cargs['cz_dot_x_dot'], units='km**2/s**2')
-        self._cz_dot_y_dot = DataKeyword(
-            'CZ_DOT_Y_DOT', cargs['cz_dot_y_dot'], units='km**2/s**2')
-        self._cz_dot_z_dot = DataKeyword(
-            'CZ_DOT_Z_DOT', cargs['cz_dot_z_dot'], units='km**2/s**2')
-
-        self.keywords = [
-            self._comment,
-            self._cov_ref_frame,
-            self._cx_x,
-            self._cy_x,
-            self._cy_y,
-            self._cz_x,
-            self._cz_y,
-            self._cz_z,
-            self._cx_dot_x,
-            self._cx_dot_y,
-            self._cx_dot_z,
-            self._cx_dot_x_dot,
-            self._cy_dot_x,
-            self._cy_dot_y,
-            self._cy_dot_z,
-            self._cy_dot_x_dot,
-            self._cy_dot_y_dot,
-            self._cz_dot_x,
-            self._cz_dot_y,
-            self._cz_dot_z,
-            self._cz_dot_x_dot,
-            self._cz_dot_y_dot,
-            self._cz_dot_z_dot
-        ]
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def cov_ref_frame(self):
-        return self._cov_ref_frame
-
-    @cov_ref_frame.setter
-    def cov_ref_frame(self, value):
-        self._cov_ref_frame.value = value
-
-    @property
-    def cx_x(self):
-        return self._cx_x
-
-    @cx_x.setter
-    def cx_x(self, value):
-        self._cx_x.value = value
-
-    @property
-    def cy_x(self):
-        return self._cy_x
-
-    @cy_x.setter
-    def cy_x(self, value):
-        self._cy_x.value = value
-
-    @property
-    def cy_y(self):
-        return self._cy_y
-
-    @cy_y.setter
-    def cy_y(self, value):
-        self._cy_y.value = value
-
-    @property
-    def cz_x(self):
-        return self._cz_x
-
-    @cz_x.setter
-    def cz_x(self, value):
-        self._cz_x.value = value
-
-    @property
-    def cz_y(self):
-        return self._cz_y
-
-    @cz_y.setter
-    def cz_y(self, value):
-        self._cz_y.value = value
-
-    @property
-    def cz_z(self):
-        return self._cz_z
-
-    @cz_z.setter
-    def cz_z(self, value):
-        self._cz_z.value = value
-
-    @property
-    def cx_dot_x(self):
-        return self._cx_dot_x
-
-    @cx_dot_x.setter
-    def cx_dot_x(self, value):
-        self._cx_dot_x.value = value
-
-    @property
-    def cx_dot_y(self):
-        return self._cx_dot_y
-
-    @cx_dot_y.setter
-    def cx_dot_y(self, value):
-        self._cx_dot_y.value = value
-
-    @property
-    def cx_dot_z(self):
-        return self._cx_dot_z
-
-    @cx_dot_z.setter
-    def cx_dot_z(self, value):
-        self._cx_dot_z.value = value
-
-    @property
-    def cx_dot_x_dot(self):
-        return self._cx_dot_x_dot
-
-    @cx_dot_x_dot.setter
-    def cx_dot_x_dot(self, value):
-        self._cx_dot_x_dot.value = value
-
-    @property
-    def cy_dot_x(self):
-        return self._cy_dot_x
-
-    @cy_dot_x.setter
-    def cy_dot_x(self, value):
-        self._cy_dot_x.value = value
-
-    @property
-    def cy_dot_y(self):
-        return self._cy_dot_y
-
-    @cy_dot_y.setter
-    def cy_dot_y(self, value):
-        self._cy_dot_y.value = value
-
-    @property
-    def cy_dot_z(self):
-        return self._cy_dot_z
-
-    @cy_dot_z.setter
-    def cy_dot_z(self, value):
-        self._cy_dot_z.value = value
-
-    @property
-    def cy_dot_x_dot(self):
-        return self._cy_dot_x_dot
-
-    @cy_dot_x_dot.setter
-    def cy_dot_x_dot(self, value):
-        self._cy_dot_x_dot.value = value
-
-    @property
-    def cy_dot_y_dot(self):
-        return self._cy_dot_y_dot
-
-    @cy_dot_y_dot.setter
-    def cy_dot_y_dot(self, value):
-        self._cy_dot_y_dot.value = value
-
-    @property
-    def cz_dot_x(self):
-        return self._cz_dot_x
-
-    @cz_dot_x.setter
-    def cz_dot_x(self, value):
-        self._cz_dot_x.value = value
-
-    @property
-    def cz_dot_y(self):
-        return self._cz_dot_y
-
-    @cz_dot_y.setter
-    def cz_dot_y(self, value):
-        self._cz_dot_y.value = value
-
-    @property
-    def cz_dot_z(self):
-        return self._cz_dot_z
-
-    @cz_dot_z.setter
-    def cz_dot_z(self, value):
-        self._cz_dot_z.value = value
-
-    @property
-    def cz_dot_x_dot(self):
-        return self._cz_dot_x_dot
+        self._values = [comment, cov_ref_frame]
+        self._values += [cargs[name] for name in COVARIANCE_KEYWORDS]
+
+    @classmethod
+    def from_array(cls, matrix, comment=None, cov_ref_frame=None):
+        """Create covariance matrix block from a 6x6 matrix.
+
+        :param matrix: 6x6 position/velocity covariance, such as a NumPy
+            array or nested sequence, in the units of the keywords. Only the
+            lower triangle is used.
+        :param str comment: Single or multi-line comment.
+        :param cov_ref_frame: Covariance reference frame.
+        :type cov_ref_frame: :py:class:`~odmpy.opm.RefFrame`
+        :raises ValueError: if `matrix` is not 6x6.
+        """
+        rows = [list(row) for row in matrix]
+        if len(rows) != 6 or any(len(row) != 6 for row in rows):
+            raise ValueError('covariance matrix must be 6x6.')
 
-    @cz_dot_x_dot.setter
-    def cz_dot_x_dot(self, value):
-        self._cz_dot_x_dot.value = value
+        return cls.from_packed(
+            [rows[i][j] for i, j in _LOWER_TRIANGLE],
+            comment=comment, cov_ref_frame=cov_ref_frame)
 
-    @property
-    def cz_dot_y_dot(self):
-        return self._cz_dot_y_dot
+    @classmethod
+    def from_packed(cls, values, comment=None, cov_ref_frame=None):
+        """Create covariance matrix block from the 21 elements of the lower
+        triangle, in the order of :py:data:`COVARIANCE_KEYWORDS`.
 
-    @cz_dot_y_dot.setter
-    def cz_dot_y_dot(self, value):
-        self._cz_dot_y_dot.value = value
-
-    @property
-    def cz_dot_z_dot(self):
-        return self._cz_dot_z_dot
+        :raises ValueError: if there are not 21 values.
+        """
+        values = [float(value) for value in values]
+        if len(values) != len(COVARIANCE_KEYWORDS):
+            raise ValueError('packed covariance must have {} elements.'.format(
+                len(COVARIANCE_KEYWORDS)))
+        return cls(comment=comment, cov_ref_frame=cov_ref_frame,
+                   **dict(zip(COVARIANCE_KEYWORDS, values)))
+
+    def to_packed(self):
+        """Return the lower triangle as a list of 21 values, in the order of
+        :py:data:`COVARIANCE_KEYWORDS`."""
+        # The covariance fields follow COMMENT and COV_REF_FRAME.
+        return self._values[2:]
+
+    def to_array(self):
+        """Return the covariance as a symmetric 6x6 ``numpy.ndarray``.
+
+        Requires NumPy.
+        """
+        import numpy as np
 
-    @cz_dot_z_dot.setter
-    def cz_dot_z_dot(self, value):
-        self._cz_dot_z_dot.value = value
+        matrix = np.empty((6, 6))
+        rows, columns = zip(*_LOWER_TRIANGLE)
+        matrix[rows, columns] = self.to_packed()
+        matrix[columns, rows] = matrix[rows, columns]
+        return matrix
 
 
 class DataBlockManeuverParameters(DataBlock, KeywordContainer):
@@ -1345,6 +997,19 @@ class DataBlockManeuverParameters(DataBlock, KeywordContainer):
     :param str comment: Single or multi-line comment.
     """
 
+    comment = Field('COMMENT', type=str, mandatory=False)
+    man_epoch_ignition = Field(
+        'MAN_EPOCH_IGNITION', type=datetime,
+        formatter=format_date, validator=validate_date)
+    man_duration = Field('MAN_DURATION', units='s')
+    man_delta_mass = Field(
+        'MAN_DELTA_MASS', units='kg', validator=lambda x: x < 0)
+    man_ref_frame = Field(
+        'MAN_REF_FRAME', type=RefFrame, formatter=lambda x: x.value)
+    man_dv_1 = Field('MAN_DV_1', units='km/s')
+    man_dv_2 = Field('MAN_DV_2', units='km/s')
+    man_dv_3 = Field('MAN_DV_3', units='km/s')
+
     def __init__(self, man_epoch_ignition, man_duration, man_delta_mass,
                  man_ref_frame, man_dv_1, man_dv_2, man_dv_3, comment=None):
         """Initialise maneuver parameters data block.
@@ -1362,97 +1027,111 @@ class DataBlockManeuverParameters(DataBlock, KeywordContainer):
         - comment
         """
         super().__init__()
-        self._comment = DataKeyword('COMMENT', comment, mandatory=False)
-        self._man_epoch_ignition = DataKeyword(
-            'MAN_EPOCH_IGNITION', man_epoch_ignition,
-            formatter=format_date,
-            validator=validate_date)
-        self._man_duration = DataKeyword('MAN_DURATION', man_duration,
-                                         units='s')
-        self._man_delta_mass = DataKeyword(
-            'MAN_DELTA_MASS', man_delta_mass, units='kg',
-            validator=lambda x: x < 0)
-
-        self._man_ref_frame = DataKeyword('MAN_REF_FRAME', man_ref_frame,
-                                          formatter=lambda x: x.value)
-        self._man_dv_1 = DataKeyword('MAN_DV_1', man_dv_1, units='km/s')
-        self._man_dv_2 = DataKeyword('MAN_DV_2', man_dv_2, units='km/s')
-        self._man_dv_3 = DataKeyword('MAN_DV_3', man_dv_3, units='km/s')
-
-        self.keywords = [
-            self._comment,
-            self._man_epoch_ignition,
-            self._man_duration,
-            self._man_delta_mass,
-            self._man_ref_frame,
-            self._man_dv_1,
-            self._man_dv_2,
-            self._man_dv_3
-        ]
-
-    @property
-    def comment(self):
-        return self._comment
-
-    @comment.setter
-    def comment(self, value):
-        self._comment.value = value
-
-    @property
-    def man_epoch_ignition(self):
-        return self._man_epoch_ignition
+        self._values = [comment, man_epoch_ignition, man_duration,
+                        man_delta_mass, man_ref_frame, man_dv_1, man_dv_2,
+                        man_dv_3]
 
-    @man_epoch_ignition.setter
-    def man_epoch_ignition(self, value):
-        self._man_epoch_ignition.value = value
 
-    @property
-    def man_duration(self):
-        return self._man_duration
+class ManeuverTimeline:
 
-    @man_duration.setter
-    def man_duration(self, value):
-        self._man_duration.value = value
+    """Maneuver parameters blocks sorted by ignition epoch.
 
-    @property
-    def man_delta_mass(self):
-        return self._man_delta_mass
+    Blocks are positioned by binary search on MAN_EPOCH_IGNITION, so OPMs
+    with many maneuvers can be built up and queried in any order. Blocks
+    with equal ignition epochs keep their insertion order.
 
-    @man_delta_mass.setter
-    def man_delta_mass(self, value):
-        self._man_delta_mass.value = value
+    Lookups take O(log n) time. :py:meth:`add` and :py:meth:`remove` find
+    the position in O(log n) time, but inserting into or deleting from the
+    underlying lists takes O(n) time.
 
-    @property
-    def man_ref_frame(self):
-        return self._man_ref_frame
+    The ignition epoch of each block is read when it is added, so it must
+    not be changed while the block is in the timeline. To change it, remove
+    the block, change the epoch and add the block again.
 
-    @man_ref_frame.setter
-    def man_ref_frame(self, value):
-        self._man_ref_frame.value = value
+    :param blocks: Iterable of
+        :py:class:`~odmpy.opm.DataBlockManeuverParameters`.
+    """
 
-    @property
-    def man_dv_1(self):
-        return self._man_dv_1
+    def __init__(self, blocks=()):
+        self._epochs = []
+        self._blocks = []
+        for block in blocks:
+            self.add(block)
 
-    @man_dv_1.setter
-    def man_dv_1(self, value):
-        self._man_dv_1.value = value
+    def add(self, block):
+        """Insert `block` at the position given by its ignition epoch.
 
-    @property
-    def man_dv_2(self):
-        return self._man_dv_2
+        :raises TypeError: if `block` is not a
+            :py:class:`~odmpy.opm.DataBlockManeuverParameters`.
+        :raises MissingKeywordError: if MAN_EPOCH_IGNITION is not set.
+        """
+        if not isinstance(block, DataBlockManeuverParameters):
+            raise TypeError('maneuver timeline blocks must be '
+                            'DataBlockManeuverParameters.')
+        epoch = block.man_epoch_ignition.value
+        if epoch is None:
+            raise MissingKeywordError('MAN_EPOCH_IGNITION')
+        index = bisect_right(self._epochs, epoch)
+        self._epochs.insert(index, epoch)
+        self._blocks.insert(index, block)
+
+    def remove(self, block):
+        """Remove `block` from the timeline.
+
+        :raises ValueError: if `block` is not in the timeline.
+        """
+        epoch = block.man_epoch_ignition.value
+        indices = range(0)
+        if epoch is not None:
+            indices = range(bisect_left(self._epochs, epoch),
+                            bisect_right(self._epochs, epoch))
+        # If the epoch was changed after the block was added, search the
+        # whole timeline instead.
+        for index in chain(indices, range(len(self._blocks))):
+            if self._blocks[index] is block:
+                del self._epochs[index]
+                del self._blocks[index]
+                return
+        raise ValueError('maneuver not in timeline.')
+
+    def at(self, epoch):
+        """Return the blocks that ignite at `epoch`."""
+        return self._blocks[bisect_left(self._epochs, epoch):
+                            bisect_right(self._epochs, epoch)]
+
+    def between(self, start, stop):
+        """Return the blocks that ignite in [`start`, `stop`)."""
+        return self._blocks[bisect_left(self._epochs, start):
+                            bisect_left(self._epochs, stop)]
+
+    def next(self, epoch):
+        """Return the first block that ignites after `epoch`, or None."""
+        index = bisect_right(self._epochs, epoch)
+        if index < len(self._blocks):
+            return self._blocks[index]
+        return None
+
+    def __iter__(self):
+        return iter(self._blocks)
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __getitem__(self, index):
+        return self._blocks[index]
 
-    @man_dv_2.setter
-    def man_dv_2(self, value):
-        self._man_dv_2.value = value
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._blocks)
 
-    @property
-    def man_dv_3(self):
-        return self._man_dv_3
 
-    @man_dv_3.setter
-    def man_dv_3(self, value):
-        self._man_dv_3.value = value
+# Default data block names, written as the first comment of each block.
+BLOCK_NAMES = {
+    'state_vector': 'State Vector Components',
+    'spacecraft_parameters': 'Spacecraft Parameters',
+    'keplerian_elements': 'Osculating Keplerian Elements',
+    'covariance_matrix': 'Position/Velocity Covariance Matrix',
+    'maneuver_parameters': 'Maneuver Parameters',
+}
 
 
 class DataBlockContainer:
@@ -1466,6 +1145,15 @@ class DataBlockContainer:
         self.prerequisite_error = prerequisite_error
 
 
+def _maneuver_timeline(value):
+    """Store lists of maneuvers as a timeline. Anything else is left for
+    :py:meth:`Data.validate_blocks` to check."""
+    if isinstance(value, list) and all(
+            isinstance(block, DataBlockManeuverParameters) for block in value):
+        return ManeuverTimeline(value)
+    return value
+
+
 class Data:
 
     """OPM Data object (mandatory).
@@ -1497,26 +1185,27 @@ class Data:
         - maneuver_parameters
 
         Note that maneuver_parameters can be an array of
-        DataBlockManeuverParameters
+        DataBlockManeuverParameters, which is stored as a
+        :py:class:`~odmpy.opm.ManeuverTimeline`.
         """
         self._state_vector = DataBlockContainer(
-            name='State Vector Components',
+            name=BLOCK_NAMES['state_vector'],
             block=state_vector)
         self._spacecraft_parameters = DataBlockContainer(
-            name='Spacecraft Parameters',
+            name=BLOCK_NAMES['spacecraft_parameters'],
             block=spacecraft_parameters,
             mandatory=False)
         self._keplerian_elements = DataBlockContainer(
-            name='Osculating Keplerian Elements',
+            name=BLOCK_NAMES['keplerian_elements'],
             block=keplerian_elements,
             mandatory=False)
         self._covariance_matrix = DataBlockContainer(
-            name='Position/Velocity Covariance Matrix',
+            name=BLOCK_NAMES['covariance_matrix'],
             block=covariance_matrix,
             mandatory=False)
         self._maneuver_parameters = DataBlockContainer(
-            name='Maneuver Parameters',
-            block=maneuver_parameters,
+            name=BLOCK_NAMES['maneuver_parameters'],
+            block=_maneuver_timeline(maneuver_parameters),
             mandatory=False,
             allow_multiple=True,
             prerequisite=lambda: self._spacecraft_parameters.block is not None,
@@ -1548,7 +1237,7 @@ class Data:
                 if not bc.prerequisite():
                     raise ValueError(bc.prerequisite_error)
                 if not isinstance(bc.block, DataBlock):
-                    if isinstance(bc.block, list):
+                    if isinstance(bc.block, (list, ManeuverTimeline)):
                         if not bc.allow_multiple:
                             raise ValueError('the ''{name}'' block cannot be '
                                              'repeated.'.format(name=bc.name))
@@ -1605,7 +1294,7 @@ class Data:
 
     @maneuver_parameters.setter
     def maneuver_parameters(self, value):
-        self._maneuver_parameters.block = value
+        self._maneuver_parameters.block = _maneuver_timeline(value)
 
 
 class Opm:
@@ -1637,28 +1326,287 @@ class Opm:
         self.metadata.validate_keywords()
         self.data.validate_blocks()
 
-    def write(self, fp):
+    @classmethod
+    def from_dict(cls, sections):
+        """Create an OPM from a dictionary of sections.
+
+        :param dict sections: Maps 'header', 'metadata', each data block name
+            (e.g. 'state_vector') and optionally 'user_defined' to a
+            dictionary of that section's constructor arguments.
+            'maneuver_parameters' may also be a list of dictionaries, and
+            'header' and 'metadata' may be instances to use as they are.
+        :raises TypeError: if a section has missing or unknown arguments.
+        :raises odmpy.opm.MissingKeywordError: if a mandatory keyword is None.
+        :raises odmpy.opm.MissingBlockError: if there is no header, metadata or
+            state vector.
+        :raises ValueError: if keyword validation fails.
+
+        See :py:meth:`from_records` for the construction process.
+        """
+        return cls.from_records([()], fields=(), defaults=sections)[0]
+
+    @classmethod
+    def from_records(cls, records, fields=None, defaults=None):
+        """Create OPMs from rows of values, such as a fleet of state vectors.
+
+        Columns are assigned to sections once, up front, so each row only
+        needs one constructor call per section. Every section is validated
+        once, as it is built, instead of again by each
+        :py:class:`~odmpy.opm.Opm`. Sections without columns are built once
+        and shared by all of the OPMs.
+
+        :param records: Iterable of rows: sequences of values in the order
+            of `fields`, or a NumPy structured array.
+        :param fields: Name of each column, as 'section.argument', e.g.
+            'metadata.object_id' or 'state_vector.x_dot', or as a keyword in
+            :py:data:`KEYWORDS`, e.g. 'X_DOT'. Defaults to the field names
+            of a structured array.
+        :param dict defaults: Values for every row, in the format of
+            :py:meth:`from_dict`. Columns take precedence.
+        :return: list of :py:class:`~odmpy.opm.Opm`.
+        :raises ValueError: if a field or section name is invalid, or
+            `fields` is not given for rows which are not a structured array.
+
+        Exceptions are otherwise as for :py:meth:`from_dict`.
+        """
+        if fields is None:
+            fields = getattr(getattr(records, 'dtype', None), 'names', None)
+            if fields is None:
+                raise ValueError('fields is required unless records is a '
+                                 'structured array')
+        if hasattr(records, 'dtype'):
+            records = records.tolist()
+        if defaults is None:
+            defaults = {}
+
+        columns = {}
+        for index, field in enumerate(fields):
+            info = KEYWORDS.get(field)
+            if info is not None:
+                section, argument = info.section, info.name
+            else:
+                section, _, argument = field.partition('.')
+            if section not in _SECTIONS or not argument:
+                raise ValueError('invalid field {!r}.'.format(field))
+            columns.setdefault(section, []).append((index, argument))
+
+        shared = {}
+        for section, value in defaults.items():
+            if section not in _SECTIONS:
+                raise ValueError('invalid section {!r}.'.format(section))
+            if section not in columns and value is not None:
+                shared[section] = _build(section, value)
+
+        opms = []
+        for row in records:
+            sections = dict(shared)
+            for section, arguments in columns.items():
+                values = dict(defaults.get(section) or {})
+                for index, argument in arguments:
+                    values[argument] = row[index]
+                sections[section] = _build(section, values)
+
+            opm = cls.__new__(cls)
+            opm.header = sections.get('header')
+            opm.metadata = sections.get('metadata')
+            opm.data = Data(**{name: sections.get(name)
+                               for name in _DATA_BLOCKS})
+            opm.user_defined = sections.get('user_defined')
+            if opm.header is None or opm.metadata is None:
+                raise MissingBlockError(
+                    'header' if opm.header is None else 'metadata')
+            opm.data.validate_blocks()
+            opms.append(opm)
+        return opms
+
+    @classmethod
+    def _from_sections(cls, sections, data=None):
+        """Assemble an OPM from sections which are already constructed and
+        validated, without validating them again.
+
+        :param dict sections: Maps section names to instances, as for
+            :py:meth:`from_dict`.
+        :param data: Data section to use instead of one built from the
+            data blocks in `sections`.
+        """
+        opm = cls.__new__(cls)
+        opm.header = sections['header']
+        opm.metadata = sections['metadata']
+        if data is None:
+            data = Data(**{name: sections.get(name) for name in _DATA_BLOCKS})
+        opm.data = data
+        opm.user_defined = sections.get('user_defined')
+        return opm
+
+    def write(self, fp, hasher=None):
         """Write ASCII-formatted OPM file to `fp` (a ``.write()``-supporting
-        :py:term:`file-like object`)"""
-        fp.writelines(suffix('\n', self.output()))
+        :py:term:`file-like object`)
+
+        :param hasher: Optional :py:mod:`hashlib` object, updated with the
+            UTF-8 encoded output as it is written.
+        """
+        lines = suffix('\n', self.output())
+        if hasher is not None:
+            lines = _hashing(lines, hasher)
+        fp.writelines(lines)
+
+    def digest(self, algorithm='sha256', canonical=False):
+        """Return the hex digest of the output, hashed while it is rendered.
+
+        The digest is that of the file written by :py:meth:`write`, so it
+        can be compared with existing files, or used to skip writing
+        unchanged messages.
+
+        :param str algorithm: Name of a :py:func:`hashlib.new` algorithm.
+        :param bool canonical: Leave out CREATION_DATE, so that messages
+            generated at different times have the same digest.
+        """
+        hasher = hashlib.new(algorithm)
+        lines = chain(self._output_header(canonical=canonical),
+                      self._output_data())
+        for line in suffix('\n', lines):
+            hasher.update(line.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _render(self, algorithm='sha256'):
+        """Return the output and its canonical digest, rendered once.
+
+        :return: (text, hex digest), as written by :py:meth:`write` and
+            returned by :py:meth:`digest` with `canonical` set.
+        """
+        hasher = hashlib.new(algorithm)
+        text = []
+        for line in suffix('\n', self._output_header()):
+            text.append(line)
+            if not line.startswith('CREATION_DATE'):
+                hasher.update(line.encode('utf-8'))
+        data = ''.join(suffix('\n', self._output_data()))
+        hasher.update(data.encode('utf-8'))
+        text.append(data)
+        return ''.join(text), hasher.hexdigest()
 
     def output(self):
         """Return a line iterator for an ASCII-formatted OPM file."""
+        for line in self._output_header():
+            yield line
+        for line in self._output_data():
+            yield line
+
+    def _output_header(self, canonical=False):
         for line in self.header.create_output_align_equals():
+            if canonical and line.startswith('CREATION_DATE'):
+                continue
             yield line
         yield ''
         yield 'COMMENT Metadata'
         for line in self.metadata.create_output_align_equals():
             yield line
+
+    def _output_data(self):
         for bc in self.data.blocks:
-            if bc.block is not None:
+            if bc.block is None:
+                continue
+            if isinstance(bc.block, DataBlock):
+                blocks = [bc.block]
+            else:
+                blocks = bc.block
+            for block in blocks:
                 yield ''
-                yield 'COMMENT %s' % (bc.name if bc.block.name is None
-                                      else bc.block.name)
-                for line in bc.block.create_output_align_decimal():
+                yield 'COMMENT %s' % (bc.name if block.name is None
+                                      else block.name)
+                for line in block.create_output_align_decimal():
                     yield line
         if self.user_defined is not None:
             yield ''
             for key, value in self.user_defined.items():
                 yield 'USER_DEFINED_{key} = {value}'.format(key=key,
                                                             value=value)
+
+
+_DATA_BLOCKS = ('state_vector', 'spacecraft_parameters', 'keplerian_elements',
+                'covariance_matrix', 'maneuver_parameters')
+
+_SECTIONS = {
+    'header': Header,
+    'metadata': Metadata,
+    'state_vector': DataBlockStateVector,
+    'spacecraft_parameters': DataBlockSpacecraftParameters,
+    'keplerian_elements': DataBlockKeplerianElements,
+    'covariance_matrix': DataBlockCovarianceMatrix,
+    'maneuver_parameters': DataBlockManeuverParameters,
+    'user_defined': dict,
+}
+
+
+def _schema_digest(sections):
+    """Return a digest of the keywords of each section, in order, to
+    identify data stored for this version of the schema.
+
+    :param sections: Iterable of (section name, container class) pairs.
+    :return: 8 bytes.
+    """
+    hasher = hashlib.sha256()
+    for section, container in sections:
+        keywords = ','.join(field.keyword
+                            for field in getattr(container, 'schema', ()))
+        hasher.update('{}:{}\n'.format(section, keywords).encode('ascii'))
+    return hasher.digest()[:8]
+
+
+def _hashing(lines, hasher):
+    """Update `hasher` with each line as it is consumed."""
+    for line in lines:
+        hasher.update(line.encode('utf-8'))
+        yield line
+
+
+def _build(section, values):
+    """Construct and validate a section from a dictionary of arguments.
+
+    Sections that are already constructed are validated and returned as
+    they are, and maneuver parameters may be a list.
+    """
+    cls = _SECTIONS[section]
+    if cls is dict:
+        return dict(values)
+    if section == 'maneuver_parameters' and isinstance(values, list):
+        return [_build(section, item) for item in values]
+    if isinstance(values, dict):
+        values = cls(**values)
+    values.validate_keywords()
+    return values
+
+
+KeywordInfo = namedtuple(
+    'KeywordInfo', 'section container name index type units formatter')
+KeywordInfo.__doc__ = """Registry entry for an OPM keyword.
+
+:param str section: Section name, as used by :py:meth:`Opm.from_dict`.
+:param container: Owning :py:class:`KeywordContainer` subclass.
+:param str name: Attribute and constructor argument name.
+:param int index: Position of the keyword in the container's schema.
+:param type: Value type, e.g. float or :py:class:`RefFrame`.
+:param str units: Units, or None.
+:param formatter: Function formatting the value for output.
+"""
+
+
+def _keyword_registry():
+    """Collect the fields of every OPM section, by keyword name.
+
+    COMMENT appears in every section, so it is not included.
+    """
+    registry = {}
+    for section, container in _SECTIONS.items():
+        for field in getattr(container, 'schema', ()):
+            if field.keyword == 'COMMENT':
+                continue
+            assert field.keyword not in registry, field.keyword
+            registry[field.keyword] = KeywordInfo(
+                section, container, field.name, field.index, field.type,
+                field.units, field.formatter)
+    return registry
+
+
+# Every OPM keyword apart from COMMENT, e.g. KEYWORDS['CX_DOT_Y'].
+KEYWORDS = _keyword_registry()
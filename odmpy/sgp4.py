@@ -0,0 +1,1034 @@
+"""
+Module for propagating catalogues of mean elements with SGP4/SDP4.
+
+This is a NumPy translation of the SGP4 model as revised by Vallado,
+Crawford, Hujsak and Kelso (AIAA 2006-6753), including the SDP4 deep space
+terms for objects with periods of 225 minutes or more. It follows the
+'improved' operation mode of the reference implementation. Every object in
+the catalogue is propagated to every requested time in one set of array
+operations, rather than one object at a time.
+
+Mean elements are named after the corresponding OMM keywords from the Orbit
+Data Message Recommended Standard CCSDS 502.0-B-2. Positions and velocities
+are in the TEME frame (:py:attr:`odmpy.opm.RefFrame.TEME`).
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.sgp4 as sgp4
+"""
+import numpy as np
+
+from odmpy._arrays import datetime64, to_datetime
+from odmpy.opm import DataBlockStateVector
+
+__all__ = [
+    'Propagator',
+    'GRAVITY_MODELS',
+]
+
+TWOPI = 2 * np.pi
+X2O3 = 2 / 3
+
+# Error codes match those of the reference implementation.
+ERROR_MEAN_ECCENTRICITY = 1
+ERROR_MEAN_MOTION = 2
+ERROR_PERTURBED_ECCENTRICITY = 3
+ERROR_SEMI_LATUS_RECTUM = 4
+ERROR_DECAYED = 6
+
+
+class GravityModel:
+
+    """Earth gravity constants used by SGP4.
+
+    :param float mu: Gravitational coefficient [km**3/s**2].
+    :param float radius: Equatorial radius [km].
+    :param float j2: Un-normalised J2 zonal harmonic.
+    :param float j3: Un-normalised J3 zonal harmonic.
+    :param float j4: Un-normalised J4 zonal harmonic.
+    :param float xke: Reciprocal of the time unit [1/min]. Derived
+        from `mu` and `radius` unless given.
+    """
+
+    def __init__(self, mu, radius, j2, j3, j4, xke=None):
+        if xke is None:
+            xke = 60.0 / np.sqrt(radius ** 3 / mu)
+        self.mu = mu
+        self.radius = radius
+        self.xke = xke
+        self.j2 = j2
+        self.j3 = j3
+        self.j4 = j4
+        self.j3oj2 = j3 / j2
+
+
+GRAVITY_MODELS = {
+    'wgs72old': GravityModel(mu=398600.79964, radius=6378.135,
+                             j2=0.001082616, j3=-0.00000253881,
+                             j4=-0.00000165597, xke=0.0743669161),
+    'wgs72': GravityModel(mu=398600.8, radius=6378.135, j2=0.001082616,
+                          j3=-0.00000253881, j4=-0.00000165597),
+    'wgs84': GravityModel(mu=398600.5, radius=6378.137,
+                          j2=0.00108262998905, j3=-0.00000253215306,
+                          j4=-0.00000161098761),
+}
+
+# Days from 1949 December 31 00:00 UT, the SGP4 epoch origin.
+_SGP4_EPOCH = np.datetime64('1949-12-31T00:00:00', 'us')
+
+
+def _gstime(jdut1):
+    """Greenwich sidereal time [rad] from a UT1 Julian date."""
+    tut1 = (jdut1 - 2451545.0) / 36525.0
+    temp = (-6.2e-6 * tut1 * tut1 * tut1 + 0.093104 * tut1 * tut1 +
+            (876600.0 * 3600 + 8640184.812866) * tut1 + 67310.54841)
+    return np.mod(np.radians(temp) / 240.0, TWOPI)
+
+
+class _Terms:
+
+    """Attribute bag for per-object arrays of propagation coefficients."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def subset(self, index):
+        """Return the terms for the objects at `index`."""
+        return _Terms(**{name: value[index]
+                         for name, value in self.__dict__.items()})
+
+
+def _dscom(epoch, ep, argpp, tc, inclp, nodep, np_):
+    """Deep space common items used by both secular and periodic terms."""
+    zes = 0.01675
+    zel = 0.05490
+    c1ss = 2.9864797e-6
+    c1l = 4.7968065e-7
+    zsinis = 0.39785416
+    zcosis = 0.91744867
+    zcosgs = 0.1945905
+    zsings = -0.98088458
+
+    nm = np_
+    em = ep
+    snodm = np.sin(nodep)
+    cnodm = np.cos(nodep)
+    sinomm = np.sin(argpp)
+    cosomm = np.cos(argpp)
+    sinim = np.sin(inclp)
+    cosim = np.cos(inclp)
+    emsq = em * em
+    betasq = 1.0 - emsq
+    rtemsq = np.sqrt(betasq)
+
+    day = epoch + 18261.5 + tc / 1440.0
+    xnodce = np.mod(4.5236020 - 9.2422029e-4 * day, TWOPI)
+    stem = np.sin(xnodce)
+    ctem = np.cos(xnodce)
+    zcosil = 0.91375164 - 0.03568096 * ctem
+    zsinil = np.sqrt(1.0 - zcosil * zcosil)
+    zsinhl = 0.089683511 * stem / zsinil
+    zcoshl = np.sqrt(1.0 - zsinhl * zsinhl)
+    gam = 5.8351514 + 0.0019443680 * day
+    zx = 0.39785416 * stem / zsinil
+    zy = zcoshl * ctem + 0.91744867 * zsinhl * stem
+    zx = np.arctan2(zx, zy)
+    zx = gam + zx - xnodce
+    zcosgl = np.cos(zx)
+    zsingl = np.sin(zx)
+
+    # Solar terms first, then lunar terms.
+    zcosg = zcosgs
+    zsing = zsings
+    zcosi = zcosis
+    zsini = zsinis
+    zcosh = cnodm
+    zsinh = snodm
+    cc = c1ss
+    xnoi = 1.0 / nm
+
+    terms = []
+    for body in ('sun', 'moon'):
+        a1 = zcosg * zcosh + zsing * zcosi * zsinh
+        a3 = -zsing * zcosh + zcosg * zcosi * zsinh
+        a7 = -zcosg * zsinh + zsing * zcosi * zcosh
+        a8 = zsing * zsini
+        a9 = zsing * zsinh + zcosg * zcosi * zcosh
+        a10 = zcosg * zsini
+        a2 = cosim * a7 + sinim * a8
+        a4 = cosim * a9 + sinim * a10
+        a5 = -sinim * a7 + cosim * a8
+        a6 = -sinim * a9 + cosim * a10
+
+        x1 = a1 * cosomm + a2 * sinomm
+        x2 = a3 * cosomm + a4 * sinomm
+        x3 = -a1 * sinomm + a2 * cosomm
+        x4 = -a3 * sinomm + a4 * cosomm
+        x5 = a5 * sinomm
+        x6 = a6 * sinomm
+        x7 = a5 * cosomm
+        x8 = a6 * cosomm
+
+        z31 = 12.0 * x1 * x1 - 3.0 * x3 * x3
+        z32 = 24.0 * x1 * x2 - 6.0 * x3 * x4
+        z33 = 12.0 * x2 * x2 - 3.0 * x4 * x4
+        z1 = 3.0 * (a1 * a1 + a2 * a2) + z31 * emsq
+        z2 = 6.0 * (a1 * a3 + a2 * a4) + z32 * emsq
+        z3 = 3.0 * (a3 * a3 + a4 * a4) + z33 * emsq
+        z11 = -6.0 * a1 * a5 + emsq * (-24.0 * x1 * x7 - 6.0 * x3 * x5)
+        z12 = (-6.0 * (a1 * a6 + a3 * a5) + emsq *
+               (-24.0 * (x2 * x7 + x1 * x8) - 6.0 * (x3 * x6 + x4 * x5)))
+        z13 = -6.0 * a3 * a6 + emsq * (-24.0 * x2 * x8 - 6.0 * x4 * x6)
+        z21 = 6.0 * a2 * a5 + emsq * (24.0 * x1 * x5 - 6.0 * x3 * x7)
+        z22 = (6.0 * (a4 * a5 + a2 * a6) + emsq *
+               (24.0 * (x2 * x5 + x1 * x6) - 6.0 * (x4 * x7 + x3 * x8)))
+        z23 = 6.0 * a4 * a6 + emsq * (24.0 * x2 * x6 - 6.0 * x4 * x8)
+        z1 = z1 + z1 + betasq * z31
+        z2 = z2 + z2 + betasq * z32
+        z3 = z3 + z3 + betasq * z33
+
+        s3 = cc * xnoi
+        s2 = -0.5 * s3 / rtemsq
+        s4 = s3 * rtemsq
+        s1 = -15.0 * em * s4
+        s5 = x1 * x3 + x2 * x4
+        s6 = x2 * x3 + x1 * x4
+        s7 = x2 * x4 - x1 * x3
+
+        terms.append(_Terms(
+            s1=s1, s2=s2, s3=s3, s4=s4, s5=s5, s6=s6, s7=s7,
+            z1=z1, z2=z2, z3=z3, z11=z11, z12=z12, z13=z13, z21=z21,
+            z22=z22, z23=z23, z31=z31, z32=z32, z33=z33))
+
+        zcosg = zcosgl
+        zsing = zsingl
+        zcosi = zcosil
+        zsini = zsinil
+        zcosh = zcoshl * cnodm + zsinhl * snodm
+        zsinh = snodm * zcoshl - cnodm * zsinhl
+        cc = c1l
+
+    sun, moon = terms
+
+    zmol = np.mod(4.7199672 + 0.22997150 * day - gam, TWOPI)
+    zmos = np.mod(6.2565837 + 0.017201977 * day, TWOPI)
+
+    periodics = _Terms(
+        zmol=zmol,
+        zmos=zmos,
+        se2=2.0 * sun.s1 * sun.s6,
+        se3=2.0 * sun.s1 * sun.s7,
+        si2=2.0 * sun.s2 * sun.z12,
+        si3=2.0 * sun.s2 * (sun.z13 - sun.z11),
+        sl2=-2.0 * sun.s3 * sun.z2,
+        sl3=-2.0 * sun.s3 * (sun.z3 - sun.z1),
+        sl4=-2.0 * sun.s3 * (-21.0 - 9.0 * emsq) * zes,
+        sgh2=2.0 * sun.s4 * sun.z32,
+        sgh3=2.0 * sun.s4 * (sun.z33 - sun.z31),
+        sgh4=-18.0 * sun.s4 * zes,
+        sh2=-2.0 * sun.s2 * sun.z22,
+        sh3=-2.0 * sun.s2 * (sun.z23 - sun.z21),
+        ee2=2.0 * moon.s1 * moon.s6,
+        e3=2.0 * moon.s1 * moon.s7,
+        xi2=2.0 * moon.s2 * moon.z12,
+        xi3=2.0 * moon.s2 * (moon.z13 - moon.z11),
+        xl2=-2.0 * moon.s3 * moon.z2,
+        xl3=-2.0 * moon.s3 * (moon.z3 - moon.z1),
+        xl4=-2.0 * moon.s3 * (-21.0 - 9.0 * emsq) * zel,
+        xgh2=2.0 * moon.s4 * moon.z32,
+        xgh3=2.0 * moon.s4 * (moon.z33 - moon.z31),
+        xgh4=-18.0 * moon.s4 * zel,
+        xh2=-2.0 * moon.s2 * moon.z22,
+        xh3=-2.0 * moon.s2 * (moon.z23 - moon.z21))
+
+    return sun, moon, periodics, sinim, cosim, emsq, nm
+
+
+def _dsinit(gravity, sun, moon, cosim, sinim, emsq, argpo, gsto, mo, mdot,
+            no, nodeo, nodedot, xpidot, ecco, eccsq, inclm, nm):
+    """Deep space secular rates and resonance coefficients."""
+    q22 = 1.7891679e-6
+    q31 = 2.1460748e-6
+    q33 = 2.2123015e-7
+    root22 = 1.7891679e-6
+    root44 = 7.3636953e-9
+    root54 = 2.1765803e-9
+    rptim = 4.37526908801129966e-3
+    root32 = 3.7393792e-7
+    root52 = 1.1428639e-7
+    znl = 1.5835218e-4
+    zns = 1.19459e-5
+
+    em = ecco
+
+    irez = np.zeros(np.shape(nm), dtype=np.int64)
+    irez[(0.0034906585 < nm) & (nm < 0.0052359877)] = 1
+    irez[(8.26e-3 <= nm) & (nm <= 9.24e-3) & (em >= 0.5)] = 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equatorial = ((inclm < 5.2359877e-2) |
+                      (inclm > np.pi - 5.2359877e-2))
+        nonzero_sinim = sinim != 0.0
+        safe_sinim = np.where(nonzero_sinim, sinim, 1.0)
+
+        ses = sun.s1 * zns * sun.s5
+        sis = sun.s2 * zns * (sun.z11 + sun.z13)
+        sls = -zns * sun.s3 * (sun.z1 + sun.z3 - 14.0 - 6.0 * emsq)
+        sghs = sun.s4 * zns * (sun.z31 + sun.z33 - 6.0)
+        shs = -zns * sun.s2 * (sun.z21 + sun.z23)
+        shs = np.where(equatorial, 0.0, shs)
+        shs = np.where(nonzero_sinim, shs / safe_sinim, shs)
+        sgs = sghs - cosim * shs
+
+        dedt = ses + moon.s1 * znl * moon.s5
+        didt = sis + moon.s2 * znl * (moon.z11 + moon.z13)
+        dmdt = sls - znl * moon.s3 * (moon.z1 + moon.z3 - 14.0 - 6.0 * emsq)
+        sghl = moon.s4 * znl * (moon.z31 + moon.z33 - 6.0)
+        shll = -znl * moon.s2 * (moon.z21 + moon.z23)
+        shll = np.where(equatorial, 0.0, shll)
+
+        domdt = sgs + sghl
+        dnodt = shs
+        domdt = np.where(nonzero_sinim,
+                         domdt - cosim / safe_sinim * shll, domdt)
+        dnodt = np.where(nonzero_sinim, dnodt + shll / safe_sinim, dnodt)
+
+    theta = np.mod(gsto, TWOPI)
+    aonv = (nm / gravity.xke) ** X2O3
+
+    # Half day resonance (irez == 2).
+    cosisq = cosim * cosim
+    em = ecco
+    emsq2 = eccsq
+    eoc = em * emsq2
+    low = em <= 0.65
+    g201 = -0.306 - (em - 0.64) * 0.440
+    g211 = np.where(
+        low, 3.616 - 13.2470 * em + 16.2900 * emsq2,
+        -72.099 + 331.819 * em - 508.738 * emsq2 + 266.724 * eoc)
+    g310 = np.where(
+        low, -19.302 + 117.3900 * em - 228.4190 * emsq2 + 156.5910 * eoc,
+        -346.844 + 1582.851 * em - 2415.925 * emsq2 + 1246.113 * eoc)
+    g322 = np.where(
+        low, -18.9068 + 109.7927 * em - 214.6334 * emsq2 + 146.5816 * eoc,
+        -342.585 + 1554.908 * em - 2366.899 * emsq2 + 1215.972 * eoc)
+    g410 = np.where(
+        low, -41.122 + 242.6940 * em - 471.0940 * emsq2 + 313.9530 * eoc,
+        -1052.797 + 4758.686 * em - 7193.992 * emsq2 + 3651.957 * eoc)
+    g422 = np.where(
+        low, -146.407 + 841.8800 * em - 1629.014 * emsq2 + 1083.4350 * eoc,
+        -3581.690 + 16178.110 * em - 24462.770 * emsq2 + 12422.520 * eoc)
+    g520 = np.where(
+        low, -532.114 + 3017.977 * em - 5740.032 * emsq2 + 3708.2760 * eoc,
+        np.where(
+            em > 0.715,
+            -5149.66 + 29936.92 * em - 54087.36 * emsq2 + 31324.56 * eoc,
+            1464.74 - 4664.75 * em + 3763.64 * emsq2))
+    low = em < 0.7
+    g533 = np.where(
+        low, -919.22770 + 4988.6100 * em - 9064.7700 * emsq2 + 5542.21 * eoc,
+        -37995.780 + 161616.52 * em - 229838.20 * emsq2 + 109377.94 * eoc)
+    g521 = np.where(
+        low, -822.71072 + 4568.6173 * em - 8491.4146 * emsq2 + 5337.524 * eoc,
+        -51752.104 + 218913.95 * em - 309468.16 * emsq2 + 146349.42 * eoc)
+    g532 = np.where(
+        low, -853.66600 + 4690.2500 * em - 8624.7700 * emsq2 + 5341.4 * eoc,
+        -40023.880 + 170470.89 * em - 242699.48 * emsq2 + 115605.82 * eoc)
+
+    sini2 = sinim * sinim
+    f220 = 0.75 * (1.0 + 2.0 * cosim + cosisq)
+    f221 = 1.5 * sini2
+    f321 = 1.875 * sinim * (1.0 - 2.0 * cosim - 3.0 * cosisq)
+    f322 = -1.875 * sinim * (1.0 + 2.0 * cosim - 3.0 * cosisq)
+    f441 = 35.0 * sini2 * f220
+    f442 = 39.3750 * sini2 * sini2
+    f522 = 9.84375 * sinim * (sini2 * (1.0 - 2.0 * cosim - 5.0 * cosisq) +
+                              0.33333333 * (-2.0 + 4.0 * cosim +
+                                            6.0 * cosisq))
+    f523 = sinim * (4.92187512 * sini2 * (-2.0 - 4.0 * cosim +
+                                          10.0 * cosisq) +
+                    6.56250012 * (1.0 + 2.0 * cosim - 3.0 * cosisq))
+    f542 = 29.53125 * sinim * (2.0 - 8.0 * cosim + cosisq *
+                               (-12.0 + 8.0 * cosim + 10.0 * cosisq))
+    f543 = 29.53125 * sinim * (-2.0 - 8.0 * cosim + cosisq *
+                               (12.0 + 8.0 * cosim - 10.0 * cosisq))
+    xno2 = nm * nm
+    ainv2 = aonv * aonv
+    temp1 = 3.0 * xno2 * ainv2
+    temp = temp1 * root22
+    d2201 = temp * f220 * g201
+    d2211 = temp * f221 * g211
+    temp1 = temp1 * aonv
+    temp = temp1 * root32
+    d3210 = temp * f321 * g310
+    d3222 = temp * f322 * g322
+    temp1 = temp1 * aonv
+    temp = 2.0 * temp1 * root44
+    d4410 = temp * f441 * g410
+    d4422 = temp * f442 * g422
+    temp1 = temp1 * aonv
+    temp = temp1 * root52
+    d5220 = temp * f522 * g520
+    d5232 = temp * f523 * g532
+    temp = 2.0 * temp1 * root54
+    d5421 = temp * f542 * g521
+    d5433 = temp * f543 * g533
+    xlamo2 = np.mod(mo + nodeo + nodeo - theta - theta, TWOPI)
+    xfact2 = mdot + dmdt + 2.0 * (nodedot + dnodt - rptim) - no
+
+    # One day resonance (irez == 1).
+    emsq1 = emsq
+    g200 = 1.0 + emsq1 * (-2.5 + 0.8125 * emsq1)
+    g310 = 1.0 + 2.0 * emsq1
+    g300 = 1.0 + emsq1 * (-6.0 + 6.60937 * emsq1)
+    f220 = 0.75 * (1.0 + cosim) * (1.0 + cosim)
+    f311 = (0.9375 * sinim * sinim * (1.0 + 3.0 * cosim) -
+            0.75 * (1.0 + cosim))
+    f330 = 1.0 + cosim
+    f330 = 1.875 * f330 * f330 * f330
+    del1 = 3.0 * nm * nm * aonv * aonv
+    del2 = 2.0 * del1 * f220 * g200 * q22
+    del3 = 3.0 * del1 * f330 * g300 * q33 * aonv
+    del1 = del1 * f311 * g310 * q31 * aonv
+    xlamo1 = np.mod(mo + nodeo + argpo - theta, TWOPI)
+    xfact1 = mdot + xpidot - rptim + dmdt + domdt + dnodt - no
+
+    one_day = irez == 1
+    half_day = irez == 2
+
+    def select(values, where):
+        return np.where(where, values, 0.0)
+
+    return _Terms(
+        irez=irez,
+        d2201=select(d2201, half_day), d2211=select(d2211, half_day),
+        d3210=select(d3210, half_day), d3222=select(d3222, half_day),
+        d4410=select(d4410, half_day), d4422=select(d4422, half_day),
+        d5220=select(d5220, half_day), d5232=select(d5232, half_day),
+        d5421=select(d5421, half_day), d5433=select(d5433, half_day),
+        del1=select(del1, one_day), del2=select(del2, one_day),
+        del3=select(del3, one_day),
+        xlamo=np.where(one_day, xlamo1, np.where(half_day, xlamo2, 0.0)),
+        xfact=np.where(one_day, xfact1, np.where(half_day, xfact2, 0.0)),
+        dedt=dedt, didt=didt, dmdt=dmdt, dnodt=dnodt, domdt=domdt)
+
+
+def _dspace(ds, argpo, argpdot, t, gsto, no, em, argpm, inclm, mm, nodem, nm):
+    """Deep space secular effects, including resonance integration.
+
+    The reference implementation caches the state of its Euler-Maclaurin
+    integrator between calls. Integration always restarts from epoch here,
+    which gives the same result because the integration steps are fixed.
+    """
+    fasx2 = 0.13130908
+    fasx4 = 2.8843198
+    fasx6 = 0.37448087
+    g22 = 5.7686396
+    g32 = 0.95240898
+    g44 = 1.8014998
+    g52 = 1.0508330
+    g54 = 4.4108898
+    rptim = 4.37526908801129966e-3
+    stepp = 720.0
+    step2 = 259200.0
+
+    theta = np.mod(gsto + t * rptim, TWOPI)
+    em = em + ds.dedt * t
+    inclm = inclm + ds.didt * t
+    argpm = argpm + ds.domdt * t
+    nodem = nodem + ds.dnodt * t
+    mm = mm + ds.dmdt * t
+
+    resonant = np.flatnonzero(ds.irez[:, 0] != 0)
+    if resonant.size:
+        r = ds.subset(resonant)
+        no_r = no[resonant]
+        argpo_r = argpo[resonant]
+        argpdot_r = argpdot[resonant]
+        t_r = t[resonant]
+        one_day = r.irez == 1
+
+        atime = np.zeros(t_r.shape)
+        xni = np.broadcast_to(no_r, t_r.shape).copy()
+        xli = np.broadcast_to(r.xlamo, t_r.shape).copy()
+        delt = np.where(t_r > 0.0, stepp, -stepp)
+
+        while True:
+            xldot = xni + r.xfact
+
+            # One day resonance terms.
+            xndt1 = (r.del1 * np.sin(xli - fasx2) +
+                     r.del2 * np.sin(2.0 * (xli - fasx4)) +
+                     r.del3 * np.sin(3.0 * (xli - fasx6)))
+            xnddt1 = (r.del1 * np.cos(xli - fasx2) +
+                      2.0 * r.del2 * np.cos(2.0 * (xli - fasx4)) +
+                      3.0 * r.del3 * np.cos(3.0 * (xli - fasx6)))
+
+            # Half day resonance terms.
+            xomi = argpo_r + argpdot_r * atime
+            x2omi = xomi + xomi
+            x2li = xli + xli
+            xndt2 = (r.d2201 * np.sin(x2omi + xli - g22) +
+                     r.d2211 * np.sin(xli - g22) +
+                     r.d3210 * np.sin(xomi + xli - g32) +
+                     r.d3222 * np.sin(-xomi + xli - g32) +
+                     r.d4410 * np.sin(x2omi + x2li - g44) +
+                     r.d4422 * np.sin(x2li - g44) +
+                     r.d5220 * np.sin(xomi + xli - g52) +
+                     r.d5232 * np.sin(-xomi + xli - g52) +
+                     r.d5421 * np.sin(xomi + x2li - g54) +
+                     r.d5433 * np.sin(-xomi + x2li - g54))
+            xnddt2 = (r.d2201 * np.cos(x2omi + xli - g22) +
+                      r.d2211 * np.cos(xli - g22) +
+                      r.d3210 * np.cos(xomi + xli - g32) +
+                      r.d3222 * np.cos(-xomi + xli - g32) +
+                      r.d5220 * np.cos(xomi + xli - g52) +
+                      r.d5232 * np.cos(-xomi + xli - g52) +
+                      2.0 * (r.d4410 * np.cos(x2omi + x2li - g44) +
+                             r.d4422 * np.cos(x2li - g44) +
+                             r.d5421 * np.cos(xomi + x2li - g54) +
+                             r.d5433 * np.cos(-xomi + x2li - g54)))
+
+            xndt = np.where(one_day, xndt1, xndt2)
+            xnddt = np.where(one_day, xnddt1, xnddt2) * xldot
+
+            stepping = np.abs(t_r - atime) >= stepp
+            if not stepping.any():
+                break
+            xli = np.where(stepping, xli + xldot * delt + xndt * step2, xli)
+            xni = np.where(stepping, xni + xndt * delt + xnddt * step2, xni)
+            atime = np.where(stepping, atime + delt, atime)
+
+        ft = t_r - atime
+        nm_r = xni + xndt * ft + xnddt * ft * ft * 0.5
+        xl = xli + xldot * ft + xndt * ft * ft * 0.5
+        theta_r = theta[resonant]
+        mm[resonant] = np.where(
+            one_day, xl - nodem[resonant] - argpm[resonant] + theta_r,
+            xl - 2.0 * nodem[resonant] + 2.0 * theta_r)
+        nm[resonant] = no_r + (nm_r - no_r)
+
+    return em, argpm, inclm, mm, nodem, nm
+
+
+def _dpper(dp, t, ep, inclp, nodep, argpp, mp):
+    """Deep space long period periodic contributions to the mean elements."""
+    zns = 1.19459e-5
+    zes = 0.01675
+    znl = 1.5835218e-4
+    zel = 0.05490
+
+    zm = dp.zmos + zns * t
+    zf = zm + 2.0 * zes * np.sin(zm)
+    sinzf = np.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * np.cos(zf)
+    ses = dp.se2 * f2 + dp.se3 * f3
+    sis = dp.si2 * f2 + dp.si3 * f3
+    sls = dp.sl2 * f2 + dp.sl3 * f3 + dp.sl4 * sinzf
+    sghs = dp.sgh2 * f2 + dp.sgh3 * f3 + dp.sgh4 * sinzf
+    shs = dp.sh2 * f2 + dp.sh3 * f3
+
+    zm = dp.zmol + znl * t
+    zf = zm + 2.0 * zel * np.sin(zm)
+    sinzf = np.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * np.cos(zf)
+    sel = dp.ee2 * f2 + dp.e3 * f3
+    sil = dp.xi2 * f2 + dp.xi3 * f3
+    sll = dp.xl2 * f2 + dp.xl3 * f3 + dp.xl4 * sinzf
+    sghl = dp.xgh2 * f2 + dp.xgh3 * f3 + dp.xgh4 * sinzf
+    shll = dp.xh2 * f2 + dp.xh3 * f3
+
+    pe = ses + sel
+    pinc = sis + sil
+    pl = sls + sll
+    pgh = sghs + sghl
+    ph = shs + shll
+
+    inclp = inclp + pinc
+    ep = ep + pe
+    sinip = np.sin(inclp)
+    cosip = np.cos(inclp)
+
+    # Apply periodics directly above 0.2 rad of (perturbed) inclination,
+    # otherwise use the Lyddane modification.
+    direct = inclp >= 0.2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ph_direct = ph / sinip
+    pgh_direct = pgh - cosip * ph_direct
+    argpp_direct = argpp + pgh_direct
+    nodep_direct = nodep + ph_direct
+
+    sinop = np.sin(nodep)
+    cosop = np.cos(nodep)
+    alfdp = sinip * sinop + (ph * cosop + pinc * cosip * sinop)
+    betdp = sinip * cosop + (-ph * sinop + pinc * cosip * cosop)
+    xnoh = np.fmod(nodep, TWOPI)
+    xls = mp + argpp + pl + pgh + (cosip - pinc * sinip) * xnoh
+    nodep_lyddane = np.arctan2(alfdp, betdp)
+    wrap = np.abs(xnoh - nodep_lyddane) > np.pi
+    nodep_lyddane = np.where(
+        wrap & (nodep_lyddane < xnoh), nodep_lyddane + TWOPI,
+        np.where(wrap, nodep_lyddane - TWOPI, nodep_lyddane))
+    mp = mp + pl
+    argpp_lyddane = xls - mp - cosip * nodep_lyddane
+
+    nodep = np.where(direct, nodep_direct, nodep_lyddane)
+    argpp = np.where(direct, argpp_direct, argpp_lyddane)
+    return ep, inclp, nodep, argpp, mp
+
+
+class Propagator:
+
+    """SGP4/SDP4 propagator for a catalogue of mean elements.
+
+    Each parameter is a scalar or an array-like with one entry per object.
+    Scalars are broadcast across the catalogue.
+
+    :param epoch: Epoch of mean elements, as :py:class:`~datetime.datetime`
+        objects or a ``numpy.datetime64`` array.
+    :param mean_motion: Mean motion [rev/day].
+    :param eccentricity: Eccentricity [--].
+    :param inclination: Inclination [deg].
+    :param ra_of_asc_node: Right ascension of the ascending node [deg].
+    :param arg_of_pericenter: Argument of pericenter [deg].
+    :param mean_anomaly: Mean anomaly [deg].
+    :param bstar: Drag term [1/ER].
+    :param str gravity: Name of a gravity model in :py:data:`GRAVITY_MODELS`.
+        Element sets are generated with WGS-72, the default.
+    """
+
+    def __init__(self, epoch, mean_motion, eccentricity, inclination,
+                 ra_of_asc_node, arg_of_pericenter, mean_anomaly, bstar=0,
+                 gravity='wgs72'):
+        (epoch, mean_motion, eccentricity, inclination, ra_of_asc_node,
+         arg_of_pericenter, mean_anomaly, bstar) = (
+            np.atleast_1d(a) for a in np.broadcast_arrays(
+                datetime64(epoch), mean_motion, eccentricity, inclination,
+                ra_of_asc_node, arg_of_pericenter, mean_anomaly, bstar))
+
+        self.epoch = epoch
+        self.gravity = GRAVITY_MODELS[gravity]
+
+        # Elements are stored as column vectors, so that they broadcast
+        # against (objects, times) arrays during propagation.
+        def column(values, scale=1.0):
+            return (np.asarray(values, dtype=np.float64) * scale)[:, None]
+
+        self._initialise(
+            epoch=column((epoch - _SGP4_EPOCH) / np.timedelta64(1, 'D')),
+            no_kozai=column(mean_motion, TWOPI / 1440.0),
+            ecco=column(eccentricity),
+            inclo=column(inclination, np.pi / 180),
+            nodeo=column(ra_of_asc_node, np.pi / 180),
+            argpo=column(arg_of_pericenter, np.pi / 180),
+            mo=column(mean_anomaly, np.pi / 180),
+            bstar=column(bstar))
+
+    def __len__(self):
+        return len(self.epoch)
+
+    def _initialise(self, epoch, no_kozai, ecco, inclo, nodeo, argpo, mo,
+                    bstar):
+        """Compute the propagation coefficients (sgp4init)."""
+        gravity = self.gravity
+        radius = gravity.radius
+        j2 = gravity.j2
+        j3oj2 = gravity.j3oj2
+        j4 = gravity.j4
+        temp4 = 1.5e-12
+
+        ss = 78.0 / radius + 1.0
+        qzms2t = ((120.0 - 78.0) / radius) ** 4
+
+        # initl: recover original mean motion and semi-major axis.
+        eccsq = ecco * ecco
+        omeosq = 1.0 - eccsq
+        rteosq = np.sqrt(omeosq)
+        cosio = np.cos(inclo)
+        cosio2 = cosio * cosio
+        ak = (gravity.xke / no_kozai) ** X2O3
+        d1 = 0.75 * j2 * (3.0 * cosio2 - 1.0) / (rteosq * omeosq)
+        del_ = d1 / (ak * ak)
+        adel = ak * (1.0 - del_ * del_ - del_ *
+                     (1.0 / 3.0 + 134.0 * del_ * del_ / 81.0))
+        del_ = d1 / (adel * adel)
+        no = no_kozai / (1.0 + del_)
+        ao = (gravity.xke / no) ** X2O3
+        sinio = np.sin(inclo)
+        po = ao * omeosq
+        con42 = 1.0 - 5.0 * cosio2
+        con41 = -con42 - cosio2 - cosio2
+        posq = po * po
+        rp = ao * (1.0 - ecco)
+        gsto = _gstime(epoch + 2433281.5)
+
+        isimp = rp < 220.0 / radius + 1.0
+
+        perige = (rp - 1.0) * radius
+        sfour = np.where(perige < 98.0, 20.0, perige - 78.0)
+        qzms24 = ((120.0 - sfour) / radius) ** 4
+        sfour = sfour / radius + 1.0
+        low_perigee = perige < 156.0
+        sfour = np.where(low_perigee, sfour, ss)
+        qzms24 = np.where(low_perigee, qzms24, qzms2t)
+
+        pinvsq = 1.0 / posq
+        tsi = 1.0 / (ao - sfour)
+        eta = ao * ecco * tsi
+        etasq = eta * eta
+        eeta = ecco * eta
+        psisq = np.abs(1.0 - etasq)
+        coef = qzms24 * tsi ** 4
+        coef1 = coef / psisq ** 3.5
+        cc2 = coef1 * no * (ao * (1.0 + 1.5 * etasq + eeta *
+                                  (4.0 + etasq)) +
+                            0.375 * j2 * tsi / psisq * con41 *
+                            (8.0 + 3.0 * etasq * (8.0 + etasq)))
+        cc1 = bstar * cc2
+
+        eccentric = ecco > 1.0e-4
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cc3 = np.where(eccentric,
+                           -2.0 * coef * tsi * j3oj2 * no * sinio / ecco,
+                           0.0)
+            xmcof = np.where(eccentric, -X2O3 * coef * bstar / eeta, 0.0)
+
+        x1mth2 = 1.0 - cosio2
+        cc4 = (2.0 * no * coef1 * ao * omeosq *
+               (eta * (2.0 + 0.5 * etasq) + ecco * (0.5 + 2.0 * etasq) -
+                j2 * tsi / (ao * psisq) *
+                (-3.0 * con41 * (1.0 - 2.0 * eeta + etasq *
+                                 (1.5 - 0.5 * eeta)) +
+                 0.75 * x1mth2 * (2.0 * etasq - eeta * (1.0 + etasq)) *
+                 np.cos(2.0 * argpo))))
+        cc5 = (2.0 * coef1 * ao * omeosq *
+               (1.0 + 2.75 * (etasq + eeta) + eeta * etasq))
+        cosio4 = cosio2 * cosio2
+        temp1 = 1.5 * j2 * pinvsq * no
+        temp2 = 0.5 * temp1 * j2 * pinvsq
+        temp3 = -0.46875 * j4 * pinvsq * pinvsq * no
+        mdot = (no + 0.5 * temp1 * rteosq * con41 + 0.0625 * temp2 *
+                rteosq * (13.0 - 78.0 * cosio2 + 137.0 * cosio4))
+        argpdot = (-0.5 * temp1 * con42 + 0.0625 * temp2 *
+                   (7.0 - 114.0 * cosio2 + 395.0 * cosio4) +
+                   temp3 * (3.0 - 36.0 * cosio2 + 49.0 * cosio4))
+        xhdot1 = -temp1 * cosio
+        nodedot = xhdot1 + (0.5 * temp2 * (4.0 - 19.0 * cosio2) +
+                            2.0 * temp3 * (3.0 - 7.0 * cosio2)) * cosio
+        xpidot = argpdot + nodedot
+        omgcof = bstar * cc3 * np.cos(argpo)
+        nodecf = 3.5 * omeosq * xhdot1 * cc1
+        t2cof = 1.5 * cc1
+        xlcof = (-0.25 * j3oj2 * sinio * (3.0 + 5.0 * cosio) /
+                 np.where(np.abs(cosio + 1.0) > 1.5e-12, 1.0 + cosio, temp4))
+        aycof = -0.5 * j3oj2 * sinio
+        delmo = (1.0 + eta * np.cos(mo)) ** 3
+        sinmao = np.sin(mo)
+        x7thm1 = 7.0 * cosio2 - 1.0
+
+        deep = TWOPI / no >= 225.0
+        isimp |= deep
+
+        cc1sq = cc1 * cc1
+        d2 = 4.0 * ao * tsi * cc1sq
+        temp = d2 * tsi * cc1 / 3.0
+        d3 = (17.0 * ao + sfour) * temp
+        d4 = 0.5 * temp * ao * tsi * (221.0 * ao + 31.0 * sfour) * cc1
+        t3cof = d2 + 2.0 * cc1sq
+        t4cof = 0.25 * (3.0 * d3 + cc1 * (12.0 * d2 + 10.0 * cc1sq))
+        t5cof = 0.2 * (3.0 * d4 + 12.0 * cc1 * d3 + 6.0 * d2 * d2 +
+                       15.0 * cc1sq * (2.0 * d2 + cc1sq))
+
+        # The simplified model drops these terms entirely. Zeroing their
+        # coefficients gives exactly the same result with one code path.
+        def unless_simple(values):
+            return np.where(isimp, 0.0, values)
+
+        self._terms = _Terms(
+            no=no, ecco=ecco, inclo=inclo, nodeo=nodeo, argpo=argpo, mo=mo,
+            bstar=bstar, gsto=gsto, eta=eta, cc1=cc1, cc4=cc4,
+            cc5=unless_simple(cc5), d2=unless_simple(d2),
+            d3=unless_simple(d3), d4=unless_simple(d4),
+            t2cof=t2cof, t3cof=unless_simple(t3cof),
+            t4cof=unless_simple(t4cof), t5cof=unless_simple(t5cof),
+            omgcof=unless_simple(omgcof), xmcof=unless_simple(xmcof),
+            delmo=delmo, sinmao=sinmao, mdot=mdot, argpdot=argpdot,
+            nodedot=nodedot, nodecf=nodecf, xlcof=xlcof, aycof=aycof,
+            con41=con41, x1mth2=x1mth2, x7thm1=x7thm1)
+
+        self._deep_index = np.flatnonzero(deep[:, 0])
+        if self._deep_index.size:
+            i = self._deep_index
+            sun, moon, periodics, sinim, cosim, emsq, nm = _dscom(
+                epoch[i], ecco[i], argpo[i], 0.0, inclo[i], nodeo[i], no[i])
+            self._periodics = periodics
+            self._secular = _dsinit(
+                gravity, sun, moon, cosim, sinim, emsq, argpo[i], gsto[i],
+                mo[i], mdot[i], no[i], nodeo[i], nodedot[i], xpidot[i],
+                ecco[i], eccsq[i], inclo[i], nm)
+
+    def propagate(self, tsince):
+        """Propagate every object by `tsince` minutes from its own epoch.
+
+        :param tsince: Minutes since epoch, either an array of shape (T,)
+            applied to every object, or an array of shape (N, T).
+        :return: (r, v, error) arrays of shape (N, T, 3), (N, T, 3), and
+            (N, T). Positions are in km and velocities in km/s, in the TEME
+            frame. Non-zero error codes follow the reference
+            implementation; positions and velocities are NaN for codes 1-4.
+        """
+        gravity = self.gravity
+        s = self._terms
+        n = len(self)
+
+        t = np.asarray(tsince, dtype=np.float64)
+        if t.ndim < 2:
+            t = np.broadcast_to(np.atleast_1d(t), (n, t.size))
+        t = np.ascontiguousarray(t)
+        shape = t.shape
+        error = np.zeros(shape, dtype=np.int8)
+
+        vkmpersec = gravity.radius * gravity.xke / 60.0
+
+        xmdf = s.mo + s.mdot * t
+        argpdf = s.argpo + s.argpdot * t
+        nodedf = s.nodeo + s.nodedot * t
+        t2 = t * t
+        nodem = nodedf + s.nodecf * t2
+        tempa = 1.0 - s.cc1 * t
+        tempe = s.bstar * s.cc4 * t
+        templ = s.t2cof * t2
+
+        delomg = s.omgcof * t
+        delm = s.xmcof * ((1.0 + s.eta * np.cos(xmdf)) ** 3 - s.delmo)
+        temp = delomg + delm
+        mm = xmdf + temp
+        argpm = argpdf - temp
+        t3 = t2 * t
+        t4 = t3 * t
+        tempa = tempa - s.d2 * t2 - s.d3 * t3 - s.d4 * t4
+        tempe = tempe + s.bstar * s.cc5 * (np.sin(mm) - s.sinmao)
+        templ = templ + s.t3cof * t3 + t4 * (s.t4cof + t * s.t5cof)
+
+        nm = np.broadcast_to(s.no, shape).copy()
+        em = np.broadcast_to(s.ecco, shape).copy()
+        inclm = np.broadcast_to(s.inclo, shape).copy()
+
+        deep = self._deep_index
+        if deep.size:
+            (em[deep], argpm[deep], inclm[deep], mm[deep], nodem[deep],
+             nm[deep]) = _dspace(
+                self._secular, s.argpo[deep], s.argpdot[deep], t[deep],
+                s.gsto[deep], s.no[deep], em[deep], argpm[deep],
+                inclm[deep], mm[deep], nodem[deep], nm[deep])
+
+        error[nm <= 0.0] = ERROR_MEAN_MOTION
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            am = (gravity.xke / nm) ** X2O3 * tempa * tempa
+            nm = gravity.xke / am ** 1.5
+        em = em - tempe
+
+        bad = (error == 0) & ((em >= 1.0) | (em < -0.001))
+        error[bad] = ERROR_MEAN_ECCENTRICITY
+        em = np.maximum(em, 1.0e-6)
+
+        mm = mm + s.no * templ
+        xlm = mm + argpm + nodem
+        nodem = np.fmod(nodem, TWOPI)
+        argpm = np.mod(argpm, TWOPI)
+        xlm = np.mod(xlm, TWOPI)
+        mm = np.mod(xlm - argpm - nodem, TWOPI)
+
+        ep = em
+        xincp = inclm
+        argpp = argpm
+        nodep = nodem
+        mp = mm
+        sinip = np.broadcast_to(np.sin(s.inclo), shape).copy()
+        cosip = np.broadcast_to(np.cos(s.inclo), shape).copy()
+        aycof = np.broadcast_to(s.aycof, shape).copy()
+        xlcof = np.broadcast_to(s.xlcof, shape).copy()
+        con41 = np.broadcast_to(s.con41, shape).copy()
+        x1mth2 = np.broadcast_to(s.x1mth2, shape).copy()
+        x7thm1 = np.broadcast_to(s.x7thm1, shape).copy()
+
+        if deep.size:
+            ep_d, xincp_d, nodep_d, argpp_d, mp_d = _dpper(
+                self._periodics, t[deep], ep[deep], xincp[deep],
+                nodep[deep], argpp[deep], mp[deep])
+
+            negative = xincp_d < 0.0
+            xincp_d = np.where(negative, -xincp_d, xincp_d)
+            nodep_d = np.where(negative, nodep_d + np.pi, nodep_d)
+            argpp_d = np.where(negative, argpp_d - np.pi, argpp_d)
+
+            bad = (error[deep] == 0) & ((ep_d < 0.0) | (ep_d > 1.0))
+            error[deep] = np.where(bad, ERROR_PERTURBED_ECCENTRICITY,
+                                   error[deep])
+
+            ep[deep], xincp[deep], nodep[deep], argpp[deep], mp[deep] = (
+                ep_d, xincp_d, nodep_d, argpp_d, mp_d)
+
+            sinip_d = np.sin(xincp_d)
+            cosip_d = np.cos(xincp_d)
+            sinip[deep] = sinip_d
+            cosip[deep] = cosip_d
+            aycof[deep] = -0.5 * gravity.j3oj2 * sinip_d
+            xlcof[deep] = (-0.25 * gravity.j3oj2 * sinip_d *
+                           (3.0 + 5.0 * cosip_d) /
+                           np.where(np.abs(cosip_d + 1.0) > 1.5e-12,
+                                    1.0 + cosip_d, 1.5e-12))
+            cosisq = cosip_d * cosip_d
+            con41[deep] = 3.0 * cosisq - 1.0
+            x1mth2[deep] = 1.0 - cosisq
+            x7thm1[deep] = 7.0 * cosisq - 1.0
+
+        # Long period periodics.
+        axnl = ep * np.cos(argpp)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            temp = 1.0 / (am * (1.0 - ep * ep))
+        aynl = ep * np.sin(argpp) + temp * aycof
+        xl = mp + argpp + nodep + temp * xlcof * axnl
+
+        # Solve Kepler's equation.
+        u = np.mod(xl - nodep, TWOPI)
+        eo1 = u
+        sineo1 = np.zeros(shape)
+        coseo1 = np.zeros(shape)
+        solving = np.ones(shape, dtype=bool)
+        for _ in range(10):
+            sin_e = np.sin(eo1)
+            cos_e = np.cos(eo1)
+            sineo1 = np.where(solving, sin_e, sineo1)
+            coseo1 = np.where(solving, cos_e, coseo1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tem5 = ((u - aynl * cos_e + axnl * sin_e - eo1) /
+                        (1.0 - cos_e * axnl - sin_e * aynl))
+            tem5 = np.clip(tem5, -0.95, 0.95)
+            eo1 = np.where(solving, eo1 + tem5, eo1)
+            solving &= np.abs(tem5) >= 1.0e-12
+            if not solving.any():
+                break
+
+        # Short period preliminary quantities.
+        ecose = axnl * coseo1 + aynl * sineo1
+        esine = axnl * sineo1 - aynl * coseo1
+        el2 = axnl * axnl + aynl * aynl
+        pl = am * (1.0 - el2)
+
+        bad = (error == 0) & (pl < 0.0)
+        error[bad] = ERROR_SEMI_LATUS_RECTUM
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rl = am * (1.0 - ecose)
+            rdotl = np.sqrt(am) * esine / rl
+            rvdotl = np.sqrt(pl) / rl
+            betal = np.sqrt(1.0 - el2)
+            temp = esine / (1.0 + betal)
+            sinu = am / rl * (sineo1 - aynl - axnl * temp)
+            cosu = am / rl * (coseo1 - axnl + aynl * temp)
+            su = np.arctan2(sinu, cosu)
+            sin2u = (cosu + cosu) * sinu
+            cos2u = 1.0 - 2.0 * sinu * sinu
+            temp = 1.0 / pl
+            temp1 = 0.5 * gravity.j2 * temp
+            temp2 = temp1 * temp
+
+            # Update for short period periodics.
+            mrt = (rl * (1.0 - 1.5 * temp2 * betal * con41) +
+                   0.5 * temp1 * x1mth2 * cos2u)
+            su = su - 0.25 * temp2 * x7thm1 * sin2u
+            xnode = nodep + 1.5 * temp2 * cosip * sin2u
+            xinc = xincp + 1.5 * temp2 * cosip * sinip * cos2u
+            mvt = rdotl - nm * temp1 * x1mth2 * sin2u / gravity.xke
+            rvdot = rvdotl + nm * temp1 * (x1mth2 * cos2u +
+                                           1.5 * con41) / gravity.xke
+
+        # Orientation vectors.
+        sinsu = np.sin(su)
+        cossu = np.cos(su)
+        snod = np.sin(xnode)
+        cnod = np.cos(xnode)
+        sini = np.sin(xinc)
+        cosi = np.cos(xinc)
+        xmx = -snod * cosi
+        xmy = cnod * cosi
+        ux = xmx * sinsu + cnod * cossu
+        uy = xmy * sinsu + snod * cossu
+        uz = sini * sinsu
+        vx = xmx * cossu - cnod * sinsu
+        vy = xmy * cossu - snod * sinsu
+        vz = sini * cossu
+
+        mr = mrt * gravity.radius
+        r = np.stack((mr * ux, mr * uy, mr * uz), axis=-1)
+        v = np.stack(((mvt * ux + rvdot * vx) * vkmpersec,
+                      (mvt * uy + rvdot * vy) * vkmpersec,
+                      (mvt * uz + rvdot * vz) * vkmpersec), axis=-1)
+
+        bad = (error == 0) & (mrt < 1.0)
+        error[bad] = ERROR_DECAYED
+
+        failed = (error != 0) & (error != ERROR_DECAYED)
+        r[failed] = np.nan
+        v[failed] = np.nan
+        return r, v, error
+
+    def propagate_to(self, epochs):
+        """Propagate every object to each of `epochs`.
+
+        :param epochs: :py:class:`~datetime.datetime` objects or a
+            ``numpy.datetime64`` array of shape (T,).
+        :return: (r, v, error) as for :py:meth:`propagate`.
+        """
+        epochs = np.atleast_1d(datetime64(epochs))
+        tsince = ((epochs[None, :] - self.epoch[:, None]) /
+                  np.timedelta64(60, 's'))
+        return self.propagate(tsince)
+
+    def ephemeris(self, epochs):
+        """Return an ephemeris for every object over the epoch grid.
+
+        :param epochs: :py:class:`~datetime.datetime` objects or a
+            ``numpy.datetime64`` array of shape (T,).
+        :return: (epochs, states, error), where `epochs` is a
+            ``datetime64[us]`` array of shape (T,), `states` has shape
+            (N, T, 6) and holds X, Y, Z [km] and X_DOT, Y_DOT, Z_DOT [km/s]
+            in the TEME frame, the column order of OEM ephemeris data
+            lines, and `error` holds the codes described in
+            :py:meth:`propagate`.
+        """
+        epochs = np.atleast_1d(datetime64(epochs))
+        r, v, error = self.propagate_to(epochs)
+        return epochs, np.concatenate((r, v), axis=-1), error
+
+    def state_vectors(self, epoch, comment=None):
+        """Return OPM state vector blocks for every object at `epoch`.
+
+        The blocks are in the TEME frame, so the OPM metadata should use
+        :py:attr:`odmpy.opm.RefFrame.TEME`.
+
+        :param epoch: A single epoch for all objects.
+        :type epoch: :py:class:`~datetime.datetime`-like object
+        :param str comment: Optional comment for every block.
+        :return: list of :py:class:`~odmpy.opm.DataBlockStateVector`.
+        :raises ValueError: if any object could not be propagated.
+        """
+        epoch = datetime64(epoch)
+        r, v, error = self.propagate_to(epoch)
+        failed = (error[:, 0] != 0) & (error[:, 0] != ERROR_DECAYED)
+        if failed.any():
+            raise ValueError(
+                'SGP4 failed for objects at index {}'.format(
+                    np.flatnonzero(failed).tolist()))
+
+        epoch = to_datetime(epoch)
+        return [DataBlockStateVector(epoch, x, y, z, x_dot, y_dot, z_dot,
+                                     comment=comment)
+                for x, y, z, x_dot, y_dot, z_dot
+                in np.concatenate((r[:, 0], v[:, 0]), axis=-1).tolist()]
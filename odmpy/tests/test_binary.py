@@ -0,0 +1,132 @@
+import struct
+import unittest
+from datetime import datetime
+from io import BytesIO, StringIO
+from pathlib import Path
+
+import odmpy.binary as binary
+import odmpy.kvn as kvn
+import odmpy.oem as oem
+import odmpy.opm as opm
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VALID = str(Path('.', 'odmpy', 'tests', 'valid.opm.txt'))
+
+
+def output(opm_obj):
+    fp = StringIO()
+    opm_obj.write(fp)
+    return fp.getvalue()
+
+
+class TestBinary(unittest.TestCase):
+    def setUp(self):
+        with open(VALID) as f:
+            self.text = f.read()
+
+    def test_round_trip(self):
+        opm_obj = kvn.loads(self.text)
+        data = binary.dumps(opm_obj)
+        self.assertLess(len(data), len(self.text))
+        self.assertEqual(len(data) % 8, 0)
+
+        decoded = binary.loads(data)
+        self.assertEqual(output(decoded), self.text)
+        self.assertEqual(decoded.user_defined, opm_obj.user_defined)
+        self.assertEqual(decoded.data.state_vector.block.epoch.value,
+                         datetime(2011, 2, 24, 1, 2, 3))
+        self.assertIs(decoded.metadata.ref_frame.value, opm.RefFrame.GCRF)
+
+        fp = BytesIO()
+        binary.dump(opm_obj, fp)
+        binary.dump(decoded, fp)
+        self.assertEqual(fp.getvalue(), data + data)
+        fp.seek(0)
+        self.assertEqual(output(binary.load(fp)), self.text)
+        self.assertEqual([output(o) for o in binary.iter_loads(data + data)],
+                         [self.text, self.text])
+
+    def test_names_and_maneuvers(self):
+        opm_obj = kvn.loads(self.text)
+        sv = opm_obj.data.state_vector.block
+        sv.name = 'State'
+        sv.comment = None
+        maneuver = opm_obj.data.maneuver_parameters.block[0]
+        opm_obj.data.maneuver_parameters = [maneuver, maneuver]
+        decoded = binary.loads(binary.dumps(opm_obj))
+        self.assertEqual(output(decoded), output(opm_obj))
+        self.assertEqual(decoded.data.state_vector.block.name, 'State')
+        self.assertIsNone(decoded.data.state_vector.block.comment.value)
+        self.assertEqual(len(decoded.data.maneuver_parameters.block), 2)
+
+    def test_invalid(self):
+        data = binary.dumps(kvn.loads(self.text))
+        with self.assertRaises(ValueError):
+            binary.loads(b'KVN!' + data[4:])
+        with self.assertRaises(ValueError):
+            binary.loads(data[:8] + b'\0' * 8 + data[16:])
+        with self.assertRaises(ValueError):
+            binary.loads(data[:4] + struct.pack('<H', 99) + data[6:])
+
+        # Keywords are validated unless disabled.
+        opm_obj = kvn.loads(self.text)
+        opm_obj.metadata.object_id = 'not an ID'
+        data = binary.dumps(opm_obj)
+        with self.assertRaises(ValueError):
+            binary.loads(data)
+        self.assertEqual(
+            binary.loads(data, validate=False).metadata.object_id.value,
+            'not an ID')
+
+    @unittest.skipIf(np is None, 'NumPy is required for numeric_sections')
+    def test_numeric_sections(self):
+        opm_obj = kvn.loads(self.text)
+        data = binary.dumps(opm_obj)
+        sections = {section: (names, values) for section, names, values
+                    in binary.numeric_sections(data)}
+        names, values = sections['state_vector']
+        self.assertEqual(names, ['x', 'y', 'z', 'x_dot', 'y_dot', 'z_dot'])
+        self.assertIs(values.base, data)
+        self.assertEqual(values[0], opm_obj.data.state_vector.block.x.value)
+
+        names, values = sections['covariance_matrix']
+        np.testing.assert_array_equal(
+            values, opm_obj.data.covariance_matrix.block.to_packed())
+
+        names, values = sections['keplerian_elements']
+        self.assertTrue(np.isnan(values[names.index('mean_anomaly')]))
+
+    @unittest.skipIf(np is None, 'NumPy is required for OEM segments')
+    def test_segment(self):
+        metadata = oem.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC,
+            start_time=datetime(2011, 2, 24, 1, 2, 3),
+            stop_time=datetime(2011, 2, 24, 1, 3, 3),
+            interpolation='LAGRANGE',
+            interpolation_degree=7)
+        epochs = [datetime(2011, 2, 24, 1, 2, 3),
+                  datetime(2011, 2, 24, 1, 3, 3, 500)]
+        states = [[7000, 0, 0, 0, 7.5, 0],
+                  [6997.5, 449.8, 0, -0.482, 7.484, 0]]
+
+        data = binary.dumps_segment(metadata, epochs, states)
+        decoded, decoded_epochs, decoded_states = binary.loads_segment(data)
+        self.assertEqual(list(decoded.create_output_align_equals()),
+                         list(metadata.create_output_align_equals()))
+        self.assertEqual(decoded.interpolation_degree.value, 7)
+        self.assertEqual(decoded_epochs.tolist(), epochs)
+        np.testing.assert_array_equal(decoded_states, states)
+        self.assertIs(decoded_states.base.base, data)
+
+        with self.assertRaises(ValueError):
+            binary.loads(data)
+        with self.assertRaises(ValueError):
+            binary.dumps_segment(metadata, epochs, states[:1])
@@ -0,0 +1,184 @@
+import os
+import pickle
+import shutil
+import threading
+import unittest
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import odmpy.cache as cache
+import odmpy.kvn as kvn
+
+VALID = str(Path('.', 'odmpy', 'tests', 'valid.opm.txt'))
+
+
+def output(opm_obj):
+    fp = StringIO()
+    opm_obj.write(fp)
+    return fp.getvalue()
+
+
+class _Touch:
+    """Creates a file when unpickled."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return open, (self.path, 'w')
+
+
+class TestDiskCache(unittest.TestCase):
+    def test_load(self):
+        with open(VALID) as f:
+            text = f.read()
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.opm')
+            with open(path, 'w') as f:
+                f.write(text + text)
+
+            disk_cache = cache.DiskCache(os.path.join(directory, 'cache'))
+            first = disk_cache.load(path)
+            second = disk_cache.load(path)
+            self.assertEqual((disk_cache.hits, disk_cache.misses), (1, 1))
+            self.assertEqual(len(second), 2)
+            for opm_obj in first + second:
+                self.assertEqual(output(opm_obj), text)
+
+            # Another cache in the same directory uses the same entries.
+            other = cache.DiskCache(os.path.join(directory, 'cache'))
+            other.load(path)
+            self.assertEqual(other.hits, 1)
+
+            # Changes are detected even if the size and modification time
+            # are unchanged.
+            stat = os.stat(path)
+            with open(path, 'w') as f:
+                f.write((text + text).replace('2010-026A', '2010-026B'))
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            opm_obj, _ = disk_cache.load(path)
+            self.assertEqual(opm_obj.metadata.object_id.value, '2010-026B')
+            self.assertEqual(disk_cache.misses, 2)
+
+            disk_cache.clear()
+            disk_cache.load(path)
+            self.assertEqual(disk_cache.misses, 3)
+
+    def test_untrusted_entries(self):
+        with open(VALID) as f:
+            text = f.read()
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.opm')
+            with open(path, 'w') as f:
+                f.write(text)
+            cache_directory = os.path.join(directory, 'cache')
+            disk_cache = cache.DiskCache(cache_directory)
+            disk_cache.load(path)
+            entry, = [os.path.join(cache_directory, name)
+                      for name in os.listdir(cache_directory)]
+            with open(entry, 'rb') as f:
+                identity = f.readline()
+
+            # A pickle is not loaded, and neither is an entry whose
+            # messages are damaged. Both are parsed again.
+            marker = os.path.join(directory, 'marker')
+            payloads = [
+                pickle.dumps(_Touch(marker)),
+                identity + b'ODMB' + b'\xff' * 20,
+            ]
+            for misses, payload in enumerate(payloads, start=2):
+                with open(entry, 'wb') as f:
+                    f.write(payload)
+                opm_obj, = disk_cache.load(path)
+                self.assertEqual(output(opm_obj), text)
+                self.assertEqual(disk_cache.misses, misses)
+            self.assertFalse(os.path.exists(marker))
+            disk_cache.load(path)
+            self.assertEqual(disk_cache.hits, 1)
+
+    def test_eviction(self):
+        with TemporaryDirectory() as directory:
+            paths = []
+            for name in 'abc':
+                paths.append(os.path.join(directory, name + '.opm'))
+                shutil.copy(VALID, paths[-1])
+
+            cache_directory = os.path.join(directory, 'cache')
+            disk_cache = cache.DiskCache(cache_directory)
+            disk_cache.load(paths[0])
+            entry_size = os.path.getsize(os.path.join(
+                cache_directory, os.listdir(cache_directory)[0]))
+            disk_cache.max_size = 2 * entry_size
+
+            disk_cache.load(paths[1])
+
+            # Make the entry of the first file the least recently used.
+            for name in os.listdir(cache_directory):
+                os.utime(os.path.join(cache_directory, name), ns=(1, 1))
+            disk_cache.load(paths[1])
+            disk_cache.load(paths[2])
+            self.assertEqual(len(os.listdir(cache_directory)), 2)
+            self.assertEqual((disk_cache.hits, disk_cache.misses), (1, 3))
+
+            disk_cache.load(paths[1])
+            disk_cache.load(paths[0])
+            self.assertEqual((disk_cache.hits, disk_cache.misses), (2, 4))
+
+
+class TestMessageCache(unittest.TestCase):
+    def test_lru(self):
+        message_cache = cache.MessageCache(max_size=3, sizeof=len)
+        message_cache.put('a', 'x')
+        message_cache.put('b', 'yy')
+        self.assertEqual(message_cache.get('a'), 'x')
+        message_cache.put('c', 'z')
+        self.assertNotIn('b', message_cache)
+        self.assertEqual(message_cache.get('b', 0), 0)
+        self.assertEqual(message_cache.fetch('d', lambda: 'w'), 'w')
+        self.assertEqual(message_cache.fetch('d', lambda: 'v'), 'w')
+        self.assertEqual(message_cache.stats, cache.CacheStats(
+            hits=2, misses=2, evictions=1, count=3, size=3))
+
+        # Replacing an entry replaces its size, and large values are not
+        # cached.
+        message_cache.put('d', 'ww')
+        self.assertEqual(message_cache.stats.size, 3)
+        message_cache.put('e', 'long')
+        self.assertNotIn('e', message_cache)
+        self.assertEqual(len(message_cache), 2)
+
+        message_cache.remove('d')
+        self.assertEqual(message_cache.stats.size, 1)
+        message_cache.clear()
+        self.assertEqual((len(message_cache), message_cache.stats.size),
+                         (0, 0))
+
+    def test_estimate_size(self):
+        with open(VALID) as f:
+            text = f.read()
+        size = cache.estimate_size(kvn.loads(text))
+        self.assertGreater(size, len(text))
+        # Values shared by both messages are counted once.
+        self.assertLess(cache.estimate_size([kvn.loads(text)] * 2), 2 * size)
+        # The text of a lazy OPM is counted.
+        self.assertGreater(cache.estimate_size(kvn.loads(text, lazy=True)),
+                           len(text))
+
+    def test_threads(self):
+        message_cache = cache.MessageCache(max_size=100, sizeof=lambda _: 1)
+
+        def work(offset):
+            for i in range(1000):
+                key = (i + offset) % 150
+                message_cache.fetch(key, lambda: key)
+
+        threads = [threading.Thread(target=work, args=(offset,))
+                   for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = message_cache.stats
+        self.assertEqual((stats.count, stats.size), (100, 100))
+        self.assertEqual(stats.hits + stats.misses, 4000)
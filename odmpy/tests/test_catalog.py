@@ -0,0 +1,235 @@
+import os
+import unittest
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import odmpy.catalog as catalog
+import odmpy.opm as opm
+
+
+def make_opm(object_id, x=6655.9942, creation_date=datetime(2011, 3, 1)):
+    return opm.Opm(
+        opm.Header(originator='ESA', creation_date=creation_date),
+        opm.Metadata(
+            object_name='Dragon',
+            object_id=object_id,
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC),
+        opm.Data(opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), x, -40218.5751, -82.9177,
+            3.11548208, 0.47042605, -0.00101495)))
+
+
+class TestRegenerate(unittest.TestCase):
+    def test_regenerate(self):
+        fleet = [make_opm('2010-026A'), make_opm('2011-001B')]
+        with TemporaryDirectory() as directory:
+            paths = catalog.regenerate(fleet, directory)
+            self.assertEqual(
+                [os.path.basename(path) for path in paths],
+                ['2010-026A.opm', '2011-001B.opm'])
+            self.assertEqual(
+                catalog.read_manifest(
+                    os.path.join(directory, catalog.MANIFEST)),
+                {'2010-026A': fleet[0].digest(canonical=True),
+                 '2011-001B': fleet[1].digest(canonical=True)})
+            with open(paths[0]) as f:
+                self.assertEqual(f.read(), ''.join(
+                    line + '\n' for line in fleet[0].output()))
+
+            # A new creation date alone does not change the content. Each
+            # OPM is rendered once, whether or not it is written.
+            fleet = [make_opm('2010-026A', creation_date=datetime(2012, 1, 1)),
+                     make_opm('2011-001B', x=1.0),
+                     make_opm('2012-002C')]
+            with patch.object(opm.Opm, '_output_data', autospec=True,
+                              side_effect=opm.Opm._output_data) as render:
+                paths = catalog.regenerate(fleet, directory)
+            self.assertEqual(render.call_count, len(fleet))
+            self.assertEqual(
+                [os.path.basename(path) for path in paths],
+                ['2011-001B.opm', '2012-002C.opm'])
+            self.assertEqual(catalog.regenerate(fleet, directory), [])
+
+            # Missing files are written again.
+            os.remove(paths[0])
+            self.assertEqual(catalog.regenerate(fleet, directory), paths[:1])
+
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                ['2010-026A.opm', '2011-001B.opm', '2012-002C.opm',
+                 catalog.MANIFEST])
+
+    def test_failed_write(self):
+        fleet = [make_opm('2010-026A'), make_opm('2011-001B')]
+        fleet[1].data.state_vector.block.x = None
+        with TemporaryDirectory() as directory:
+            with self.assertRaises(opm.MissingKeywordError):
+                catalog.regenerate(fleet, directory)
+            # Nothing is written if any OPM fails.
+            self.assertEqual(os.listdir(directory), [])
+
+
+class TestBatchWriter(unittest.TestCase):
+    def test_commit(self):
+        fleet = [make_opm('2010-026A'), make_opm('2011-001B'),
+                 make_opm('2012-002C')]
+        with TemporaryDirectory() as directory:
+            batch = catalog.BatchWriter(directory, group_size=2)
+            for o in fleet:
+                batch.add(o.metadata.object_id.value + '.opm', o.write)
+            self.assertEqual(len(batch), 3)
+            # Only the staging directory is visible before the commit.
+            staging, = os.listdir(directory)
+            self.assertTrue(staging.startswith('.'))
+
+            paths = batch.commit()
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['2010-026A.opm', '2011-001B.opm',
+                              '2012-002C.opm'])
+            for path, o in zip(paths, fleet):
+                with open(path) as f:
+                    self.assertEqual(f.read(), ''.join(
+                        line + '\n' for line in o.output()))
+
+    def test_abort(self):
+        with TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'a.opm'), 'w') as f:
+                f.write('old')
+            with self.assertRaises(RuntimeError):
+                with catalog.BatchWriter(directory) as batch:
+                    batch.add('a.opm', make_opm('2010-026A').write)
+                    raise RuntimeError
+            self.assertEqual(os.listdir(directory), ['a.opm'])
+            with open(os.path.join(directory, 'a.opm')) as f:
+                self.assertEqual(f.read(), 'old')
+
+
+class TestLayout(unittest.TestCase):
+    def test_layouts(self):
+        self.assertEqual(catalog.FlatLayout()('2010-026A'), '2010-026A.opm')
+        self.assertEqual(catalog.LaunchYearLayout()('2010-026A'),
+                         os.path.join('2010', '2010-026A.opm'))
+        self.assertEqual(catalog.LaunchYearLayout()('DRAGON'),
+                         os.path.join('other', 'DRAGON.opm'))
+
+        layout = catalog.HashLayout(levels=2, width=3, filename='{object_id}')
+        path = layout('2010-026A')
+        first, second, name = path.split(os.sep)
+        self.assertEqual((len(first), len(second), name), (3, 3, '2010-026A'))
+        self.assertEqual(layout('2010-026A'), path)
+        self.assertNotEqual(layout('2010-026B'), path)
+
+    def test_regenerate(self):
+        fleet = [make_opm('2010-026A'), make_opm('2011-001B')]
+        layout = catalog.HashLayout(levels=2, width=1)
+        with TemporaryDirectory() as directory:
+            paths = catalog.regenerate(fleet, directory, layout=layout)
+            self.assertEqual(
+                paths, [catalog.locate(directory, o.metadata.object_id.value,
+                                       layout) for o in fleet])
+            for path in paths:
+                self.assertTrue(os.path.isfile(path))
+            self.assertEqual(
+                catalog.regenerate(fleet, directory, layout=layout), [])
+
+
+class TestIndex(unittest.TestCase):
+    def make_opm(self, object_id, epoch, creation_date=datetime(2011, 3, 1)):
+        opm_obj = make_opm(object_id, creation_date=creation_date)
+        opm_obj.data.state_vector.block.epoch = epoch
+        return opm_obj
+
+    def test_index(self):
+        with TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, 'shard'))
+            with open(os.path.join(directory, 'a.opm'), 'w') as f:
+                self.make_opm('2010-026A', datetime(2011, 1, 1)).write(f)
+                self.make_opm('2011-001B', datetime(2011, 1, 2)).write(f)
+            with open(os.path.join(directory, 'shard', 'b.opm'), 'w') as f:
+                self.make_opm('2010-026A', datetime(2011, 1, 3)).write(f)
+            with open(os.path.join(directory, 'ignored.txt'), 'w') as f:
+                f.write('not indexed')
+
+            with catalog.Index() as index:
+                self.assertEqual(len(index.update(directory)), 2)
+                self.assertEqual(index.update(directory), [])
+
+                entries = index.entries('2010-026A')
+                self.assertEqual([entry.epoch for entry in entries],
+                                 ['2011-01-01T00:00:00',
+                                  '2011-01-03T00:00:00'])
+                self.assertEqual(entries[0].object_name, 'Dragon')
+                self.assertEqual(entries[0].ref_frame, 'GCRF')
+                self.assertEqual(entries[0].originator, 'ESA')
+                self.assertEqual(entries[0].offset, 0)
+
+                second = index.entries('2011-001B')[0]
+                self.assertEqual(second.path, entries[0].path)
+                self.assertEqual(second.offset, entries[0].length)
+                self.assertEqual(
+                    index.load(second).data.state_vector.block.epoch.value,
+                    datetime(2011, 1, 2))
+
+                latest = index.latest('2010-026A')
+                self.assertEqual(latest.data.state_vector.block.epoch.value,
+                                 datetime(2011, 1, 3))
+                self.assertIsNone(index.latest('1998-067A'))
+                self.assertEqual(
+                    len(index.find(start=datetime(2011, 1, 2))), 2)
+                self.assertEqual(
+                    len(index.find(end=datetime(2011, 1, 2))), 2)
+
+                # Rewriting a file with the same content is not reparsed.
+                path = os.path.join(directory, 'shard', 'b.opm')
+                with open(path, 'w') as f:
+                    self.make_opm('2010-026A', datetime(2011, 1, 3)).write(f)
+                os.utime(path, ns=(0, 0))
+                self.assertEqual(index.update(directory), [])
+                self.assertEqual(
+                    [entry.path for entry in index.entries('2010-026A')],
+                    [entries[0].path, path])
+                self.assertEqual(
+                    len(index.find('2010-026A', start=datetime(2011, 1, 3))),
+                    1)
+                latest = index.latest('2010-026A')
+                self.assertEqual(latest.data.state_vector.block.epoch.value,
+                                 datetime(2011, 1, 3))
+
+                with open(path, 'w') as f:
+                    self.make_opm('2010-026A', datetime(2011, 1, 4),
+                                  creation_date=datetime(2011, 3, 2)).write(f)
+                os.utime(path, ns=(1, 1))
+                self.assertEqual(index.update(directory), [path])
+                self.assertEqual(index.entries('2010-026A')[-1].creation_date,
+                                 '2011-03-02T00:00:00')
+
+                os.remove(os.path.join(directory, 'a.opm'))
+                self.assertEqual(index.update(directory), [])
+                self.assertEqual(len(index.entries()), 1)
+
+                # A file which cannot be indexed is left out, and the
+                # other files are indexed.
+                with open(path, 'w') as f:
+                    f.write('CCSDS_OPM_VERS = 2.0\n')
+                new_path = os.path.join(directory, 'c.opm')
+                with open(new_path, 'w') as f:
+                    self.make_opm('1998-067A', datetime(2011, 1, 5)).write(f)
+                self.assertEqual(index.update(directory), [new_path])
+                self.assertEqual(list(index.errors), [path])
+                self.assertIsInstance(index.errors[path],
+                                      opm.MissingKeywordError)
+                self.assertEqual([entry.object_id
+                                  for entry in index.entries()],
+                                 ['1998-067A'])
+
+                # A file which disappears during the walk does not abort
+                # the update either.
+                missing = os.path.join(directory, 'd.opm')
+                os.symlink(os.path.join(directory, 'deleted'), missing)
+                self.assertEqual(index.update(directory), [])
+                self.assertCountEqual(index.errors, [path, missing])
+                self.assertIsInstance(index.errors[missing], OSError)
+                self.assertEqual(len(index.entries()), 1)
@@ -0,0 +1,318 @@
+import unittest
+from datetime import datetime
+
+import odmpy.opm as opm
+
+try:
+    import numpy as np
+    import odmpy.covariance as covariance
+except ImportError:
+    covariance = None
+
+
+def lower_triangle_matrix():
+    """6x6 nested list whose lower triangle counts up from 1, row by row,
+    with a distinct upper triangle."""
+    matrix = [[-1.0] * 6 for _ in range(6)]
+    value = 1.0
+    for i in range(6):
+        for j in range(i + 1):
+            matrix[i][j] = value
+            value += 1
+    return matrix
+
+
+class TestCovarianceMatrixBlock(unittest.TestCase):
+    def test_from_array(self):
+        block = opm.DataBlockCovarianceMatrix.from_array(
+            lower_triangle_matrix(), comment='From filter',
+            cov_ref_frame=opm.RefFrame.RTN)
+
+        self.assertEqual(block.cx_x.value, 1)
+        self.assertEqual(block.cy_x.value, 2)
+        self.assertEqual(block.cz_z.value, 6)
+        self.assertEqual(block.cx_dot_x_dot.value, 10)
+        self.assertEqual(block.cz_dot_x.value, 16)
+        self.assertEqual(block.cz_dot_z_dot.value, 21)
+        self.assertEqual(block.cov_ref_frame.value, opm.RefFrame.RTN)
+        self.assertEqual(block.comment.value, 'From filter')
+        self.assertEqual(block.to_packed(), [float(x) for x in range(1, 22)])
+        block.validate_keywords()
+
+    def test_from_array_shape(self):
+        with self.assertRaises(ValueError):
+            opm.DataBlockCovarianceMatrix.from_array([[1.0] * 6] * 5)
+
+        with self.assertRaises(ValueError):
+            opm.DataBlockCovarianceMatrix.from_packed([1.0] * 20)
+
+    @unittest.skipIf(covariance is None, 'NumPy is required for to_array')
+    def test_to_array(self):
+        block = opm.DataBlockCovarianceMatrix.from_array(
+            lower_triangle_matrix())
+        matrix = block.to_array()
+        self.assertEqual(matrix.shape, (6, 6))
+        np.testing.assert_array_equal(matrix, matrix.T)
+        np.testing.assert_array_equal(np.tril(matrix),
+                                      np.tril(lower_triangle_matrix()))
+
+
+@unittest.skipIf(covariance is None, 'NumPy is required for odmpy.covariance')
+class TestCovarianceBatch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        a = rng.normal(size=(4, 6, 6))
+        self.covariances = a @ a.transpose(0, 2, 1)
+
+    def test_pack_unpack(self):
+        packed = covariance.pack(self.covariances)
+        self.assertEqual(packed.shape, (4, 21))
+        np.testing.assert_array_equal(covariance.unpack(packed),
+                                      self.covariances)
+
+        with self.assertRaises(ValueError):
+            covariance.pack(np.zeros((4, 3, 3)))
+
+    def test_round_trip(self):
+        blocks = covariance.from_arrays(self.covariances,
+                                        cov_ref_frame=opm.RefFrame.TNW)
+        self.assertEqual(len(blocks), 4)
+        self.assertEqual(blocks[2].cov_ref_frame.value, opm.RefFrame.TNW)
+        self.assertEqual(blocks[2].cy_x.value, self.covariances[2, 1, 0])
+        self.assertIs(type(blocks[2].cy_x.value), float)
+        np.testing.assert_array_equal(covariance.to_arrays(blocks),
+                                      self.covariances)
+        np.testing.assert_array_equal(blocks[1].to_array(),
+                                      self.covariances[1])
+
+    def test_covariance_matrices(self):
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        state_vector = opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), 7000, 0, 0, 0, 7.5, 0)
+        fleet = [opm.Opm(header, metadata,
+                         opm.Data(state_vector=state_vector))
+                 for _ in range(4)]
+
+        blocks = covariance.covariance_matrices(fleet, self.covariances)
+        for o, block in zip(fleet, blocks):
+            self.assertIs(o.data.covariance_matrix.block, block)
+        self.assertIn('COMMENT Position/Velocity Covariance Matrix',
+                      list(fleet[0].output()))
+
+        with self.assertRaises(ValueError):
+            covariance.covariance_matrices(fleet[:3], self.covariances)
+
+
+@unittest.skipIf(covariance is None, 'NumPy is required for odmpy.covariance')
+class TestCovarianceRotation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        a = rng.normal(size=(5, 6, 6))
+        self.covariances = a @ a.transpose(0, 2, 1)
+        self.r = rng.normal(7000, 1000, size=(5, 3))
+        self.v = rng.normal(0, 5, size=(5, 3))
+
+    def make_opm(self, r, v, matrix, cov_ref_frame=None):
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        state_vector = opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), *(list(r) + list(v)))
+        block = opm.DataBlockCovarianceMatrix.from_array(
+            matrix, cov_ref_frame=cov_ref_frame)
+        return opm.Opm(header, metadata, opm.Data(
+            state_vector=state_vector, covariance_matrix=block))
+
+    def test_rotation_matrices(self):
+        r = [[7000, 0, 0]]
+        v = [[0, 5, 5]]
+        rtn = covariance.rotation_matrices(r, v, opm.RefFrame.RTN)
+        h = np.sqrt(0.5)
+        np.testing.assert_allclose(
+            rtn[0], [[1, 0, 0], [0, h, h], [0, -h, h]], atol=1e-15)
+        np.testing.assert_array_equal(
+            covariance.rotation_matrices(r, v, opm.RefFrame.RSW), rtn)
+
+        tnw = covariance.rotation_matrices(r, v, opm.RefFrame.TNW)
+        np.testing.assert_allclose(
+            tnw[0], [[0, h, h], [-1, 0, 0], [0, -h, h]], atol=1e-15)
+
+        np.testing.assert_array_equal(
+            covariance.rotation_matrices(r, v, opm.RefFrame.GCRF)[0],
+            np.eye(3))
+
+    def test_rotate(self):
+        local = covariance.rotate(self.covariances, self.r, self.v,
+                                  opm.RefFrame.GCRF, opm.RefFrame.RTN)
+        rotation = covariance.rotation_matrices(self.r, self.v,
+                                                opm.RefFrame.RTN)
+        expected = np.einsum('nij,njk,nlk->nil', rotation,
+                             self.covariances[:, :3, :3], rotation)
+        np.testing.assert_allclose(local[:, :3, :3], expected, rtol=1e-12)
+        np.testing.assert_allclose(np.trace(local, axis1=1, axis2=2),
+                                   np.trace(self.covariances, axis1=1,
+                                            axis2=2), rtol=1e-12)
+
+        tnw = covariance.rotate(local, self.r, self.v,
+                                opm.RefFrame.RTN, opm.RefFrame.TNW)
+        np.testing.assert_allclose(
+            tnw, covariance.rotate(self.covariances, self.r, self.v,
+                                   opm.RefFrame.GCRF, opm.RefFrame.TNW),
+            rtol=1e-9, atol=1e-9)
+
+        inertial = covariance.rotate(tnw, self.r, self.v,
+                                     opm.RefFrame.TNW, opm.RefFrame.GCRF)
+        np.testing.assert_allclose(inertial, self.covariances,
+                                   rtol=1e-9, atol=1e-9)
+
+    def test_transform_covariances(self):
+        fleet = [self.make_opm(r, v, matrix)
+                 for r, v, matrix in zip(self.r, self.v, self.covariances)]
+        fleet[1].data.covariance_matrix.block.cov_ref_frame = \
+            opm.RefFrame.TNW
+        fleet[2].data.covariance_matrix = None
+
+        blocks = covariance.transform_covariances(fleet, opm.RefFrame.RTN)
+        self.assertEqual(len(blocks), 4)
+        for block in blocks:
+            self.assertEqual(block.cov_ref_frame.value, opm.RefFrame.RTN)
+            self.assertIs(type(block.cx_x.value), float)
+        np.testing.assert_allclose(
+            fleet[0].data.covariance_matrix.block.to_array(),
+            covariance.rotate(self.covariances[0], self.r[0], self.v[0],
+                              opm.RefFrame.GCRF, opm.RefFrame.RTN)[0],
+            rtol=1e-12)
+        np.testing.assert_allclose(
+            fleet[1].data.covariance_matrix.block.to_array(),
+            covariance.rotate(self.covariances[1], self.r[1], self.v[1],
+                              opm.RefFrame.TNW, opm.RefFrame.RTN)[0],
+            rtol=1e-12)
+
+        covariance.transform_covariances(fleet)
+        block = fleet[0].data.covariance_matrix.block
+        self.assertEqual(block.cov_ref_frame.value, opm.RefFrame.GCRF)
+        np.testing.assert_allclose(block.to_array(), self.covariances[0],
+                                   rtol=1e-9, atol=1e-9)
+
+        self.assertEqual(covariance.transform_covariances([]), [])
+
+    def test_transform_covariances_invalid(self):
+        fleet = [self.make_opm(self.r[0], self.v[0], self.covariances[0],
+                               cov_ref_frame=opm.RefFrame.EME2000)]
+        with self.assertRaises(ValueError):
+            covariance.transform_covariances(fleet, opm.RefFrame.RTN)
+
+        with self.assertRaises(ValueError):
+            covariance.transform_covariances(fleet, opm.RefFrame.ITRF2000)
+
+
+@unittest.skipIf(covariance is None, 'NumPy is required for odmpy.covariance')
+class TestPositiveDefinite(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        a = rng.normal(size=(6, 6, 6))
+        self.covariances = a @ a.transpose(0, 2, 1)
+        # Indefinite: one negative eigenvalue.
+        eigenvalues, eigenvectors = np.linalg.eigh(self.covariances[2])
+        eigenvalues[0] = -0.5
+        indefinite = (eigenvectors * eigenvalues) @ eigenvectors.T
+        self.covariances[2] = (indefinite + indefinite.T) / 2
+        # Singular: a repeated row and column.
+        self.covariances[4][5] = self.covariances[4][4]
+        self.covariances[4][:, 5] = self.covariances[4][:, 4]
+
+    def test_is_positive_definite(self):
+        self.assertEqual(
+            covariance.is_positive_definite(self.covariances).tolist(),
+            [True, True, False, True, False, True])
+
+        asymmetric = self.covariances[0].copy()
+        asymmetric[0, 1] += 1
+        self.assertFalse(covariance.is_positive_definite(asymmetric)[0])
+
+    def test_cholesky(self):
+        good = self.covariances[[0, 1, 3, 5]]
+        lower, success = covariance._cholesky(good)
+        self.assertTrue(success.all())
+        np.testing.assert_allclose(lower, np.linalg.cholesky(good),
+                                   rtol=1e-10)
+
+    def test_nearest_positive_definite(self):
+        repaired = covariance.nearest_positive_definite(self.covariances)
+        self.assertTrue(covariance.is_positive_definite(repaired).all())
+        # Positive definite matrices are left unchanged.
+        np.testing.assert_array_equal(repaired[0], self.covariances[0])
+
+        # Only the negative eigenvalue of the correlation matrix is moved.
+        def correlation_eigenvalues(matrix):
+            sigma = np.sqrt(np.diag(self.covariances[2]))
+            return np.linalg.eigvalsh(matrix / np.outer(sigma, sigma))
+
+        np.testing.assert_allclose(
+            correlation_eigenvalues(repaired[2])[1:],
+            correlation_eigenvalues(self.covariances[2])[1:], rtol=1e-10)
+
+    def test_nearest_positive_definite_units(self):
+        # Position variances in km**2 and velocity variances in km**2/s**2
+        # differ by many orders of magnitude.
+        rng = np.random.RandomState(1)
+        a = rng.normal(size=(6, 6))
+        sigma = np.array([1, 1, 1, 1e-6, 1e-6, 1e-6])
+        matrix = np.outer(sigma, sigma) * (a @ a.T + np.eye(6))
+        matrix[5, :] = matrix[:, 5] = 0
+        matrix[5, 5] = 1e-12
+        repaired = covariance.nearest_positive_definite(matrix)
+        np.testing.assert_array_equal(repaired[0], matrix)
+
+        # A repair of the position terms leaves the velocity scale intact.
+        matrix[0, 1] = matrix[1, 0] = 2 * np.sqrt(matrix[0, 0] * matrix[1, 1])
+        repaired = covariance.nearest_positive_definite(matrix)
+        self.assertTrue(covariance.is_positive_definite(repaired)[0])
+        self.assertAlmostEqual(repaired[0, 5, 5] / 1e-12, 1)
+
+    def test_validate_covariances(self):
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        state_vector = opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), 7000, 0, 0, 0, 7.5, 0)
+        fleet = [opm.Opm(header, metadata,
+                         opm.Data(state_vector=state_vector))
+                 for _ in range(7)]
+        covariance.covariance_matrices(fleet[:6], self.covariances)
+
+        reports = covariance.validate_covariances(fleet)
+        self.assertEqual([r.index for r in reports], list(range(6)))
+        self.assertEqual([r.positive_definite for r in reports],
+                         [True, True, False, True, False, True])
+        self.assertIsNone(reports[0].min_eigenvalue)
+        self.assertAlmostEqual(reports[2].min_eigenvalue, -0.5)
+        self.assertFalse(any(r.repaired for r in reports))
+        np.testing.assert_array_equal(
+            fleet[2].data.covariance_matrix.block.to_array(),
+            self.covariances[2])
+
+        reports = covariance.validate_covariances(fleet, repair=True)
+        self.assertEqual([r.repaired for r in reports],
+                         [False, False, True, False, True, False])
+        self.assertTrue(all(
+            r.positive_definite
+            for r in covariance.validate_covariances(fleet)))
+        self.assertIs(type(fleet[2].data.covariance_matrix.block.cx_x.value),
+                      float)
+
+        self.assertEqual(covariance.validate_covariances(fleet[6:]), [])
@@ -0,0 +1,107 @@
+import os
+import unittest
+from datetime import datetime
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+import odmpy.opm as opm
+
+try:
+    import numpy as np
+    import odmpy.covariance as covariance
+    import odmpy.dispersion as dispersion
+except ImportError:
+    dispersion = None
+
+
+@unittest.skipIf(dispersion is None, 'NumPy is required for odmpy.dispersion')
+class TestDispersion(unittest.TestCase):
+    def setUp(self):
+        self.state = [6655.9942, -40218.5751, -82.9177,
+                      3.11548208, 0.47042605, -0.00101495]
+        # Position sigmas of 1 km, 2 km, 3 km, velocity sigmas of 1 m/s.
+        self.matrix = np.diag([1.0, 4.0, 9.0, 1e-6, 1e-6, 1e-6])
+        self.matrix[1, 0] = self.matrix[0, 1] = 1.0
+
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        self.parent = opm.Opm(header, metadata, opm.Data(
+            state_vector=opm.DataBlockStateVector(
+                datetime(2011, 2, 24, 1, 2, 3), *self.state),
+            spacecraft_parameters=opm.DataBlockSpacecraftParameters(
+                1000, 10, 2.2, 10, 1.3),
+            covariance_matrix=opm.DataBlockCovarianceMatrix.from_array(
+                self.matrix)))
+
+    def test_sample(self):
+        states = dispersion.sample(self.state, self.matrix, 20000, seed=1)
+        self.assertEqual(states.shape, (20000, 6))
+        np.testing.assert_allclose(states.mean(axis=0), self.state,
+                                   atol=0.05)
+        # Whitened samples have unit covariance.
+        whitened = np.linalg.solve(np.linalg.cholesky(self.matrix),
+                                   (states - self.state).T)
+        np.testing.assert_allclose(np.cov(whitened), np.eye(6), atol=0.05)
+
+        np.testing.assert_array_equal(
+            dispersion.sample(self.state, self.matrix, 5, seed=1),
+            states[:5])
+
+        with self.assertRaises(ValueError):
+            dispersion.sample(self.state, -self.matrix, 5)
+
+    def test_from_opm(self):
+        samples = dispersion.Dispersion.from_opm(self.parent, 10, seed=0)
+        self.assertEqual(len(samples), 10)
+
+        dispersed = samples[3]
+        self.assertIs(dispersed.header, self.parent.header)
+        self.assertIs(dispersed.metadata, self.parent.metadata)
+        self.assertIs(dispersed.data.spacecraft_parameters.block,
+                      self.parent.data.spacecraft_parameters.block)
+        self.assertIsNone(dispersed.data.covariance_matrix.block)
+        sv = dispersed.data.state_vector.block
+        self.assertEqual(sv.epoch.value, datetime(2011, 2, 24, 1, 2, 3))
+        self.assertEqual(sv.x.value, samples.states[3, 0])
+        self.assertEqual(len(list(samples)), 10)
+
+        np.testing.assert_array_equal(
+            samples.states,
+            dispersion.Dispersion.from_opm(self.parent, 10, seed=0).states)
+
+        self.parent.data.covariance_matrix = None
+        with self.assertRaises(ValueError):
+            dispersion.Dispersion.from_opm(self.parent, 10)
+
+    def test_local_frame(self):
+        covariance.transform_covariances([self.parent], opm.RefFrame.RTN)
+        local = dispersion.Dispersion.from_opm(self.parent, 10, seed=0)
+
+        covariance.covariance_matrices([self.parent], self.matrix)
+        inertial = dispersion.Dispersion.from_opm(self.parent, 10, seed=0)
+        np.testing.assert_allclose(local.states, inertial.states, rtol=1e-9)
+
+        # Rotations between inertial frames are not supported.
+        self.parent.data.covariance_matrix.block.cov_ref_frame = (
+            opm.RefFrame.EME2000)
+        with self.assertRaises(ValueError):
+            dispersion.Dispersion.from_opm(self.parent, 10, seed=0)
+
+    def test_write_files(self):
+        samples = dispersion.Dispersion.from_opm(self.parent, 3, seed=0)
+        with TemporaryDirectory() as directory:
+            paths = samples.write_files(
+                directory, filename='{object_id}_{index:03d}.opm')
+            self.assertEqual([os.path.basename(path) for path in paths],
+                             ['2010-026A_000.opm', '2010-026A_001.opm',
+                              '2010-026A_002.opm'])
+            for path, dispersed in zip(paths, samples):
+                fp = StringIO()
+                dispersed.write(fp)
+                with open(path) as f:
+                    self.assertEqual(f.read(), fp.getvalue())
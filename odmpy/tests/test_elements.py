@@ -0,0 +1,243 @@
+import unittest
+from datetime import datetime
+
+import odmpy.opm as opm
+
+try:
+    import numpy as np
+    import odmpy.elements as elements
+except ImportError:
+    elements = None
+
+GM = 398600.4418
+
+
+def keplerian_to_cartesian(a, e, i, raan, argp, nu, gm=GM):
+    """Reference conversion for a single orbit, angles in degrees."""
+    i, raan, argp, nu = np.radians([i, raan, argp, nu])
+    p = a * (1 - e * e)
+    radius = p / (1 + e * np.cos(nu))
+    r_pqw = radius * np.array([np.cos(nu), np.sin(nu), 0])
+    v_pqw = np.sqrt(gm / p) * np.array([-np.sin(nu), e + np.cos(nu), 0])
+
+    def r3(angle):
+        return np.array([[np.cos(angle), -np.sin(angle), 0],
+                         [np.sin(angle), np.cos(angle), 0],
+                         [0, 0, 1]])
+
+    def r1(angle):
+        return np.array([[1, 0, 0],
+                         [0, np.cos(angle), -np.sin(angle)],
+                         [0, np.sin(angle), np.cos(angle)]])
+
+    rotation = r3(raan) @ r1(i) @ r3(argp)
+    return rotation @ r_pqw, rotation @ v_pqw
+
+
+def angle_difference(a, b):
+    return np.abs((np.asarray(a) - b + 180) % 360 - 180)
+
+
+@unittest.skipIf(elements is None, 'NumPy is required for odmpy.elements')
+class TestCartesianToKeplerian(unittest.TestCase):
+    def convert(self, cases, **kwargs):
+        states = [keplerian_to_cartesian(*case) for case in cases]
+        r, v = zip(*states)
+        return elements.cartesian_to_keplerian(r, v, GM, **kwargs)
+
+    def assertElements(self, result, cases):
+        cases = np.array(cases, dtype=np.float64)
+        np.testing.assert_allclose(result['semi_major_axis'], cases[:, 0],
+                                   rtol=1e-12)
+        np.testing.assert_allclose(result['eccentricity'], cases[:, 1],
+                                   atol=1e-12)
+        for column, name in enumerate(['inclination', 'ra_of_asc_node',
+                                       'arg_of_pericenter', 'true_anomaly'],
+                                      start=2):
+            with self.subTest(name=name):
+                self.assertLess(
+                    angle_difference(result[name], cases[:, column]).max(),
+                    1e-9)
+
+    def test_general(self):
+        rng = np.random.RandomState(0)
+        n = 500
+        cases = np.column_stack((
+            rng.uniform(7000, 42000, n), rng.uniform(0.001, 0.9, n),
+            rng.uniform(1, 179, n), rng.uniform(0, 360, n),
+            rng.uniform(0, 360, n), rng.uniform(0, 360, n)))
+        self.assertElements(self.convert(cases), cases)
+
+    def test_singularities(self):
+        cases = [
+            # Circular: anomaly is the argument of latitude.
+            (7000, 0, 30, 40, 0, 100),
+            # Equatorial: argument of pericenter is the longitude of
+            # pericenter.
+            (7000, 0.1, 0, 0, 50, 100),
+            (7000, 0.1, 180, 0, 50, 100),
+            # Circular equatorial: anomaly is the true longitude.
+            (7000, 0, 0, 0, 0, 123),
+            (7000, 0, 180, 0, 0, 123),
+        ]
+        self.assertElements(self.convert(cases), cases)
+
+    def test_hyperbolic(self):
+        cases = [(-20000, 1.5, 30, 40, 50, 20),
+                 (-20000, 1.5, 30, 40, 50, -100)]
+        result = self.convert(cases)
+        self.assertElements(result, cases)
+
+        # Inbound states have a negative true anomaly, which round trips
+        # through the mean anomaly unchanged.
+        self.assertAlmostEqual(result['true_anomaly'][1], -100)
+        mean = self.convert(cases, anomaly='mean')['mean_anomaly']
+        self.assertLess(mean[1], 0)
+        np.testing.assert_allclose(
+            elements.mean_to_true(mean, result['eccentricity']),
+            result['true_anomaly'], rtol=1e-10)
+
+    def test_mean_anomaly(self):
+        result = self.convert([(7000, 0.1, 30, 40, 50, 90),
+                               (7000, 0, 30, 40, 0, 90),
+                               (-20000, 1.5, 30, 40, 50, 20)],
+                              anomaly='mean')
+        self.assertNotIn('true_anomaly', result)
+
+        # E = atan2(sqrt(1 - e**2), e), M = E - e*sin(E)
+        e = 0.1
+        ecc_anomaly = np.arctan2(np.sqrt(1 - e * e), e)
+        expected = np.degrees(ecc_anomaly - e * np.sin(ecc_anomaly))
+        self.assertAlmostEqual(result['mean_anomaly'][0], expected)
+        self.assertAlmostEqual(result['mean_anomaly'][1], 90)
+
+        # sinh(H) = sqrt(e**2 - 1)*sin(nu)/(1 + e*cos(nu)), M = e*sinh(H) - H
+        e, nu = 1.5, np.radians(20)
+        sinh_h = np.sqrt(e * e - 1) * np.sin(nu) / (1 + e * np.cos(nu))
+        expected = np.degrees(e * sinh_h - np.arcsinh(sinh_h))
+        self.assertAlmostEqual(result['mean_anomaly'][2], expected)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.convert([(7000, 0.1, 30, 40, 50, 90)], anomaly='eccentric')
+
+        with self.assertRaises(ValueError):
+            elements.cartesian_to_keplerian([7000, 0, 0], [7, 0, 0], GM)
+
+
+@unittest.skipIf(elements is None, 'NumPy is required for odmpy.elements')
+class TestKeplerSolver(unittest.TestCase):
+    def test_elliptic(self):
+        rng = np.random.RandomState(0)
+        e = rng.uniform(0, 0.99, 1000)
+        m = rng.uniform(-20, 20, 1000)
+        solution = elements.solve_kepler(m, e)
+
+        self.assertTrue(solution.converged.all())
+        self.assertLessEqual(solution.iterations, 10)
+        x = solution.anomaly
+        np.testing.assert_allclose(x - e * np.sin(x), m, atol=1e-12)
+        self.assertLess(solution.residual.max(), 1e-12)
+
+    def test_hyperbolic(self):
+        rng = np.random.RandomState(0)
+        e = rng.uniform(1.01, 10, 1000)
+        m = rng.uniform(-100, 100, 1000)
+        solution = elements.solve_kepler(m, e)
+
+        self.assertTrue(solution.converged.all())
+        x = solution.anomaly
+        np.testing.assert_allclose(e * np.sinh(x) - x, m, rtol=1e-12)
+
+    def test_iteration_limit(self):
+        solution = elements.solve_kepler([3.0, 0.0], [0.99, 0.5],
+                                         max_iterations=1)
+        self.assertEqual(solution.iterations, 1)
+        self.assertEqual(solution.converged.tolist(), [False, True])
+        self.assertGreater(solution.residual[0], 1e-3)
+
+        with self.assertRaises(ValueError):
+            elements.mean_to_true(np.degrees(3.0), 0.99, max_iterations=1)
+
+    def test_round_trip(self):
+        rng = np.random.RandomState(0)
+        nu = rng.uniform(0, 360, 1000)
+        e = rng.uniform(0, 0.9, 1000)
+        mean_anomaly = elements.true_to_mean(nu, e)
+        self.assertTrue(((mean_anomaly >= 0) & (mean_anomaly < 360)).all())
+        self.assertLess(
+            angle_difference(elements.mean_to_true(mean_anomaly, e),
+                             nu).max(), 1e-9)
+
+        nu = rng.uniform(-90, 90, 1000)
+        e = rng.uniform(1.5, 5, 1000)
+        np.testing.assert_allclose(
+            elements.mean_to_true(elements.true_to_mean(nu, e), e), nu,
+            atol=1e-9)
+
+    def test_convert_anomaly(self):
+        blocks = [
+            opm.DataBlockKeplerianElements(7000, 0.1, 30, 40, 50, GM,
+                                           true_anomaly=90),
+            opm.DataBlockKeplerianElements(7000, 0.2, 30, 40, 50, GM,
+                                           mean_anomaly=10),
+        ]
+        elements.convert_anomaly(blocks, 'mean')
+        self.assertIsNone(blocks[0].true_anomaly.value)
+        self.assertAlmostEqual(blocks[0].mean_anomaly.value,
+                               float(elements.true_to_mean(90, 0.1)))
+        self.assertEqual(blocks[1].mean_anomaly.value, 10)
+
+        elements.convert_anomaly(blocks, 'true')
+        self.assertAlmostEqual(blocks[0].true_anomaly.value, 90)
+        self.assertAlmostEqual(blocks[1].true_anomaly.value,
+                               float(elements.mean_to_true(10, 0.2)))
+        for block in blocks:
+            self.assertIsNone(block.mean_anomaly.value)
+            block.validate_keywords()
+
+        with self.assertRaises(ValueError):
+            elements.convert_anomaly(blocks, 'eccentric')
+
+
+@unittest.skipIf(elements is None, 'NumPy is required for odmpy.elements')
+class TestKeplerianElementsFleet(unittest.TestCase):
+    def make_opm(self, r, v):
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        state_vector = opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), *(list(r) + list(v)))
+        return opm.Opm(header, metadata, opm.Data(state_vector=state_vector))
+
+    def test_attach(self):
+        cases = [(7000, 0.01, 51.6, 10, 20, 30),
+                 (42164, 0.0002, 0.05, 80, 90, 100)]
+        fleet = [self.make_opm(*keplerian_to_cartesian(*case))
+                 for case in cases]
+
+        blocks = elements.keplerian_elements(fleet, GM, anomaly='mean',
+                                             comment='Osculating')
+
+        self.assertEqual(len(blocks), 2)
+        for o, block, case in zip(fleet, blocks, cases):
+            self.assertIs(o.data.keplerian_elements.block, block)
+            self.assertEqual(block.comment.value, 'Osculating')
+            self.assertAlmostEqual(block.semi_major_axis.value, case[0],
+                                   places=6)
+            self.assertAlmostEqual(block.gm.value, GM)
+            self.assertIsNone(block.true_anomaly.value)
+            self.assertIsNotNone(block.mean_anomaly.value)
+            block.validate_keywords()
+
+        # Blocks hold plain floats so they format like hand-built blocks.
+        self.assertIs(type(blocks[0].inclination.value), float)
+        lines = list(fleet[0].output())
+        self.assertIn('COMMENT Osculating Keplerian Elements', lines)
+
+    def test_empty(self):
+        self.assertEqual(elements.keplerian_elements([], GM), [])
@@ -0,0 +1,194 @@
+import os
+import time
+import unittest
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import odmpy.kvn as kvn
+import odmpy.opm as opm
+
+VALID = str(Path('.', 'odmpy', 'tests', 'valid.opm.txt'))
+
+
+def output(opm_obj):
+    fp = StringIO()
+    opm_obj.write(fp)
+    return fp.getvalue()
+
+
+class TestKvn(unittest.TestCase):
+    def test_round_trip(self):
+        with open(VALID) as f:
+            text = f.read()
+        opm_obj = kvn.loads(text)
+        self.assertEqual(output(opm_obj), text)
+
+        self.assertEqual(opm_obj.header.comment.value, 'Test comment\nline 2')
+        self.assertIsNone(opm_obj.metadata.comment.value)
+        self.assertIs(opm_obj.metadata.ref_frame.value, opm.RefFrame.GCRF)
+        sv = opm_obj.data.state_vector.block
+        self.assertIsNone(sv.name)
+        self.assertEqual(sv.epoch.value, datetime(2011, 2, 24, 1, 2, 3))
+        self.assertEqual(sv.x.value, 149.5345408926215)
+        self.assertEqual(opm_obj.data.covariance_matrix.block.cz_dot_z.value,
+                         11.37831353312537)
+        self.assertEqual(opm_obj.user_defined,
+                         {'TEST': '149.53454089262146', 'TEST2': 'String'})
+
+    def test_names_and_comments(self):
+        text = '\n'.join([
+            'CCSDS_OPM_VERS = 2.0',
+            'CREATION_DATE = 2011-059T01:02:03',
+            'ORIGINATOR = ESA',
+            'COMMENT Metadata',
+            'COMMENT Dragon',
+            'OBJECT_NAME = Dragon',
+            'OBJECT_ID = 2010-026A',
+            'CENTER_NAME = EARTH',
+            'REF_FRAME = GCRF',
+            'TIME_SYSTEM = UTC',
+            'COMMENT State',
+            'COMMENT Second line',
+            'EPOCH = 2011-02-24T01:02:03.5',
+            'X = 1.0 [km]', 'Y = 2.0 [km]', 'Z = 3.0 [km]',
+            'X_DOT = 4.0 [km/s]', 'Y_DOT = 5.0 [km/s]', 'Z_DOT = 6.0 [km/s]',
+            'MASS = 1000', 'SOLAR_RAD_AREA = 10', 'SOLAR_RAD_COEFF = 2.2',
+            'DRAG_AREA = 10', 'DRAG_COEFF = 1.3',
+            'MAN_EPOCH_IGNITION = 2011-02-24T03:00:00',
+            'MAN_DURATION = 10', 'MAN_DELTA_MASS = -1', 'MAN_REF_FRAME = RTN',
+            'MAN_DV_1 = 0', 'MAN_DV_2 = 0.01', 'MAN_DV_3 = 0',
+            'MAN_EPOCH_IGNITION = 2011-02-24T02:00:00',
+            'MAN_DURATION = 10', 'MAN_DELTA_MASS = -2', 'MAN_REF_FRAME = RTN',
+            'MAN_DV_1 = 0', 'MAN_DV_2 = 0.02', 'MAN_DV_3 = 0',
+        ])
+        opm_obj = kvn.loads(text)
+        self.assertEqual(opm_obj.header.creation_date.value,
+                         datetime(2011, 2, 28, 1, 2, 3))
+        self.assertEqual(opm_obj.metadata.comment.value, 'Dragon')
+        sv = opm_obj.data.state_vector.block
+        self.assertEqual(sv.name, 'State')
+        self.assertEqual(sv.comment.value, 'Second line')
+        self.assertEqual(sv.epoch.value,
+                         datetime(2011, 2, 24, 1, 2, 3, 500000))
+        maneuvers = list(opm_obj.data.maneuver_parameters.block)
+        self.assertEqual([block.man_delta_mass.value for block in maneuvers],
+                         [-2, -1])
+
+        # Reading the output again gives the same output.
+        self.assertEqual(output(kvn.loads(output(opm_obj))), output(opm_obj))
+        self.assertEqual(output(kvn.loads(text, lazy=True)), output(opm_obj))
+
+    def test_lazy(self):
+        with open(VALID) as f:
+            text = f.read()
+        opm_obj = kvn.loads(text, lazy=True)
+        self.assertIsInstance(opm_obj.data, kvn.LazyData)
+        self.assertEqual(opm_obj.metadata.object_id.value, '2010-026A')
+        self.assertFalse(any(bc.loaded for bc in opm_obj.data.blocks
+                             if hasattr(bc, 'loaded')))
+
+        sv = opm_obj.data.state_vector
+        self.assertEqual(sv.block.x.value, 149.5345408926215)
+        self.assertTrue(sv.loaded)
+        self.assertFalse(opm_obj.data.covariance_matrix.loaded)
+        self.assertEqual(len(opm_obj.data.maneuver_parameters.block), 1)
+
+        self.assertEqual(output(opm_obj), text)
+
+        # Errors in data blocks are raised on first access.
+        opm_obj = kvn.loads(text.replace('0.9283691897196', 'e'), lazy=True)
+        opm_obj.data.state_vector.block
+        with self.assertRaises(ValueError):
+            opm_obj.data.keplerian_elements.block
+        opm_obj.data.keplerian_elements = None
+        self.assertIsNone(opm_obj.data.keplerian_elements.block)
+
+        with self.assertRaises(opm.MissingBlockError):
+            kvn.loads(text.split('COMMENT State')[0], lazy=True)
+
+    def test_invalid(self):
+        with open(VALID) as f:
+            text = f.read()
+        with self.assertRaises(ValueError):
+            kvn.loads(text.replace('X       =', 'XX      ='))
+        with self.assertRaises(ValueError):
+            kvn.loads(text.replace('REF_FRAME       = GCRF',
+                                   'REF_FRAME       = ABC'))
+        with self.assertRaises(ValueError):
+            kvn.loads(text + '\nnot a keyword line')
+        with self.assertRaises(opm.MissingKeywordError):
+            kvn.loads(text.replace('ORIGINATOR     = ESA\n', ''))
+        with self.assertRaises(opm.MissingBlockError):
+            kvn.loads(text.split('COMMENT State')[0])
+
+    def test_split_messages(self):
+        with open(VALID, 'rb') as f:
+            data = f.read()
+        self.assertEqual(kvn.split_messages(data), [(0, len(data))])
+        self.assertEqual(kvn.split_messages(b'\n' + data + data),
+                         [(1, len(data)), (1 + len(data), len(data))])
+        self.assertEqual(kvn.split_messages(b'  \n'), [])
+
+    def test_parse_date(self):
+        self.assertEqual(kvn.parse_date('2011-02-24T01:02:03'),
+                         datetime(2011, 2, 24, 1, 2, 3))
+        self.assertEqual(kvn.parse_date('2011-055T01:02:03.000001'),
+                         datetime(2011, 2, 24, 1, 2, 3, 1))
+        self.assertEqual(kvn.parse_date('2012-366T00:00:00.5'),
+                         datetime(2012, 12, 31, 0, 0, 0, 500000))
+        for text in ['2011-02-24', '2011-02-30T00:00:00',
+                     '2011-366T00:00:00', '2011-02-24T01:02:03.']:
+            with self.assertRaises(ValueError):
+                kvn.parse_date(text)
+
+    def test_scan(self):
+        with open(VALID, 'rb') as f:
+            data = f.read()
+        values = {
+            'OBJECT_ID': '2010-026A',
+            'EPOCH': datetime(2011, 2, 24, 1, 2, 3),
+            'CREATION_DATE': datetime(2011, 3, 1, 1, 2, 3),
+        }
+        self.assertEqual(kvn.scan(VALID), [(0, len(data), values)])
+        self.assertEqual(
+            kvn.scan_bytes(b'\n' + data + data, ['REF_FRAME', 'MEAN_ANOMALY']),
+            [(1, len(data), {'REF_FRAME': opm.RefFrame.GCRF}),
+             (1 + len(data), len(data), {'REF_FRAME': opm.RefFrame.GCRF})])
+
+        with TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, 'shard'))
+            paths = [os.path.join(directory, 'a.opm'),
+                     os.path.join(directory, 'shard', 'b.opm'),
+                     os.path.join(directory, 'empty.opm')]
+            for path, contents in zip(paths, [data, data + data, b'']):
+                with open(path, 'wb') as f:
+                    f.write(contents)
+            results = sorted(kvn.scan_directory(directory, workers=2))
+            self.assertEqual(results, [
+                (paths[0], 0, len(data), values),
+                (paths[1], 0, len(data), values),
+                (paths[1], len(data), len(data), values),
+            ])
+
+            # Files are scanned at most 2 * workers ahead of the consumer.
+            for i in range(20):
+                with open(os.path.join(directory, '{}.opm'.format(i)),
+                          'wb') as f:
+                    f.write(data)
+            calls = []
+            scan = kvn.scan
+
+            def counting_scan(*args):
+                calls.append(None)
+                return scan(*args)
+
+            with patch.object(kvn, 'scan', counting_scan):
+                results = kvn.scan_directory(directory, workers=2)
+                next(results)
+                time.sleep(0.1)
+                self.assertLessEqual(len(calls), 5)
+                self.assertEqual(len(list(results)), 22)
+            self.assertEqual(len(calls), 23)
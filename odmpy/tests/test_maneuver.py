@@ -0,0 +1,124 @@
+import unittest
+from datetime import datetime, timedelta
+
+import odmpy.opm as opm
+
+try:
+    import numpy as np
+    import odmpy.maneuver as maneuver
+    import odmpy.twobody as twobody
+except ImportError:
+    maneuver = None
+
+GM = 398600.4418
+EPOCH = datetime(2011, 2, 24, 1, 2, 3)
+
+
+@unittest.skipIf(maneuver is None, 'NumPy is required for odmpy.maneuver')
+class TestApply(unittest.TestCase):
+    def test_frames(self):
+        r = [[7000, 0, 0]]
+        v = [[0, 7.5, 0]]
+        dv = [[0.001, 0.002, 0.003]]
+        np.testing.assert_allclose(
+            maneuver.apply(r, v, dv, opm.RefFrame.RTN),
+            [[0.001, 7.502, 0.003]])
+        np.testing.assert_allclose(
+            maneuver.apply(r, v, dv, opm.RefFrame.TNW),
+            [[-0.002, 7.501, 0.003]])
+        np.testing.assert_allclose(
+            maneuver.apply(r, v, dv, opm.RefFrame.GCRF),
+            [[0.001, 7.502, 0.003]])
+
+    def test_batch(self):
+        rng = np.random.RandomState(0)
+        r = rng.normal(0, 7000, size=(100, 3))
+        v = rng.normal(0, 5, size=(100, 3))
+        dv = rng.normal(0, 0.01, size=(100, 3))
+        result = maneuver.apply(r, v, dv, opm.RefFrame.TNW)
+        # TNW: the first component is along the velocity.
+        speed = np.linalg.norm(v, axis=1)
+        np.testing.assert_allclose(
+            np.einsum('ij,ij->i', result - v, v) / speed, dv[:, 0])
+        np.testing.assert_allclose(np.linalg.norm(result - v, axis=1),
+                                   np.linalg.norm(dv, axis=1))
+
+
+@unittest.skipIf(maneuver is None, 'NumPy is required for odmpy.maneuver')
+class TestApplyManeuvers(unittest.TestCase):
+    def make_opm(self, maneuver_parameters=None, mass=1000):
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        return opm.Opm(header, metadata, opm.Data(
+            state_vector=opm.DataBlockStateVector(
+                EPOCH, 7000, 0, 0, 0, 7.5, 0),
+            spacecraft_parameters=opm.DataBlockSpacecraftParameters(
+                mass, 10, 2.2, 10, 1.3),
+            maneuver_parameters=maneuver_parameters))
+
+    def make_maneuver(self, epoch=EPOCH, frame=opm.RefFrame.RTN,
+                      dv=(0, 0.01, 0), delta_mass=-5):
+        return opm.DataBlockManeuverParameters(
+            epoch, 10, delta_mass, frame, *dv)
+
+    def test_apply_maneuvers(self):
+        fleet = [self.make_opm(self.make_maneuver()),
+                 self.make_opm(self.make_maneuver(frame=opm.RefFrame.GCRF,
+                                                  dv=(0, 0, 0.02))),
+                 self.make_opm()]
+        result = maneuver.apply_maneuvers(fleet)
+
+        self.assertIs(result[2], fleet[2])
+        sv = result[0].data.state_vector.block
+        self.assertEqual(sv.epoch.value, EPOCH)
+        self.assertAlmostEqual(sv.y_dot.value, 7.51)
+        self.assertEqual(sv.x.value, 7000)
+        self.assertAlmostEqual(result[1].data.state_vector.block.z_dot.value,
+                               0.02)
+        for o, post in zip(fleet, result[:2]):
+            self.assertIs(post.header, o.header)
+            self.assertIs(post.metadata, o.metadata)
+            self.assertIsNone(post.data.maneuver_parameters.block)
+            self.assertEqual(post.data.spacecraft_parameters.block.mass.value,
+                             995)
+        # The original OPMs are untouched.
+        self.assertEqual(fleet[0].data.state_vector.block.y_dot.value, 7.5)
+        self.assertEqual(
+            fleet[0].data.spacecraft_parameters.block.mass.value, 1000)
+
+    def test_multiple(self):
+        later = EPOCH + timedelta(seconds=1200)
+        blocks = [self.make_maneuver(epoch=later, dv=(0, 0, 0.01)),
+                  self.make_maneuver()]
+        fleet = [self.make_opm(blocks)]
+        post = maneuver.apply_maneuvers(fleet, gm=GM)[0]
+
+        r, v = twobody.propagate([7000, 0, 0], [0, 7.51, 0], GM, [1200])
+        expected = np.concatenate((r[0, 0], v[0, 0]))
+        # At the second ignition, W is the normal to the orbit plane.
+        expected[5] += 0.01
+        sv = post.data.state_vector.block
+        self.assertEqual(sv.epoch.value, later)
+        np.testing.assert_allclose(
+            [sv.x.value, sv.y.value, sv.z.value,
+             sv.x_dot.value, sv.y_dot.value, sv.z_dot.value],
+            expected, rtol=1e-10, atol=1e-12)
+        self.assertEqual(post.data.spacecraft_parameters.block.mass.value,
+                         990)
+
+    def test_invalid(self):
+        later = EPOCH + timedelta(seconds=60)
+        with self.assertRaises(ValueError):
+            maneuver.apply_maneuvers(
+                [self.make_opm(self.make_maneuver(epoch=later))])
+
+        with self.assertRaises(ValueError):
+            maneuver.apply_maneuvers([self.make_opm(
+                self.make_maneuver(frame=opm.RefFrame.EME2000))])
+
+        self.assertEqual(maneuver.apply_maneuvers([]), [])
@@ -0,0 +1,78 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+from io import StringIO
+from pathlib import Path
+
+import odmpy.kvn as kvn
+import odmpy.ndm as ndm
+import odmpy.opm as opm
+
+VALID = str(Path('.', 'odmpy', 'tests', 'valid.opm.txt'))
+
+
+class TestNdm(unittest.TestCase):
+    def setUp(self):
+        with open(VALID) as f:
+            self.opm = kvn.load(f)
+
+    def test_write(self):
+        fp = StringIO()
+        ndm.write(fp, self.opm)
+        root = ElementTree.fromstring(fp.getvalue())
+        self.assertEqual(root.tag, 'opm')
+        self.assertEqual(root.get('version'), '2.0')
+
+        header = root.find('header')
+        self.assertEqual([element.text for element in header],
+                         ['Test comment', 'line 2', '2011-03-01T01:02:03',
+                          'ESA'])
+        metadata = root.find('body/segment/metadata')
+        self.assertEqual(metadata.findtext('REF_FRAME'), 'GCRF')
+
+        data = root.find('body/segment/data')
+        self.assertEqual(
+            [element.tag for element in data],
+            ['stateVector', 'keplerianElements', 'spacecraftParameters',
+             'covarianceMatrix', 'maneuverParameters',
+             'userDefinedParameters'])
+        x = data.find('stateVector/X')
+        self.assertEqual(x.get('units'), 'km')
+        self.assertEqual(float(x.text),
+                         self.opm.data.state_vector.block.x.value)
+        cov = self.opm.data.covariance_matrix.block
+        self.assertEqual(
+            [float(element.text) for element in data.find('covarianceMatrix')],
+            list(cov.to_packed()))
+        parameter = data.find('userDefinedParameters/USER_DEFINED')
+        self.assertEqual((parameter.get('parameter'), parameter.text),
+                         ('TEST', '149.53454089262146'))
+
+    def test_escape(self):
+        self.opm.header.comment = 'a < b & "c"'
+        self.opm.data.state_vector.block.name = 'State <1>'
+        root = ElementTree.fromstring(''.join(
+            line + '\n' for line in ndm.output(self.opm)))
+        self.assertEqual(root.findtext('header/COMMENT'), 'a < b & "c"')
+        self.assertEqual(
+            root.findtext('body/segment/data/stateVector/COMMENT'),
+            'State <1>')
+
+    def test_write_ndm(self):
+        def opms():
+            for object_id in ['2010-026A', '2011-001B', '2012-002C']:
+                self.opm.metadata.object_id = object_id
+                yield self.opm
+
+        fp = StringIO()
+        ndm.write_ndm(fp, opms())
+        root = ElementTree.fromstring(fp.getvalue())
+        self.assertEqual(root.tag, 'ndm')
+        self.assertEqual(
+            [element.findtext('body/segment/metadata/OBJECT_ID')
+             for element in root.findall('opm')],
+            ['2010-026A', '2011-001B', '2012-002C'])
+
+    def test_invalid(self):
+        self.opm.metadata.object_name = None
+        with self.assertRaises(opm.MissingKeywordError):
+            ndm.write(StringIO(), self.opm)
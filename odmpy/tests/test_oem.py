@@ -0,0 +1,99 @@
+import unittest
+from datetime import datetime, timedelta
+from io import StringIO
+
+import odmpy.oem as oem
+import odmpy.opm as opm
+from odmpy.opm import MissingKeywordError
+
+
+class TestOem(unittest.TestCase):
+    def setUp(self):
+        self.header = oem.Header(
+            originator='ESA',
+            creation_date=datetime(2011, 3, 1, 1, 2, 3))
+
+        self.metadata = oem.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC,
+            start_time=datetime(2011, 2, 24, 1, 2, 3),
+            stop_time=datetime(2011, 2, 24, 1, 3, 3),
+            interpolation='LAGRANGE',
+            interpolation_degree=7)
+
+        self.epochs = [datetime(2011, 2, 24, 1, 2, 3),
+                       datetime(2011, 2, 24, 1, 3, 3)]
+        self.states = [[7000, 0, 0, 0, 7.5, 0],
+                       [6997.5, 449.8, 0, -0.482, 7.484, 0]]
+
+    def test_write(self):
+        fp = StringIO()
+        oem.write(fp, self.header, [(self.metadata, self.epochs,
+                                     self.states)])
+        self.assertEqual(fp.getvalue(), '\n'.join([
+            'CCSDS_OEM_VERS = 2.0',
+            'CREATION_DATE  = 2011-03-01T01:02:03',
+            'ORIGINATOR     = ESA',
+            '',
+            'META_START',
+            'OBJECT_NAME          = Dragon',
+            'OBJECT_ID            = 2010-026A',
+            'CENTER_NAME          = EARTH',
+            'REF_FRAME            = GCRF',
+            'TIME_SYSTEM          = UTC',
+            'START_TIME           = 2011-02-24T01:02:03',
+            'STOP_TIME            = 2011-02-24T01:03:03',
+            'INTERPOLATION        = LAGRANGE',
+            'INTERPOLATION_DEGREE = 7',
+            'META_STOP',
+            '',
+            '2011-02-24T01:02:03  7.000000000000000e+03  0.000000000000000e+00'
+            '  0.000000000000000e+00  0.000000000000000e+00'
+            '  7.500000000000000e+00  0.000000000000000e+00',
+            '2011-02-24T01:03:03  6.997500000000000e+03  4.498000000000000e+02'
+            '  0.000000000000000e+00 -4.820000000000000e-01'
+            '  7.484000000000000e+00  0.000000000000000e+00',
+            '',
+        ]))
+
+    def test_streaming_segments(self):
+        fp = StringIO()
+        writer = oem.Writer(fp, self.header)
+        self.assertTrue(fp.getvalue().startswith('CCSDS_OEM_VERS = 2.0\n'))
+
+        def segments():
+            for hour in range(3):
+                epochs = [epoch + timedelta(hours=hour)
+                          for epoch in self.epochs]
+                yield self.metadata, epochs, self.states
+
+        for segment in segments():
+            writer.write_segment(*segment)
+
+        self.assertEqual(fp.getvalue().count('META_START'), 3)
+        self.assertIn('2011-02-24T03:03:03 ', fp.getvalue())
+
+    def test_metadata_from_opm(self):
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+        segment_metadata = oem.Metadata.from_opm_metadata(
+            metadata, self.epochs[0], self.epochs[-1],
+            interpolation='HERMITE')
+        self.assertEqual(segment_metadata.object_id.value, '2010-026A')
+        self.assertEqual(segment_metadata.ref_frame.value,
+                         opm.RefFrame.GCRF)
+        self.assertEqual(segment_metadata.stop_time.value, self.epochs[-1])
+        self.assertEqual(segment_metadata.interpolation.value, 'HERMITE')
+
+    def test_missing_time_span(self):
+        self.metadata.stop_time = None
+        writer = oem.Writer(StringIO(), self.header)
+        with self.assertRaises(MissingKeywordError):
+            writer.write_segment(self.metadata, self.epochs, self.states)
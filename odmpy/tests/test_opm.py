@@ -260,6 +260,8 @@ class TestOpmSections(unittest.TestCase):
 
         data.maneuver_parameters = [mp1, mp2]
         data.validate_blocks()
+        self.assertIsInstance(data.maneuver_parameters.block,
+                              opm.ManeuverTimeline)
 
         opm.Opm(header=self.valid_header,
                 metadata=self.valid_metadata,
@@ -366,7 +368,7 @@ class TestOpmSections(unittest.TestCase):
         for line in opm_obj.output():
             output_hash.update(line.encode('utf-8'))
 
-        with open(str(Path('.', 'odmpy', 'tests', 'test.opm.txt')), 'w') as f:
+        with TemporaryFile(mode='w+') as f:
             opm_obj.write(f)
 
         valid_hash = hashlib.sha256()
@@ -410,6 +412,318 @@ class TestOpmSections(unittest.TestCase):
         self.assertEqual(file_hash.hexdigest(), valid_hash.hexdigest())
 
 
+    def test_digest(self):
+        opm_obj = opm.Opm(
+            header=self.valid_header,
+            metadata=self.valid_metadata,
+            data=opm.Data(
+                state_vector=self.valid_state_vector,
+                covariance_matrix=self.valid_covariance_matrix))
+
+        hasher = hashlib.sha256()
+        with TemporaryFile(mode='w+b') as f:
+            with open(f.fileno(), 'w', encoding='utf-8', newline='\n',
+                      closefd=False) as fp:
+                opm_obj.write(fp, hasher=hasher)
+            f.seek(0)
+            file_digest = hashlib.sha256(f.read()).hexdigest()
+
+        self.assertEqual(opm_obj.digest(), file_digest)
+        self.assertEqual(hasher.hexdigest(), file_digest)
+        self.assertEqual(opm_obj.digest('md5'),
+                         hashlib.md5(
+                             ''.join(line + '\n' for line in opm_obj.output())
+                             .encode('utf-8')).hexdigest())
+
+        canonical = opm_obj.digest(canonical=True)
+        self.valid_header.creation_date = datetime(2012, 1, 1)
+        self.assertNotEqual(opm_obj.digest(), file_digest)
+        self.assertEqual(opm_obj.digest(canonical=True), canonical)
+
+        self.valid_state_vector.x = 1.0
+        self.assertNotEqual(opm_obj.digest(canonical=True), canonical)
+
+    def test_output_multiple_maneuvers(self):
+        blocks = []
+        for hour in (3, 1, 2):
+            block = opm.DataBlockManeuverParameters(
+                man_epoch_ignition=datetime(2011, 3, 1, hour),
+                man_duration=hour,
+                man_delta_mass=-1,
+                man_ref_frame=opm.RefFrame.TNW,
+                man_dv_1=1,
+                man_dv_2=0,
+                man_dv_3=0)
+            blocks.append(block)
+        blocks[0].name = 'Final Burn'
+
+        data = opm.Data(
+            state_vector=self.valid_state_vector,
+            spacecraft_parameters=self.valid_spacecraft_parameters,
+            maneuver_parameters=blocks)
+        opm_obj = opm.Opm(
+            header=self.valid_header,
+            metadata=self.valid_metadata,
+            data=data)
+
+        lines = list(opm_obj.output())
+        comments = [line for line in lines if line.startswith('COMMENT')]
+        self.assertEqual(comments[-3:], ['COMMENT Maneuver Parameters',
+                                    'COMMENT Maneuver Parameters',
+                                    'COMMENT Final Burn'])
+        ignitions = [line for line in lines
+                     if line.startswith('MAN_EPOCH_IGNITION')]
+        self.assertEqual(len(ignitions), 3)
+        self.assertEqual(ignitions, sorted(ignitions))
+
+
+class TestManeuverTimeline(unittest.TestCase):
+    def make_maneuver(self, hour):
+        return opm.DataBlockManeuverParameters(
+            man_epoch_ignition=datetime(2011, 3, 1, hour),
+            man_duration=1,
+            man_delta_mass=-1,
+            man_ref_frame=opm.RefFrame.RTN,
+            man_dv_1=0,
+            man_dv_2=1,
+            man_dv_3=0)
+
+    def test_order(self):
+        blocks = [self.make_maneuver(hour) for hour in (5, 1, 3, 1)]
+        timeline = opm.ManeuverTimeline(blocks)
+        self.assertEqual(len(timeline), 4)
+        self.assertEqual([block.man_epoch_ignition.value.hour
+                          for block in timeline], [1, 1, 3, 5])
+        # Equal epochs keep their insertion order.
+        self.assertIs(timeline[0], blocks[1])
+        self.assertIs(timeline[1], blocks[3])
+
+        late = self.make_maneuver(4)
+        timeline.add(late)
+        self.assertIs(timeline[3], late)
+
+        timeline.remove(blocks[3])
+        self.assertEqual(list(timeline), [blocks[1], blocks[2], late,
+                                          blocks[0]])
+        with self.assertRaises(ValueError):
+            timeline.remove(blocks[3])
+
+        with self.assertRaises(TypeError):
+            timeline.add(1)
+
+    def test_epoch(self):
+        timeline = opm.ManeuverTimeline()
+        block = self.make_maneuver(1)
+        block.man_epoch_ignition = None
+        with self.assertRaises(opm.MissingKeywordError):
+            timeline.add(block)
+        self.assertEqual(len(timeline), 0)
+
+        # A block whose epoch was changed can still be removed, and added
+        # again at its new position.
+        blocks = [self.make_maneuver(hour) for hour in (1, 2, 3)]
+        timeline = opm.ManeuverTimeline(blocks)
+        blocks[0].man_epoch_ignition = datetime(2011, 3, 1, 4)
+        timeline.remove(blocks[0])
+        timeline.add(blocks[0])
+        self.assertEqual(list(timeline), blocks[1:] + blocks[:1])
+
+    def test_lookup(self):
+        blocks = [self.make_maneuver(hour) for hour in (1, 2, 2, 4)]
+        timeline = opm.ManeuverTimeline(blocks)
+
+        self.assertEqual(timeline.at(datetime(2011, 3, 1, 2)), blocks[1:3])
+        self.assertEqual(timeline.at(datetime(2011, 3, 1, 3)), [])
+        self.assertEqual(timeline.between(datetime(2011, 3, 1, 2),
+                                          datetime(2011, 3, 1, 4)),
+                         blocks[1:3])
+        self.assertIs(timeline.next(datetime(2011, 3, 1, 2)), blocks[3])
+        self.assertIsNone(timeline.next(datetime(2011, 3, 1, 4)))
+
+
+class TestOpmFromRecords(unittest.TestCase):
+    def setUp(self):
+        self.sections = {
+            'header': {
+                'originator': 'ESA',
+                'creation_date': datetime(2011, 3, 1, 1, 2, 3),
+            },
+            'metadata': {
+                'object_name': 'Dragon',
+                'object_id': '2010-026A',
+                'center_name': 'EARTH',
+                'ref_frame': opm.RefFrame.GCRF,
+                'time_system': opm.TimeSystem.UTC,
+            },
+            'state_vector': {
+                'epoch': datetime(2011, 3, 1, 1, 2, 3),
+                'x': 6655.9942, 'y': -40218.5751, 'z': -82.9177,
+                'x_dot': 3.11548208, 'y_dot': 0.47042605,
+                'z_dot': -0.00101495,
+            },
+            'spacecraft_parameters': {
+                'mass': 1913, 'solar_rad_area': 10, 'solar_rad_coeff': 1.3,
+                'drag_area': 10, 'drag_coeff': 2.3,
+            },
+            'maneuver_parameters': [{
+                'man_epoch_ignition': datetime(2011, 3, 1, hour),
+                'man_duration': 10, 'man_delta_mass': -1,
+                'man_ref_frame': opm.RefFrame.RTN,
+                'man_dv_1': 0, 'man_dv_2': 0.01, 'man_dv_3': 0,
+            } for hour in (5, 3)],
+            'user_defined': {'TEST': 'String'},
+        }
+
+    def test_from_dict(self):
+        sections = self.sections
+        expected = opm.Opm(
+            header=opm.Header(**sections['header']),
+            metadata=opm.Metadata(**sections['metadata']),
+            data=opm.Data(
+                state_vector=opm.DataBlockStateVector(
+                    **sections['state_vector']),
+                spacecraft_parameters=opm.DataBlockSpacecraftParameters(
+                    **sections['spacecraft_parameters']),
+                maneuver_parameters=[
+                    opm.DataBlockManeuverParameters(**maneuver)
+                    for maneuver in sections['maneuver_parameters']]),
+            user_defined=sections['user_defined'])
+
+        opm_obj = opm.Opm.from_dict(sections)
+        self.assertIsInstance(opm_obj.data.maneuver_parameters.block,
+                              opm.ManeuverTimeline)
+        self.assertEqual(list(opm_obj.output()), list(expected.output()))
+
+    def test_from_dict_invalid(self):
+        self.sections['state_vector']['x'] = None
+        with self.assertRaises(opm.MissingKeywordError):
+            opm.Opm.from_dict(self.sections)
+
+        self.sections['state_vector']['x'] = 1
+        self.sections['metadata']['object_id'] = '2010-26A'
+        with self.assertRaises(ValueError):
+            opm.Opm.from_dict(self.sections)
+
+        del self.sections['metadata']
+        with self.assertRaises(opm.MissingBlockError):
+            opm.Opm.from_dict(self.sections)
+
+        with self.assertRaises(ValueError):
+            opm.Opm.from_dict({'trajectory': {}})
+
+    def test_from_records(self):
+        fields = ('metadata.object_id', 'state_vector.x', 'state_vector.y')
+        records = [('2010-026A', 1.0, 2.0), ('2011-001B', 3.0, 4.0)]
+        opms = opm.Opm.from_records(records, fields, defaults=self.sections)
+
+        self.assertEqual(len(opms), 2)
+        self.assertIs(opms[0].header, opms[1].header)
+        self.assertIs(opms[0].data.spacecraft_parameters.block,
+                      opms[1].data.spacecraft_parameters.block)
+        self.assertEqual(opms[1].metadata.object_id.value, '2011-001B')
+        self.assertEqual(opms[1].metadata.object_name.value, 'Dragon')
+        self.assertEqual(opms[1].data.state_vector.block.y.value, 4.0)
+        self.assertEqual(opms[1].data.state_vector.block.z.value, -82.9177)
+        # Defaults are not modified by the columns.
+        self.assertEqual(self.sections['state_vector']['x'], 6655.9942)
+
+        with self.assertRaises(ValueError):
+            opm.Opm.from_records(records, ('object_id', 'x', 'y'),
+                                 defaults=self.sections)
+        # Field names can only be omitted for a structured array.
+        with self.assertRaises(ValueError):
+            opm.Opm.from_records(records, defaults=self.sections)
+
+        # Columns may also be named by keyword.
+        opms = opm.Opm.from_records(records, ('OBJECT_ID', 'X', 'Y'),
+                                    defaults=self.sections)
+        self.assertEqual(opms[1].metadata.object_id.value, '2011-001B')
+        self.assertEqual(opms[1].data.state_vector.block.y.value, 4.0)
+
+    def test_from_structured_array(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest('NumPy is required for structured arrays')
+
+        records = np.array([(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)],
+                           dtype=[('state_vector.x', 'f8'),
+                                  ('state_vector.y', 'f8'),
+                                  ('state_vector.z', 'f8')])
+        opms = opm.Opm.from_records(records, defaults=self.sections)
+        self.assertEqual(opms[1].data.state_vector.block.z.value, 6.0)
+        self.assertIs(type(opms[1].data.state_vector.block.z.value), float)
+
+
+class TestKeywordSchema(unittest.TestCase):
+    def setUp(self):
+        self.block = opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), 1, 2, 3, 4, 5, 6)
+
+    def test_schema(self):
+        schema = opm.DataBlockStateVector.schema
+        self.assertEqual([field.keyword for field in schema],
+                         ['COMMENT', 'EPOCH', 'X', 'Y', 'Z',
+                          'X_DOT', 'Y_DOT', 'Z_DOT'])
+        self.assertIs(opm.DataBlockStateVector.x, schema[2])
+        self.assertEqual(schema[2].units, 'km')
+
+        # Subclasses extend the schema of their parent.
+        import odmpy.oem as oem
+        self.assertEqual(oem.Metadata.schema[:len(opm.Metadata.schema)],
+                         opm.Metadata.schema)
+        self.assertEqual(oem.Metadata.schema[-1].keyword,
+                         'INTERPOLATION_DEGREE')
+
+    def test_values(self):
+        self.assertEqual(self.block._values[2:], [1, 2, 3, 4, 5, 6])
+        self.assertNotIn('_x', vars(self.block))
+
+        keyword = self.block.x
+        self.assertEqual(keyword.keyword, 'X')
+        self.assertEqual(keyword.units, 'km')
+        self.assertTrue(keyword.mandatory)
+
+        self.block.x = 10
+        self.assertEqual(keyword.value, 10)
+        keyword.value = 11
+        self.assertEqual(self.block.x.value, 11)
+        self.assertEqual([k.value for k in self.block.keywords][2:4], [11, 2])
+
+        # Values are not shared between instances.
+        other = opm.DataBlockStateVector(
+            datetime(2011, 2, 24, 1, 2, 3), 1, 2, 3, 4, 5, 6)
+        self.assertEqual(other.x.value, 1)
+
+    def test_exclusive_anomaly(self):
+        block = opm.DataBlockKeplerianElements(
+            7000, 0.01, 51.6, 10, 20, 398600.4418, mean_anomaly=3.5)
+        with self.assertRaises(opm.DuplicateKeywordError):
+            block.true_anomaly = 1
+        block.mean_anomaly = None
+        block.true_anomaly = 1
+        self.assertEqual(block.true_anomaly.value, 1)
+
+    def test_registry(self):
+        info = opm.KEYWORDS['CX_DOT_Y']
+        self.assertEqual(info.section, 'covariance_matrix')
+        self.assertIs(info.container, opm.DataBlockCovarianceMatrix)
+        self.assertEqual(info.name, 'cx_dot_y')
+        self.assertEqual(info.units, 'km**2/s')
+        self.assertIs(info.type, float)
+        self.assertIs(opm.DataBlockCovarianceMatrix.schema[info.index],
+                      opm.DataBlockCovarianceMatrix.cx_dot_y)
+
+        self.assertIs(opm.KEYWORDS['MAN_REF_FRAME'].type, opm.RefFrame)
+        self.assertEqual(opm.KEYWORDS['CCSDS_OPM_VERS'].section, 'header')
+        self.assertEqual(opm.KEYWORDS['EPOCH'].formatter(
+            datetime(2011, 2, 24, 1, 2, 3)), '2011-02-24T01:02:03')
+        self.assertNotIn('COMMENT', opm.KEYWORDS)
+        # 3 header, 6 metadata, 7 state vector, 5 spacecraft, 8 keplerian,
+        # 22 covariance and 7 maneuver keywords.
+        self.assertEqual(len(opm.KEYWORDS), 58)
+
+
 class TestValidators(unittest.TestCase):
     def test_validate_object_id(self):
         self.assertTrue(opm.validate_object_id('2010-026A'))
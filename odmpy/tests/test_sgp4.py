@@ -0,0 +1,173 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from odmpy.opm import DataBlockStateVector
+
+try:
+    import numpy as np
+    import odmpy.sgp4 as sgp4
+except ImportError:
+    sgp4 = None
+
+
+def tle_epoch(year, day):
+    return datetime(year, 1, 1) + timedelta(days=day - 1)
+
+
+# Mean elements from the SGP4 verification TLEs (Vallado et al., AIAA
+# 2006-6753): epoch, mean motion, eccentricity, inclination, RAAN, argument
+# of pericenter, mean anomaly, B*.
+ELEMENTS = {
+    # Near earth, eccentric.
+    5: (tle_epoch(2000, 179.78495062), 10.82419157, 0.1859667, 34.2682,
+        348.7242, 331.7664, 19.3264, 0.28098e-4),
+    # Near earth, low perigee with drag.
+    6251: (tle_epoch(2006, 176.82412014), 15.56387291, 0.0030035, 58.0579,
+           54.0425, 139.1568, 221.1854, 0.12808e-3),
+    # Deep space, 12 hour resonance.
+    8195: (tle_epoch(2006, 176.33215444), 2.00491383, 0.6877146, 64.1586,
+           279.0717, 264.7651, 20.2257, 0.11873e-3),
+    9880: (tle_epoch(2006, 176.56157475), 2.00813614, 0.7069051, 64.5968,
+           349.3786, 270.0229, 16.3320, 0.10000e-3),
+    # Deep space, 24 hour resonance, Lyddane modification.
+    14128: (tle_epoch(2006, 176.02844893), 0.98870114, 0.0011562, 11.4384,
+            35.2134, 26.4582, 333.5652, 0.10000e-3),
+    # Deep space, non-resonant.
+    20413: (tle_epoch(2005, 363.79166667), 0.24690082, 0.7864447, 12.3514,
+            187.4253, 196.3027, 356.5478, 0.0),
+}
+
+# Reference TEME states from the verification output: minutes since epoch,
+# position [km], velocity [km/s].
+VECTORS = {
+    5: [
+        (0.0, (7022.46529266, -1400.08296755, 0.03995155),
+         (1.893841015, 6.405893759, 4.534807250)),
+        (360.0, (-7154.03120202, -3783.17682504, -3536.19412294),
+         (4.741887409, -4.151817765, -2.093935425)),
+    ],
+    6251: [
+        (0.0, (3988.31022699, 5498.96657235, 0.90055879),
+         (-3.290032738, 2.357652820, 6.496623475)),
+        (2040.0, (3363.28794321, 5559.55841180, 1956.05542266),
+         (-4.587378863, 0.591943403, 6.107838605)),
+    ],
+    8195: [
+        (120.0, (15223.91713658, -17852.95881713, 25280.39558224),
+         (1.079041732, 0.875187372, 2.485682813)),
+        (2040.0, (2963.26486560, 18243.85063641, 11868.25797486),
+         (-1.908015447, -0.747870342, -4.134004492)),
+    ],
+    9880: [
+        (0.0, (13020.06750784, -2449.07193500, 1.15896030),
+         (4.247363935, 1.597178501, 4.956708611)),
+        (2040.0, (-17004.43272827, 9316.53926351, 12526.11883812),
+         (0.220330736, -1.955594322, -3.955058575)),
+    ],
+    14128: [
+        (120.0, (18263.33439094, 38159.96004751, 4186.18304085),
+         (-2.744396611, 1.255583260, 0.528558932)),
+        (2040.0, (-42298.30327543, -119.03351118, 4922.96388841),
+         (-0.052232768, -3.018152669, -0.493827331)),
+    ],
+    20413: [
+        (0.0, (25123.29290741, -13225.49966286, 3249.40351869),
+         (0.488683419, 4.797897593, -0.961119693)),
+        (1440.0, (-151669.05280515, -5645.20454550, -2198.51592118),
+         (-0.869182889, -0.870759872, 0.156508219)),
+    ],
+}
+
+
+@unittest.skipIf(sgp4 is None, 'NumPy is required for odmpy.sgp4')
+class TestSgp4(unittest.TestCase):
+    def setUp(self):
+        self.catalogue = sorted(ELEMENTS)
+        columns = list(zip(*(ELEMENTS[n] for n in self.catalogue)))
+        self.propagator = sgp4.Propagator(*columns)
+
+    def test_verification_vectors(self):
+        tsince = [[t for t, _, _ in VECTORS[n]] for n in self.catalogue]
+        r, v, error = self.propagator.propagate(tsince)
+
+        self.assertFalse(error.any())
+        for i, n in enumerate(self.catalogue):
+            for j, (t, position, velocity) in enumerate(VECTORS[n]):
+                with self.subTest(norad_cat_id=n, tsince=t):
+                    np.testing.assert_allclose(r[i, j], position, atol=1e-4)
+                    np.testing.assert_allclose(v[i, j], velocity, atol=1e-7)
+
+    def test_shared_times(self):
+        r, v, error = self.propagator.propagate([0.0, 2040.0])
+        self.assertEqual(r.shape, (len(self.catalogue), 2, 3))
+        self.assertEqual(v.shape, (len(self.catalogue), 2, 3))
+        self.assertEqual(error.shape, (len(self.catalogue), 2))
+
+        i = self.catalogue.index(6251)
+        _, position, velocity = VECTORS[6251][1]
+        np.testing.assert_allclose(r[i, 1], position, atol=1e-4)
+        np.testing.assert_allclose(v[i, 1], velocity, atol=1e-7)
+
+    def test_propagate_to(self):
+        epoch = ELEMENTS[5][0] + timedelta(minutes=360)
+        propagator = sgp4.Propagator(*ELEMENTS[5])
+        r, v, error = propagator.propagate_to([epoch])
+        _, position, velocity = VECTORS[5][1]
+        np.testing.assert_allclose(r[0, 0], position, atol=1e-4)
+        np.testing.assert_allclose(v[0, 0], velocity, atol=1e-7)
+
+        # Time zone aware epochs are converted to UTC.
+        offset = timezone(timedelta(hours=2))
+        aware = (epoch + timedelta(hours=2)).replace(tzinfo=offset)
+        r_aware, v_aware, _ = propagator.propagate_to([aware])
+        np.testing.assert_array_equal(r_aware, r)
+        np.testing.assert_array_equal(v_aware, v)
+
+    def test_ephemeris(self):
+        start = ELEMENTS[5][0]
+        epochs = [start + timedelta(minutes=m) for m in (0, 360)]
+        propagator = sgp4.Propagator(*ELEMENTS[5])
+        times, states, error = propagator.ephemeris(epochs)
+
+        self.assertEqual(times.dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(states.shape, (1, 2, 6))
+        _, position, velocity = VECTORS[5][1]
+        np.testing.assert_allclose(states[0, 1, :3], position, atol=1e-4)
+        np.testing.assert_allclose(states[0, 1, 3:], velocity, atol=1e-7)
+
+    def test_state_vectors(self):
+        epoch = ELEMENTS[5][0]
+        propagator = sgp4.Propagator(*ELEMENTS[5])
+        blocks = propagator.state_vectors(epoch)
+
+        self.assertEqual(len(blocks), 1)
+        block = blocks[0]
+        self.assertIsInstance(block, DataBlockStateVector)
+        self.assertEqual(block.epoch.value, epoch)
+        _, position, velocity = VECTORS[5][0]
+        np.testing.assert_allclose(
+            [block.x.value, block.y.value, block.z.value], position,
+            atol=1e-4)
+        np.testing.assert_allclose(
+            [block.x_dot.value, block.y_dot.value, block.z_dot.value],
+            velocity, atol=1e-7)
+
+    def test_errors(self):
+        # Verification case 33333 reaches a negative semi-latus rectum.
+        propagator = sgp4.Propagator(
+            tle_epoch(2005, 333.02012661), 4.00004038, 0.9950000, 96.4736,
+            157.9986, 244.0492, 110.6523, 0.24476e-3)
+        r, v, error = propagator.propagate([0.0, 25.0])
+        self.assertEqual(error[0, 0], 0)
+        self.assertEqual(error[0, 1], sgp4.ERROR_SEMI_LATUS_RECTUM)
+        self.assertTrue(np.isnan(r[0, 1]).all())
+
+        with self.assertRaises(ValueError):
+            propagator.state_vectors(tle_epoch(2005, 333.02012661) +
+                                     timedelta(minutes=25))
+
+    def test_gravity_models(self):
+        self.assertEqual(set(sgp4.GRAVITY_MODELS),
+                         {'wgs72old', 'wgs72', 'wgs84'})
+        with self.assertRaises(KeyError):
+            sgp4.Propagator(*ELEMENTS[5], gravity='egm96')
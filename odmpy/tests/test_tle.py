@@ -0,0 +1,132 @@
+import unittest
+from datetime import datetime, timedelta
+from io import StringIO
+
+try:
+    import numpy as np
+    import odmpy.tle as tle
+except ImportError:
+    tle = None
+
+# Vanguard 1 and ISS element sets as published.
+VANGUARD = (
+    '1 00005U 58002B   00179.78495062  .00000023  00000-0  28098-4 0  4753',
+    '2 00005  34.2682 348.7242 1859667 331.7664  19.3264 10.82419157413667')
+
+ISS = (
+    '1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927',
+    '2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537')
+
+
+@unittest.skipIf(tle is None, 'NumPy is required for odmpy.tle')
+class TestTle(unittest.TestCase):
+    def test_checksums(self):
+        lines = VANGUARD + ISS
+        expected = [int(line[-1]) for line in lines]
+        self.assertEqual(tle.checksums(lines).tolist(), expected)
+
+    def test_format_catalogue(self):
+        tles = tle.format_tle(
+            norad_cat_id=[5, 25544],
+            object_id=['1958-002B', '1998-067A'],
+            epoch=[datetime(2000, 1, 1) + timedelta(days=178.78495062),
+                   datetime(2008, 1, 1) + timedelta(days=263.51782528)],
+            mean_motion=[10.82419157, 15.72125391],
+            eccentricity=[0.1859667, 0.0006703],
+            inclination=[34.2682, 51.6416],
+            ra_of_asc_node=[348.7242, 247.4627],
+            arg_of_pericenter=[331.7664, 130.5360],
+            mean_anomaly=[19.3264, 325.0288],
+            bstar=[0.28098e-4, -0.11606e-4],
+            mean_motion_dot=[0.00000023, -0.00002182],
+            element_set_no=[475, 292],
+            rev_at_epoch=[41366, 56353])
+        self.assertEqual(tles, [VANGUARD, ISS])
+
+    def test_broadcast_scalars(self):
+        n = 3
+        tles = tle.format_tle(
+            norad_cat_id=np.arange(1, n + 1),
+            object_id='2010-026A',
+            epoch=np.datetime64('2014-11-12T13:14:15'),
+            mean_motion=15.5,
+            eccentricity=0.001,
+            inclination=51.6,
+            ra_of_asc_node=10,
+            arg_of_pericenter=20,
+            mean_anomaly=30)
+        self.assertEqual(len(tles), n)
+        for line1, line2 in tles:
+            self.assertEqual(len(line1), 69)
+            self.assertEqual(len(line2), 69)
+            self.assertEqual(line1[18:32], '14316.55156250')
+
+    def test_angle_wrap(self):
+        # Angles that round up to 360 are written as 0, and negative angles
+        # are wrapped.
+        (_, line2), = tle.format_tle(
+            norad_cat_id=5, object_id='1958-002B',
+            epoch=datetime(2000, 6, 27), mean_motion=10.8,
+            eccentricity=0.18, inclination=34.2, ra_of_asc_node=359.99999,
+            arg_of_pericenter=-0.00001, mean_anomaly=-10)
+        self.assertEqual(line2[17:25], '  0.0000')
+        self.assertEqual(line2[34:42], '  0.0000')
+        self.assertEqual(line2[43:51], '350.0000')
+
+    def test_epoch_rounding(self):
+        tles = tle.format_tle(
+            norad_cat_id=5, object_id='1958-002B',
+            epoch=[datetime(2001, 12, 31, 23, 59, 59, 999999),
+                   datetime(2000, 12, 31, 23, 59, 59, 999999),
+                   datetime(2001, 12, 31, 23, 59, 59, 999000)],
+            mean_motion=10.8, eccentricity=0.18, inclination=34.2,
+            ra_of_asc_node=348.7, arg_of_pericenter=331.7, mean_anomaly=19.3)
+        self.assertEqual([line1[18:32] for line1, _ in tles],
+                         ['02001.00000000', '01001.00000000',
+                          '01365.99999999'])
+
+    def test_exponent_fields(self):
+        negative, mantissa, negative_exp, exp = tle._exponent_fields(
+            [0, 0.28098e-4, -0.11606e-4, 0.9999996, 1e-12])
+        self.assertEqual(negative.tolist(), [False, False, True, False, False])
+        self.assertEqual(mantissa.tolist(), [0, 28098, 11606, 10000, 0])
+        self.assertEqual(negative_exp.tolist(), [True, True, True, False, True])
+        self.assertEqual(exp.tolist(), [0, 4, 4, 1, 0])
+
+    def test_invalid_values(self):
+        elements = dict(
+            norad_cat_id=5, object_id='1958-002B',
+            epoch=datetime(2000, 6, 27), mean_motion=10.8,
+            eccentricity=0.18, inclination=34.2, ra_of_asc_node=348.7,
+            arg_of_pericenter=331.7, mean_anomaly=19.3)
+
+        with self.assertRaises(ValueError):
+            tle.format_tle(**dict(elements, norad_cat_id=100000))
+
+        with self.assertRaises(ValueError):
+            tle.format_tle(**dict(elements, eccentricity=1.5))
+
+        with self.assertRaises(ValueError):
+            tle.format_tle(**dict(elements, bstar=1e20))
+
+        # Values that round up out of their field are reported by name.
+        for keyword, value in [('eccentricity', 0.99999999),
+                               ('mean_motion_dot', -0.999999999),
+                               ('mean_motion', 99.999999999)]:
+            with self.subTest(keyword=keyword):
+                with self.assertRaisesRegex(ValueError, keyword.upper()):
+                    tle.format_tle(**dict(elements, **{keyword: value}))
+
+    def test_write(self):
+        fp = StringIO()
+        tle.write(
+            fp, object_name='VANGUARD 1',
+            norad_cat_id=5, object_id='1958-002B',
+            epoch=datetime(2000, 1, 1) + timedelta(days=178.78495062),
+            mean_motion=10.82419157, eccentricity=0.1859667,
+            inclination=34.2682, ra_of_asc_node=348.7242,
+            arg_of_pericenter=331.7664, mean_anomaly=19.3264,
+            bstar=0.28098e-4, mean_motion_dot=0.00000023,
+            element_set_no=475, rev_at_epoch=41366)
+        self.assertEqual(fp.getvalue().splitlines(),
+                         ['VANGUARD 1'] + list(VANGUARD))
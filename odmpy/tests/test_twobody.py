@@ -0,0 +1,183 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import odmpy.opm as opm
+
+try:
+    import numpy as np
+    import odmpy.twobody as twobody
+except ImportError:
+    twobody = None
+
+GM = 398600.4418
+
+
+def state(a, e, nu, gm=GM):
+    """Position and velocity in the orbital plane, pericenter along X."""
+    p = a * (1 - e * e)
+    radius = p / (1 + e * np.cos(nu))
+    return ([radius * np.cos(nu), radius * np.sin(nu), 0],
+            [-np.sqrt(gm / p) * np.sin(nu),
+             np.sqrt(gm / p) * (e + np.cos(nu)), 0])
+
+
+def true_anomaly_after(a, e, tof, gm=GM):
+    """True anomaly after `tof` seconds from pericenter."""
+    mean_anomaly = np.sqrt(gm / abs(a) ** 3) * tof
+    x = mean_anomaly if e < 1 else np.arcsinh(mean_anomaly / e)
+    for _ in range(50):
+        if e < 1:
+            x -= (x - e * np.sin(x) - mean_anomaly) / (1 - e * np.cos(x))
+        else:
+            x -= (e * np.sinh(x) - x - mean_anomaly) / (e * np.cosh(x) - 1)
+    if e < 1:
+        return 2 * np.arctan2(np.sqrt(1 + e) * np.sin(x / 2),
+                              np.sqrt(1 - e) * np.cos(x / 2))
+    return 2 * np.arctan(np.sqrt((e + 1) / (e - 1)) * np.tanh(x / 2))
+
+
+@unittest.skipIf(twobody is None, 'NumPy is required for odmpy.twobody')
+class TestPropagate(unittest.TestCase):
+    def test_kepler(self):
+        orbits = [(7000, 0), (7000, 0.1), (42164, 0.7), (26600, 0.95),
+                  (-20000, 1.5), (-7000, 3)]
+        tof = np.array([-86400, -600, 0, 60, 3600, 86400 * 3])
+
+        r0, v0 = zip(*(state(a, e, 0) for a, e in orbits))
+        r, v = twobody.propagate(r0, v0, GM, tof)
+        self.assertEqual(r.shape, (len(orbits), len(tof), 3))
+
+        for i, (a, e) in enumerate(orbits):
+            for j, t in enumerate(tof):
+                with self.subTest(a=a, e=e, tof=t):
+                    expected_r, expected_v = state(
+                        a, e, true_anomaly_after(a, e, t))
+                    np.testing.assert_allclose(r[i, j], expected_r,
+                                               rtol=1e-10, atol=1e-6)
+                    np.testing.assert_allclose(v[i, j], expected_v,
+                                               rtol=1e-10, atol=1e-9)
+
+    def test_parabolic(self):
+        # Barker's equation: tan(nu/2) + tan(nu/2)**3 / 3 = 2*sqrt(gm/p**3)*t
+        p = 14000
+        r0 = [p / 2, 0, 0]
+        v0 = [0, np.sqrt(2 * GM / (p / 2)), 0]
+        nu = np.radians(60)
+        w = np.tan(nu / 2)
+        tof = (w + w ** 3 / 3) / (2 * np.sqrt(GM / p ** 3))
+
+        r, v = twobody.propagate(r0, v0, GM, [tof])
+        radius = p / (1 + np.cos(nu))
+        np.testing.assert_allclose(
+            r[0, 0], [radius * np.cos(nu), radius * np.sin(nu), 0],
+            atol=1e-6)
+
+    def test_hyperbolic_backward(self):
+        # Escaping states, propagated back through pericenter and beyond.
+        orbits = [(-20000, 1.5), (-7000, 3), (-200000, 1.05), (-660000, 1.01)]
+        for a, e in orbits:
+            for t0 in [3600, 86400 * 3, 86400 * 30]:
+                r0, v0 = state(a, e, true_anomaly_after(a, e, t0))
+                tof = np.array([-t0 / 2, -t0, -2 * t0, -t0 - 86400 * 30])
+                r, v = twobody.propagate(r0, v0, GM, tof)
+                for j, t in enumerate(tof):
+                    with self.subTest(a=a, e=e, t0=t0, tof=t):
+                        expected_r, expected_v = state(
+                            a, e, true_anomaly_after(a, e, t0 + t))
+                        np.testing.assert_allclose(r[0, j], expected_r,
+                                                   rtol=1e-8, atol=1e-4)
+                        np.testing.assert_allclose(v[0, j], expected_v,
+                                                   rtol=1e-8, atol=1e-7)
+
+    def test_per_object_times(self):
+        r0, v0 = zip(state(7000, 0.1, 0), state(8000, 0.2, 1))
+        tof = [[0, 100], [200, 300]]
+        r, v = twobody.propagate(r0, v0, GM, tof)
+        r_single, _ = twobody.propagate(r0[1], v0[1], GM, [300])
+        np.testing.assert_allclose(r[1, 1], r_single[0, 0])
+        np.testing.assert_allclose(r[0, 0], r0[0])
+
+
+@unittest.skipIf(twobody is None, 'NumPy is required for odmpy.twobody')
+class TestFleet(unittest.TestCase):
+    def setUp(self):
+        self.epoch = datetime(2011, 2, 24, 1, 2, 3)
+        header = opm.Header(originator='ESA')
+        metadata = opm.Metadata(
+            object_name='Dragon',
+            object_id='2010-026A',
+            center_name='EARTH',
+            ref_frame=opm.RefFrame.GCRF,
+            time_system=opm.TimeSystem.UTC)
+
+        self.fleet = []
+        for i, (a, e) in enumerate([(7000, 0.01), (8000, 0.1), (9000, 0.2)]):
+            r, v = state(a, e, 0)
+            state_vector = opm.DataBlockStateVector(
+                self.epoch + timedelta(minutes=i), *(r + v))
+            keplerian_elements = opm.DataBlockKeplerianElements(
+                a, e, 0, 0, 0, GM, true_anomaly=0)
+            self.fleet.append(opm.Opm(header, metadata, opm.Data(
+                state_vector=state_vector,
+                keplerian_elements=keplerian_elements)))
+
+        self.epochs = [self.epoch + timedelta(minutes=m)
+                       for m in range(0, 121, 10)]
+
+    def test_ephemeris(self):
+        epochs, states = twobody.ephemeris(self.fleet, self.epochs)
+        self.assertEqual(states.shape, (3, len(self.epochs), 6))
+
+        # Each object starts at pericenter at its own state vector epoch.
+        np.testing.assert_allclose(states[0, 0, :3], [6930, 0, 0])
+        a, e = 8000, 0.1
+        expected_r, expected_v = state(a, e, true_anomaly_after(a, e, -60))
+        np.testing.assert_allclose(states[1, 0, :3], expected_r, atol=1e-6)
+        np.testing.assert_allclose(states[1, 0, 3:], expected_v, atol=1e-9)
+
+    def test_workers(self):
+        _, expected = twobody.ephemeris(self.fleet, self.epochs)
+        results = list(twobody.iter_ephemeris(
+            self.fleet, self.epochs, workers=2, chunk_size=len(self.epochs)))
+        self.assertEqual([o for o, _ in results], self.fleet)
+        np.testing.assert_allclose(np.stack([s for _, s in results]),
+                                   expected)
+
+    def test_workers_bounded(self):
+        calls = []
+        propagate = twobody.propagate
+
+        def counting_propagate(*args, **kwargs):
+            calls.append(None)
+            return propagate(*args, **kwargs)
+
+        fleet = self.fleet * 10
+        with patch.object(twobody, 'propagate', counting_propagate):
+            results = twobody.iter_ephemeris(
+                fleet, self.epochs, workers=2, chunk_size=len(self.epochs))
+            next(results)
+            time.sleep(0.1)
+            # The chunk being consumed, and at most 2 * workers ahead.
+            self.assertLessEqual(len(calls), 5)
+            self.assertEqual(len(list(results)), len(fleet) - 1)
+        self.assertEqual(len(calls), len(fleet))
+
+    def test_gm_required(self):
+        self.fleet[1].data.keplerian_elements = None
+        with self.assertRaises(ValueError):
+            twobody.ephemeris(self.fleet, self.epochs)
+        twobody.ephemeris(self.fleet, self.epochs, gm=GM)
+
+    def test_write_oem(self):
+        fp = StringIO()
+        twobody.write_oem(fp, self.fleet, self.epochs, originator='ESA')
+        output = fp.getvalue()
+        self.assertTrue(output.startswith('CCSDS_OEM_VERS = 2.0\n'))
+        self.assertEqual(output.count('META_START'), 3)
+        self.assertIn('START_TIME           = 2011-02-24T01:02:03\n', output)
+        self.assertIn('STOP_TIME            = 2011-02-24T03:02:03\n', output)
+        self.assertIn('\n2011-02-24T01:02:03.000000  6.930000000000000e+03 ',
+                      output)
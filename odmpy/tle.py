@@ -0,0 +1,289 @@
+"""
+Module for exporting mean elements as NORAD two-line element sets (TLEs).
+
+Element sets are passed in as arrays named after the corresponding OMM
+keywords from the Orbit Data Message Recommended Standard CCSDS 502.0-B-2,
+so that a whole catalogue can be converted in one call. Each numeric field is
+prepared for the whole catalogue at once with NumPy, and the mod-10
+checksums are computed over a single byte buffer.
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.tle as tle
+"""
+import numpy as np
+
+from odmpy._arrays import datetime64
+
+__all__ = [
+    'checksums',
+    'format_tle',
+    'write',
+]
+
+_LINE_LENGTH = 68  # Not including checksum.
+
+_ASCII_ZERO = ord('0')
+_ASCII_NINE = ord('9')
+_ASCII_MINUS = ord('-')
+_ASCII_SPACE = ord(' ')
+
+# Resolution of the epoch day-of-year field, 1e-8 day [us].
+_EPOCH_RESOLUTION = 864
+
+# Line templates with the fixed characters in place and a placeholder for
+# the checksum, followed by a newline.
+_TEMPLATE1 = b'1' + b' ' * 67 + b'0\n'
+_TEMPLATE2 = b'2' + b' ' * 67 + b'0\n'
+
+
+def checksums(lines):
+    """Return an array of TLE mod-10 checksums for `lines`.
+
+    Only the first 68 characters of each line are used, so lines may be
+    passed with or without an existing checksum digit. Digits count as their
+    value, minus signs count as one, and everything else counts as zero.
+    """
+    buf = ''.join(line[:_LINE_LENGTH] for line in lines).encode('ascii')
+    chars = np.frombuffer(buf, dtype=np.uint8).reshape(-1, _LINE_LENGTH)
+    return _checksums(chars)
+
+
+def _checksums(chars):
+    """Mod-10 checksum of each row of a (N, 68) uint8 character array."""
+    is_digit = (chars >= _ASCII_ZERO) & (chars <= _ASCII_NINE)
+    values = np.where(is_digit, chars - _ASCII_ZERO, chars == _ASCII_MINUS)
+    return values.sum(axis=1, dtype=np.int32) % 10
+
+
+def _exponent_fields(values):
+    """Split values into TLE 'assumed decimal point' exponent fields.
+
+    A value is written as +/-0.nnnnn * 10^(+/-e), e.g. ``-11606-4`` for
+    -0.11606e-4. Returns arrays of whether the value is negative, the
+    mantissa digits, whether the exponent is negative, and the exponent
+    magnitude.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.abs(values)
+    nonzero = magnitude > 0
+
+    exponent = np.zeros(values.shape, dtype=np.int64)
+    with np.errstate(divide='ignore'):
+        exponent[nonzero] = np.floor(np.log10(magnitude[nonzero])) + 1
+
+    mantissa = np.rint(magnitude * 10.0 ** (5 - exponent)).astype(np.int64)
+
+    # Rounding can carry into a sixth digit (0.999999 -> 100000).
+    carry = mantissa >= 100000
+    mantissa[carry] //= 10
+    exponent[carry] += 1
+
+    # Values too small to show are written as zero, which by convention is
+    # 00000-0.
+    underflow = (mantissa == 0) | (exponent < -9)
+    mantissa[underflow] = 0
+    exponent[underflow] = 0
+
+    if np.any(exponent > 9):
+        raise ValueError('value cannot be represented in TLE exponent '
+                         'notation.')
+
+    negative = (values < 0) & ~underflow
+    negative_exponent = (exponent < 0) | underflow
+    return negative, mantissa, negative_exponent, np.abs(exponent)
+
+
+def _epoch_fields(epoch):
+    """Return two-digit year and fractional day-of-year arrays.
+
+    Epochs are rounded to the 1e-8 day resolution of the TLE field before
+    the year is split off, so that an epoch just before midnight on 31
+    December rolls over into day 1 of the next year.
+    """
+    epoch = datetime64(epoch).astype(np.int64)
+    epoch = ((epoch + _EPOCH_RESOLUTION // 2) // _EPOCH_RESOLUTION *
+             _EPOCH_RESOLUTION).astype('datetime64[us]')
+    year_start = epoch.astype('datetime64[Y]')
+    year = year_start.astype(np.int64) + 1970
+    elapsed = (epoch - year_start).astype(np.int64) // _EPOCH_RESOLUTION
+    day_of_year = elapsed / 1e8 + 1
+    return year % 100, day_of_year
+
+
+def _put_text(chars, start, width, values):
+    """Write left-aligned ASCII text into columns of the character array."""
+    text = np.asarray(values, dtype='S%d' % width)
+    text = np.ascontiguousarray(np.broadcast_to(text, len(chars)))
+    text = text.view(np.uint8).reshape(-1, width)
+    chars[:, start:start + width] = np.where(text == 0, _ASCII_SPACE, text)
+
+
+def _put_integer(chars, start, width, values, zero_pad=True):
+    """Write right-aligned integers into columns of the character array.
+
+    Equivalent to '%0{width}d' or '%{width}d' formatting, one column at a
+    time for the whole catalogue.
+    """
+    values = np.array(values, dtype=np.int64)
+    for column in range(start + width - 1, start - 1, -1):
+        chars[:, column] = values % 10 + _ASCII_ZERO
+        values //= 10
+    if np.any(values):
+        raise ValueError('element value too wide for its TLE field.')
+    if not zero_pad:
+        leading = np.ones(len(chars), dtype=bool)
+        for column in range(start, start + width - 1):
+            leading &= chars[:, column] == _ASCII_ZERO
+            chars[leading, column] = _ASCII_SPACE
+
+
+def _put_fixed(chars, start, int_width, frac_width, values, zero_pad=False,
+               modulus=None):
+    """Write non-negative fixed-point numbers, like '%{w}.{p}f'.
+
+    Angles are wrapped into [0, `modulus`) after rounding, so that values
+    just below `modulus` do not round up to it.
+    """
+    scale = 10 ** frac_width
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * scale)
+    if modulus is not None:
+        scaled %= modulus * scale
+    if np.any(scaled < 0):
+        raise ValueError('element value must not be negative.')
+    scaled = scaled.astype(np.int64)
+    _put_integer(chars, start, int_width, scaled // scale, zero_pad=zero_pad)
+    chars[:, start + int_width] = ord('.')
+    _put_integer(chars, start + int_width + 1, frac_width, scaled % scale)
+
+
+def format_tle(norad_cat_id, object_id, epoch, mean_motion, eccentricity,
+               inclination, ra_of_asc_node, arg_of_pericenter, mean_anomaly,
+               bstar=0, mean_motion_dot=0, mean_motion_ddot=0,
+               classification_type='U', ephemeris_type=0,
+               element_set_no=999, rev_at_epoch=0):
+    """Format element arrays as a list of TLE line pairs.
+
+    Each parameter is a scalar or an array-like of equal length. Scalars
+    are broadcast across the catalogue.
+
+    :param norad_cat_id: NORAD catalogue number (at most 99999).
+    :param object_id: International designator, e.g. '1998-067A'.
+    :param epoch: Epoch of mean elements, as :py:class:`~datetime.datetime`
+        objects or a ``numpy.datetime64`` array.
+    :param mean_motion: Mean motion [rev/day].
+    :param eccentricity: Eccentricity [--].
+    :param inclination: Inclination [deg].
+    :param ra_of_asc_node: Right ascension of the ascending node [deg].
+    :param arg_of_pericenter: Argument of pericenter [deg].
+    :param mean_anomaly: Mean anomaly [deg].
+    :param bstar: Drag term [1/ER].
+    :param mean_motion_dot: First time derivative of mean motion divided by
+        two, as carried by OMM and TLE [rev/day**2].
+    :param mean_motion_ddot: Second time derivative of mean motion divided
+        by six, as carried by OMM and TLE [rev/day**3].
+    :param classification_type: 'U', 'C', or 'S'.
+    :param ephemeris_type: Ephemeris type, normally 0.
+    :param element_set_no: Element set number.
+    :param rev_at_epoch: Revolution number at epoch.
+    :return: list of (line1, line2) tuples.
+    :raises ValueError: if a value does not fit its TLE field.
+    """
+    (norad_cat_id, object_id, epoch, mean_motion, eccentricity, inclination,
+     ra_of_asc_node, arg_of_pericenter, mean_anomaly, bstar, mean_motion_dot,
+     mean_motion_ddot, classification_type, ephemeris_type, element_set_no,
+     rev_at_epoch) = (np.atleast_1d(a) for a in np.broadcast_arrays(
+        norad_cat_id, np.asarray(object_id, dtype='S11'), epoch, mean_motion,
+        eccentricity, inclination, ra_of_asc_node, arg_of_pericenter,
+        mean_anomaly, bstar, mean_motion_dot, mean_motion_ddot,
+        np.asarray(classification_type, dtype='S1'), ephemeris_type,
+        element_set_no, rev_at_epoch))
+
+    n = len(object_id)
+
+    # Range checks are made on the rounded values, so that a value which
+    # rounds up to the next power of ten is reported by name.
+    if np.any((eccentricity < 0) | (np.rint(eccentricity * 1e7) >= 1e7)):
+        raise ValueError('ECCENTRICITY must be in the range [0, 1) when '
+                         'rounded to 7 decimal places.')
+
+    if np.any(np.rint(np.abs(mean_motion_dot) * 1e8) >= 1e8):
+        raise ValueError('MEAN_MOTION_DOT must have magnitude less than 1 '
+                         'when rounded to 8 decimal places.')
+
+    if np.any((mean_motion < 0) | (np.rint(mean_motion * 1e8) >= 100e8)):
+        raise ValueError('MEAN_MOTION must be in the range [0, 100) when '
+                         'rounded to 8 decimal places.')
+
+    if np.any((inclination < 0) | (inclination > 180)):
+        raise ValueError('INCLINATION must be in the range [0, 180].')
+
+    # Fixed columns (spaces, line numbers, decimal points) are common to
+    # every line, so start each line from a template.
+    chars = np.empty((2 * n, _LINE_LENGTH + 2), dtype=np.uint8)
+    chars[:n] = np.frombuffer(_TEMPLATE1, dtype=np.uint8)
+    chars[n:] = np.frombuffer(_TEMPLATE2, dtype=np.uint8)
+    line1 = chars[:n]
+    line2 = chars[n:]
+
+    # OBJECT_ID 'YYYY-NNNPPP' becomes 'YYNNNPPP'.
+    object_id = np.ascontiguousarray(object_id).view(np.uint8).reshape(n, 11)
+    designator = np.concatenate((object_id[:, 2:4], object_id[:, 5:]),
+                                axis=1)
+    line1[:, 9:17] = np.where(designator == 0, _ASCII_SPACE, designator)
+
+    year, day_of_year = _epoch_fields(epoch)
+
+    _put_integer(line1, 2, 5, norad_cat_id)
+    _put_text(line1, 7, 1, classification_type)
+    _put_integer(line1, 18, 2, year)
+    _put_fixed(line1, 20, 3, 8, day_of_year, zero_pad=True)
+
+    line1[:, 33] = np.where(mean_motion_dot < 0, _ASCII_MINUS, _ASCII_SPACE)
+    line1[:, 34] = ord('.')
+    _put_integer(line1, 35, 8, np.rint(np.abs(mean_motion_dot) * 1e8))
+
+    for start, values in ((44, mean_motion_ddot), (53, bstar)):
+        sign, mantissa, exponent_sign, exponent = _exponent_fields(values)
+        line1[:, start] = np.where(sign, _ASCII_MINUS, _ASCII_SPACE)
+        _put_integer(line1, start + 1, 5, mantissa)
+        line1[:, start + 6] = np.where(exponent_sign, _ASCII_MINUS,
+                                       ord('+'))
+        _put_integer(line1, start + 7, 1, exponent)
+
+    _put_integer(line1, 62, 1, ephemeris_type)
+    _put_integer(line1, 64, 4, element_set_no % 10000, zero_pad=False)
+
+    _put_integer(line2, 2, 5, norad_cat_id)
+    _put_fixed(line2, 8, 3, 4, inclination)
+    _put_fixed(line2, 17, 3, 4, ra_of_asc_node, modulus=360)
+    _put_integer(line2, 26, 7, np.rint(eccentricity * 1e7))
+    _put_fixed(line2, 34, 3, 4, arg_of_pericenter, modulus=360)
+    _put_fixed(line2, 43, 3, 4, mean_anomaly, modulus=360)
+    _put_fixed(line2, 52, 2, 8, mean_motion)
+    _put_integer(line2, 63, 5, rev_at_epoch % 100000, zero_pad=False)
+
+    chars[:, _LINE_LENGTH] = _checksums(chars[:, :_LINE_LENGTH]) + _ASCII_ZERO
+
+    # Decode the whole catalogue at once rather than line by line.
+    lines = chars.tobytes().decode('ascii').splitlines()
+    return list(zip(lines[:n], lines[n:]))
+
+
+def write(fp, object_name=None, **elements):
+    """Write TLEs to `fp` (a ``.write()``-supporting
+    :py:term:`file-like object`).
+
+    `elements` are passed to :py:func:`format_tle`. If `object_name` is
+    given, three-line element sets are written with the name on line 0.
+    """
+    tles = format_tle(**elements)
+    if object_name is None:
+        for line1, line2 in tles:
+            fp.write('{}\n{}\n'.format(line1, line2))
+    else:
+        names = np.broadcast_to(np.asarray(object_name, dtype=object),
+                                len(tles))
+        for name, (line1, line2) in zip(names, tles):
+            fp.write('{}\n{}\n{}\n'.format(name, line1, line2))
@@ -0,0 +1,418 @@
+"""
+Module for two-body propagation of OPM state vectors in bulk.
+
+Elliptic orbits are propagated by solving Kepler's equation for the
+eccentric anomaly. Hyperbolic and near-parabolic orbits use a
+universal-variable formulation instead, with a bracketed solver. Every
+object is propagated to every requested time in one set of array
+operations, and catalogues can be split across worker threads.
+
+Requires NumPy (pip install odmpy[numpy]).
+
+Recommended import syntax:
+import odmpy.twobody as twobody
+"""
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+import numpy as np
+
+from odmpy._arrays import datetime64, to_datetime
+from odmpy.oem import Header, Metadata, Writer
+
+__all__ = [
+    'ephemeris',
+    'iter_ephemeris',
+    'propagate',
+    'write_oem',
+]
+
+# Number of (object, time) pairs to propagate per chunk. Bounds the memory
+# used by temporaries, and is the unit of work given to each worker.
+CHUNK_SIZE = 1 << 16
+
+_FACTORIALS = [math.factorial(n) for n in range(21)]
+
+
+def _stumpff(z, kind):
+    """Stumpff functions C(z) and S(z).
+
+    `kind` is 'elliptic' when no z is negative, 'hyperbolic' when no z is
+    positive, and None for a mixture. Only the branches that can occur are
+    evaluated, with a series expansion for abs(z) <= 1, where the closed
+    forms lose precision to cancellation.
+    """
+    small = np.abs(z) <= 1
+    c = 0
+    s = 0
+    for k in range(8, -1, -1):
+        c = c * -z + 1 / _FACTORIALS[2 * k + 2]
+        s = s * -z + 1 / _FACTORIALS[2 * k + 3]
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        root = np.sqrt(np.abs(z))
+        if kind != 'hyperbolic':
+            elliptic = z > 1 if kind is None else ~small
+            c = np.where(elliptic, 2 * np.sin(root / 2) ** 2 / z, c)
+            s = np.where(elliptic, (root - np.sin(root)) / (z * root), s)
+        if kind != 'elliptic':
+            hyperbolic = z < -1 if kind is None else ~small
+            c = np.where(hyperbolic, 2 * np.sinh(root / 2) ** 2 / -z, c)
+            s = np.where(hyperbolic, (np.sinh(root) - root) / (-z * root), s)
+    return c, s
+
+
+def _laguerre_step(f, df, ddf):
+    """Laguerre-Conway correction, which converges from poor initial guesses
+    where Newton's method can diverge."""
+    n = 5
+    root = np.sqrt(np.abs((n - 1) ** 2 * df * df - n * (n - 1) * f * ddf))
+    return n * f / (df + np.copysign(root, df))
+
+
+def _converged(delta, x, tolerance):
+    return np.all(np.abs(delta) <= tolerance * np.maximum(1, np.abs(x)))
+
+
+def _not_converged(max_iterations):
+    return ValueError('Kepler\'s equation did not converge within {} '
+                      'iterations.'.format(max_iterations))
+
+
+def _lagrange_elliptic(r0_mag, sigma, alpha, sqrt_gm, t, tolerance,
+                       max_iterations):
+    """Lagrange coefficients for elliptic orbits.
+
+    Solves Kepler's equation for the change in eccentric anomaly, which
+    needs fewer operations than the universal formulation.
+    """
+    a = 1 / alpha
+    sqrt_a = np.sqrt(a)
+    mean_motion = sqrt_gm * alpha / sqrt_a
+    e_cos = 1 - r0_mag * alpha
+    e_sin = sigma / sqrt_a
+    mean_anomaly = mean_motion * t
+
+    x = mean_anomaly
+    for _ in range(max_iterations):
+        sin_x = np.sin(x)
+        cos_x = np.cos(x)
+        f = x - e_cos * sin_x + e_sin * (1 - cos_x) - mean_anomaly
+        df = 1 - e_cos * cos_x + e_sin * sin_x
+        ddf = e_cos * sin_x + e_sin * cos_x
+        delta = _laguerre_step(f, df, ddf)
+        x = x - delta
+        if _converged(delta, x, tolerance):
+            break
+    else:
+        raise _not_converged(max_iterations)
+
+    sin_x = np.sin(x)
+    one_minus_cos = 1 - np.cos(x)
+    r_mag = a * (1 - e_cos * (1 - one_minus_cos) + e_sin * sin_x)
+    return (1 - a / r0_mag * one_minus_cos,
+            t - (x - sin_x) / mean_motion,
+            -sqrt_gm * sqrt_a / (r_mag * r0_mag) * sin_x,
+            1 - a / r_mag * one_minus_cos)
+
+
+def _lagrange_universal(kind, r0_mag, sigma, alpha, sqrt_gm, t, p,
+                        tolerance, max_iterations):
+    """Lagrange coefficients from the universal Kepler equation, for
+    hyperbolic (`kind` 'hyperbolic') and near-parabolic (None) orbits. `p`
+    is the semi-latus rectum.
+
+    The derivative of the universal Kepler equation is the radius, so the
+    equation is increasing and the root is bracketed by 0 and
+    sqrt(GM) * t / r_p, where r_p is the periapsis radius. It is solved
+    with Newton's method, falling back to bisection where Newton steps
+    leave the bracket or converge slowly.
+    """
+    beta = 1 - alpha * r0_mag
+
+    eccentricity = np.sqrt(np.maximum(1 - alpha * p, 0))
+    periapsis = np.maximum(p / (1 + eccentricity), 1e-12 * r0_mag)
+    bound = sqrt_gm * t / periapsis
+    if kind == 'hyperbolic':
+        # The change in hyperbolic anomaly H is bound / sqrt(-a) at most,
+        # and the change in mean anomaly is at least
+        # 2 e sinh(H / 2) - H, which bounds H logarithmically.
+        sqrt_a = np.sqrt(-1 / alpha)
+        anomaly = np.abs(bound) / sqrt_a
+        mean_anomaly = np.abs(sqrt_gm * t) / sqrt_a ** 3
+        bound = np.copysign(np.minimum(
+            np.abs(bound), 1.01 * sqrt_a * 2 * np.arcsinh(
+                (mean_anomaly + anomaly) / (2 * eccentricity))), t)
+    lo = np.minimum(bound, 0)
+    hi = np.maximum(bound, 0)
+
+    # Initial guesses from Vallado, Fundamentals of Astrodynamics and
+    # Applications, algorithm 8: an asymptotic estimate for hyperbolic
+    # orbits moving away from periapsis, or the parabolic limit otherwise.
+    chi = sqrt_gm * t / r0_mag
+    if kind == 'hyperbolic':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sign = np.sign(t)
+            a = 1 / alpha
+            estimate = sign * np.sqrt(-a) * np.log(
+                -2 * sqrt_gm * sqrt_gm * alpha * t /
+                (sigma * sqrt_gm + sign * np.sqrt(-sqrt_gm * sqrt_gm * a) *
+                 beta))
+        chi = np.where(np.isfinite(estimate) & (sign * sigma >= 0),
+                       estimate, chi)
+    chi = np.clip(chi, lo, hi)
+
+    previous = hi - lo
+    done = np.zeros(chi.shape, dtype=bool)
+    for _ in range(max_iterations):
+        chi_sq = chi * chi
+        z = alpha * chi_sq
+        with np.errstate(over='ignore', invalid='ignore'):
+            c, s = _stumpff(z, kind)
+            terms = (sigma * chi_sq * c, beta * chi_sq * chi * s,
+                     r0_mag * chi, -sqrt_gm * t)
+            f = sum(terms)
+            df = sigma * chi * (1 - z * s) + beta * chi_sq * c + r0_mag
+            newton = f / df
+            # Near the root, where f is within the rounding error of the
+            # terms, which can be much larger than t, the anomaly cannot be
+            # resolved further.
+            scale = np.maximum(1, np.abs(chi))
+            near = np.minimum(np.abs(newton), hi - lo) <= (
+                np.sqrt(tolerance) * scale)
+            converged = (np.abs(newton) <= tolerance * scale) | near & (
+                np.abs(f) <= 4 * np.finfo(np.float64).eps * sum(
+                    np.abs(term) for term in terms))
+
+        # Large anomalies overflow, which is past the root.
+        below = (f < 0) | (np.isnan(f) & (chi < 0))
+        lo = np.where(below, chi, lo)
+        hi = np.where(below, hi, chi)
+        # Bisect where the Newton step leaves the bracket or does not halve
+        # the previous step, as where the equation is exponential.
+        step = chi - newton
+        step = np.where(converged | (
+            (lo <= step) & (step <= hi) & (2 * np.abs(newton) <= previous)),
+            step, (lo + hi) / 2)
+        # Converged anomalies are kept, so that rounding error in later
+        # iterations cannot move them.
+        step = np.where(done, chi, step)
+        previous = np.abs(chi - step)
+        chi = step
+        done |= converged
+        if np.all(done):
+            break
+    else:
+        raise _not_converged(max_iterations)
+
+    chi_sq = chi * chi
+    z = alpha * chi_sq
+    c, s = _stumpff(z, kind)
+    r_mag = sigma * chi * (1 - z * s) + beta * chi_sq * c + r0_mag
+    return (1 - chi_sq / r0_mag * c,
+            t - chi_sq * chi / sqrt_gm * s,
+            sqrt_gm / (r_mag * r0_mag) * chi * (z * s - 1),
+            1 - chi_sq / r_mag * c)
+
+
+def propagate(r, v, gm, tof, tolerance=1e-12, max_iterations=50):
+    """Propagate state vectors under two-body motion.
+
+    :param r: Positions [km], array of shape (N, 3).
+    :param v: Velocities [km/s], array of shape (N, 3).
+    :param gm: Gravitational coefficient [km**3/s**2], scalar or array of
+        shape (N,).
+    :param tof: Time of flight [s], either an array of shape (T,) applied to
+        every object or an array of shape (N, T).
+    :param float tolerance: Convergence tolerance on the anomaly, relative
+        to its magnitude.
+    :param int max_iterations: Maximum number of iterations.
+    :return: (r, v) arrays of shape (N, T, 3).
+    :raises ValueError: if Kepler's equation did not converge.
+    """
+    r0 = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v0 = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    n = len(r0)
+    gm = np.broadcast_to(np.asarray(gm, dtype=np.float64), n)[:, None]
+    t = np.asarray(tof, dtype=np.float64)
+    if t.ndim < 2:
+        t = np.broadcast_to(np.atleast_1d(t), (n, t.size))
+
+    r0_mag = np.sqrt(np.einsum('ij,ij->i', r0, r0))[:, None]
+    v0_sq = np.einsum('ij,ij->i', v0, v0)[:, None]
+    rv0 = np.einsum('ij,ij->i', r0, v0)[:, None]
+    sqrt_gm = np.sqrt(gm)
+
+    # Reciprocal of the semi-major axis; negative for hyperbolic orbits.
+    alpha = 2 / r0_mag - v0_sq / gm
+    sigma = rv0 / sqrt_gm
+    # Semi-latus rectum, from the angular momentum, which is more accurate
+    # than from the other quantities for near-radial motion.
+    h = np.cross(r0, v0)
+    p = np.einsum('ij,ij->i', h, h)[:, None] / gm
+
+    # Remove whole revolutions of elliptic orbits, so that the anomaly stays
+    # small and the iteration well conditioned.
+    elliptic = alpha > 1e-12
+    with np.errstate(invalid='ignore', divide='ignore'):
+        period = np.where(elliptic, 2 * np.pi / (sqrt_gm * alpha ** 1.5), 0)
+        revolutions = np.where(elliptic, np.round(t / period), 0)
+    t = t - period * revolutions
+
+    # Solve each kind of orbit separately, so that only the relevant
+    # branches are evaluated.
+    groups = (
+        (elliptic[:, 0], _lagrange_elliptic, ()),
+        (alpha[:, 0] < -1e-12, partial(_lagrange_universal, 'hyperbolic'),
+         (p,)),
+        (np.abs(alpha[:, 0]) <= 1e-12, partial(_lagrange_universal, None),
+         (p,)),
+    )
+    coefficients = [np.empty(t.shape) for _ in range(4)]
+    for members, solve, extra in groups:
+        args = (r0_mag, sigma, alpha, sqrt_gm, t) + extra
+        if members.all():
+            coefficients = solve(*args, tolerance, max_iterations)
+            break
+        if members.any():
+            results = solve(*[arg[members] for arg in args], tolerance,
+                            max_iterations)
+            for coefficient, result in zip(coefficients, results):
+                coefficient[members] = result
+
+    lagrange_f, lagrange_g, lagrange_fdot, lagrange_gdot = (
+        coefficient[..., None] for coefficient in coefficients)
+    r0 = r0[:, None, :]
+    v0 = v0[:, None, :]
+    return (lagrange_f * r0 + lagrange_g * v0,
+            lagrange_fdot * r0 + lagrange_gdot * v0)
+
+
+def _initial_states(opms):
+    """Return epochs and states for the state vectors of `opms`."""
+    blocks = [o.data.state_vector.block for o in opms]
+    epochs = datetime64([block.epoch.value for block in blocks])
+    states = np.array([
+        [sv.x.value, sv.y.value, sv.z.value,
+         sv.x_dot.value, sv.y_dot.value, sv.z_dot.value]
+        for sv in blocks], dtype=np.float64).reshape(-1, 6)
+    return epochs, states
+
+
+def _gravity(opms, gm):
+    """Return GM for each of `opms`, from their keplerian elements blocks if
+    `gm` is None."""
+    if gm is None:
+        gm = []
+        for o in opms:
+            keplerian_elements = o.data.keplerian_elements.block
+            if keplerian_elements is None or keplerian_elements.gm.value is None:
+                raise ValueError('gm must be given for OPMs without a '
+                                 'keplerian elements block.')
+            gm.append(keplerian_elements.gm.value)
+    return np.broadcast_to(np.asarray(gm, dtype=np.float64), len(opms))
+
+
+def iter_ephemeris(opms, epochs, gm=None, workers=1, chunk_size=CHUNK_SIZE):
+    """Propagate a fleet of OPMs, yielding each ephemeris in turn.
+
+    Objects are propagated in chunks, so memory use is bounded no matter
+    how many OPMs or epochs there are. With more than one worker, chunks are
+    propagated concurrently on a thread pool, at most ``2 * workers`` ahead
+    of the consumer; NumPy releases the GIL during the array operations that
+    dominate the cost.
+
+    :param opms: Sequence of :py:class:`~odmpy.opm.Opm` objects.
+    :param epochs: :py:class:`~datetime.datetime` objects or a
+        ``numpy.datetime64`` array of shape (T,).
+    :param gm: Gravitational coefficient [km**3/s**2], scalar or one value
+        per OPM. Taken from each OPM's keplerian elements block by default.
+    :param int workers: Number of worker threads.
+    :param int chunk_size: Approximate number of (object, epoch) pairs per
+        chunk.
+    :return: Generator of (opm, states) tuples in the order of `opms`, where
+        `states` has shape (T, 6) and holds X, Y, Z [km] and X_DOT, Y_DOT,
+        Z_DOT [km/s] in the OPM's reference frame.
+    :raises ValueError: if `gm` is not given and an OPM has no GM.
+    """
+    opms = list(opms)
+    if not opms:
+        return
+
+    epochs = np.atleast_1d(datetime64(epochs))
+    initial_epochs, states = _initial_states(opms)
+    gm = _gravity(opms, gm)
+
+    per_chunk = max(1, int(chunk_size) // len(epochs))
+    chunks = [slice(start, start + per_chunk)
+              for start in range(0, len(opms), per_chunk)]
+
+    def run(chunk):
+        tof = ((epochs[None, :] - initial_epochs[chunk, None]) /
+               np.timedelta64(1, 's'))
+        r, v = propagate(states[chunk, :3], states[chunk, 3:], gm[chunk],
+                         tof)
+        return np.concatenate((r, v), axis=-1)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Results are yielded in order, and each chunk is only submitted
+            # when a result is taken, so a slow consumer does not let
+            # results accumulate.
+            pending = deque()
+            chunks = iter(chunks)
+            for chunk in islice(chunks, 2 * workers):
+                pending.append((chunk, executor.submit(run, chunk)))
+            while pending:
+                chunk, future = pending.popleft()
+                result = future.result()
+                following = next(chunks, None)
+                if following is not None:
+                    pending.append((following,
+                                    executor.submit(run, following)))
+                yield from zip(opms[chunk], result)
+    else:
+        for chunk in chunks:
+            yield from zip(opms[chunk], run(chunk))
+
+
+def ephemeris(opms, epochs, gm=None, workers=1):
+    """Propagate a fleet of OPMs to a common time grid.
+
+    :return: (epochs, states), where `epochs` is a ``datetime64[us]`` array
+        of shape (T,) and `states` has shape (N, T, 6), in the column order
+        of OEM ephemeris data lines.
+
+    See :py:func:`iter_ephemeris` for the parameters.
+    """
+    epochs = np.atleast_1d(datetime64(epochs))
+    states = np.empty((len(opms), len(epochs), 6))
+    for i, (_, result) in enumerate(iter_ephemeris(opms, epochs, gm=gm,
+                                                   workers=workers)):
+        states[i] = result
+    return epochs, states
+
+
+def write_oem(fp, opms, epochs, originator, gm=None, workers=1):
+    """Write a quick-look OEM for a fleet of OPMs.
+
+    Each OPM becomes one segment, with metadata taken from the OPM. Segments
+    are written as soon as they have been propagated.
+
+    :param fp: A ``.write()``-supporting :py:term:`file-like object`.
+    :param str originator: Creating agency or operator.
+
+    See :py:func:`iter_ephemeris` for the remaining parameters.
+    """
+    epochs = np.atleast_1d(datetime64(epochs))
+    start_time = to_datetime(epochs[0])
+    stop_time = to_datetime(epochs[-1])
+
+    writer = Writer(fp, Header(originator=originator))
+    for o, states in iter_ephemeris(opms, epochs, gm=gm, workers=workers):
+        metadata = Metadata.from_opm_metadata(o.metadata, start_time,
+                                              stop_time)
+        writer.write_segment(metadata, epochs, states)
@@ -62,6 +62,7 @@ setup(
     license=LICENSE,
     install_requires=requires,
     extras_require={
+        'numpy': ['numpy'],
         'test': ['pytest']
     }
 )
@@ -0,0 +1,633 @@
+from datetime import datetime
+from shovel import task
+import timeit
+
+
+def report(name, n, seconds):
+    print('{name}: {n} objects in {seconds:.3f} s ({per:.2f} us/object)'.format(
+        name=name, n=n, seconds=seconds, per=seconds / n * 1e6))
+
+
+@task
+def tle(n=50000, repeat=3):
+    """Time bulk TLE export of a random catalogue.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.tle
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    elements = dict(
+        norad_cat_id=np.arange(n) % 100000,
+        object_id=['{:04d}-{:03d}A'.format(1958 + i % 60, i % 1000)
+                   for i in range(n)],
+        epoch=np.datetime64('2014-11-12T13:14:15') +
+        rng.randint(0, 86400 * 365, n).astype('timedelta64[s]'),
+        mean_motion=rng.uniform(1, 16, n),
+        eccentricity=rng.uniform(0, 0.9, n),
+        inclination=rng.uniform(0, 180, n),
+        ra_of_asc_node=rng.uniform(0, 360, n),
+        arg_of_pericenter=rng.uniform(0, 360, n),
+        mean_anomaly=rng.uniform(0, 360, n),
+        bstar=rng.uniform(-1e-3, 1e-3, n),
+        mean_motion_dot=rng.uniform(-1e-4, 1e-4, n),
+        mean_motion_ddot=rng.uniform(-1e-8, 1e-8, n))
+
+    seconds = min(timeit.repeat(lambda: odmpy.tle.format_tle(**elements),
+                                number=1, repeat=int(repeat)))
+    report('format_tle', n, seconds)
+
+
+@task
+def sgp4(n=10000, steps=144, repeat=3):
+    """Time SGP4 propagation of a random catalogue over a day.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.sgp4
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    propagator = odmpy.sgp4.Propagator(
+        epoch=np.datetime64('2014-11-12T13:14:15'),
+        mean_motion=np.where(rng.rand(n) < 0.8, rng.uniform(11, 16, n),
+                             rng.uniform(0.9, 6, n)),
+        eccentricity=rng.uniform(0, 0.1, n),
+        inclination=rng.uniform(0, 180, n),
+        ra_of_asc_node=rng.uniform(0, 360, n),
+        arg_of_pericenter=rng.uniform(0, 360, n),
+        mean_anomaly=rng.uniform(0, 360, n),
+        bstar=rng.uniform(0, 1e-4, n))
+    tsince = np.linspace(0, 1440, int(steps))
+
+    seconds = min(timeit.repeat(lambda: propagator.propagate(tsince),
+                                number=1, repeat=int(repeat)))
+    report('sgp4 ({} steps)'.format(len(tsince)), n, seconds)
+
+
+@task
+def keplerian(n=50000, repeat=3):
+    """Time bulk Cartesian to Keplerian conversion.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.elements
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    direction = rng.normal(size=(n, 3))
+    direction /= np.linalg.norm(direction, axis=1)[:, None]
+    r = direction * rng.uniform(6700, 42000, n)[:, None]
+    v = np.cross(direction, rng.normal(size=(n, 3)))
+    v *= (np.sqrt(398600.4418 / np.linalg.norm(r, axis=1)) /
+          np.linalg.norm(v, axis=1))[:, None]
+
+    seconds = min(timeit.repeat(
+        lambda: odmpy.elements.cartesian_to_keplerian(r, v, 398600.4418),
+        number=1, repeat=int(repeat)))
+    report('cartesian_to_keplerian', n, seconds)
+
+
+@task
+def kepler(n=50000, repeat=3):
+    """Time bulk mean to true anomaly conversion.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.elements
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    mean_anomaly = rng.uniform(0, 360, n)
+    eccentricity = rng.uniform(0, 0.9, n)
+
+    seconds = min(timeit.repeat(
+        lambda: odmpy.elements.mean_to_true(mean_anomaly, eccentricity),
+        number=1, repeat=int(repeat)))
+    report('mean_to_true', n, seconds)
+
+
+@task
+def twobody(n=10000, step=60, workers=1):
+    """Time two-body propagation of a random fleet of OPMs over a day.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.opm as opm
+    import odmpy.twobody
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    epoch = datetime(2014, 11, 12, 13, 14, 15)
+    header = opm.Header(originator='ESA', creation_date=epoch)
+    metadata = opm.Metadata(
+        object_name='Dragon',
+        object_id='2010-026A',
+        center_name='EARTH',
+        ref_frame=opm.RefFrame.GCRF,
+        time_system=opm.TimeSystem.UTC)
+
+    direction = rng.normal(size=(n, 3))
+    direction /= np.linalg.norm(direction, axis=1)[:, None]
+    r = direction * rng.uniform(6700, 42000, n)[:, None]
+    v = np.cross(direction, rng.normal(size=(n, 3)))
+    v *= (np.sqrt(398600.4418 / np.linalg.norm(r, axis=1)) /
+          np.linalg.norm(v, axis=1))[:, None] * rng.uniform(0.9, 1.1, n)[:, None]
+    fleet = [opm.Opm(header, metadata, opm.Data(
+        state_vector=opm.DataBlockStateVector(epoch, *state)))
+        for state in np.hstack((r, v)).tolist()]
+
+    epochs = (np.datetime64(epoch) +
+              np.arange(0, 86400 + 1, int(step)).astype('timedelta64[s]'))
+
+    start = timeit.default_timer()
+    odmpy.twobody.ephemeris(fleet, epochs, gm=398600.4418,
+                            workers=int(workers))
+    seconds = timeit.default_timer() - start
+    report('twobody ({} epochs, {} workers)'.format(len(epochs), workers),
+           n, seconds)
+
+
+@task
+def covariance(n=50000, repeat=3):
+    """Time bulk conversion of 6x6 covariances to covariance matrix blocks.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.covariance
+    import odmpy.opm as opm
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    a = rng.normal(size=(n, 6, 6))
+    covariances = a @ a.transpose(0, 2, 1)
+
+    seconds = min(timeit.repeat(
+        lambda: odmpy.covariance.from_arrays(covariances),
+        number=1, repeat=int(repeat)))
+    report('covariance.from_arrays', n, seconds)
+
+    r = rng.normal(0, 7000, size=(n, 3))
+    v = rng.normal(0, 5, size=(n, 3))
+    seconds = min(timeit.repeat(
+        lambda: odmpy.covariance.rotate(covariances, r, v, opm.RefFrame.GCRF,
+                                        opm.RefFrame.RTN),
+        number=1, repeat=int(repeat)))
+    report('covariance.rotate', n, seconds)
+
+    header = opm.Header(originator='ESA')
+    metadata = opm.Metadata(
+        object_name='Dragon',
+        object_id='2010-026A',
+        center_name='EARTH',
+        ref_frame=opm.RefFrame.GCRF,
+        time_system=opm.TimeSystem.UTC)
+    fleet = [opm.Opm(header, metadata, opm.Data(
+        state_vector=opm.DataBlockStateVector(
+            datetime(2014, 11, 12), *state),
+        covariance_matrix=block))
+        for state, block in zip(np.hstack((r, v)).tolist(),
+                                odmpy.covariance.from_arrays(covariances))]
+    seconds = min(timeit.repeat(
+        lambda: odmpy.covariance.validate_covariances(fleet),
+        number=1, repeat=int(repeat)))
+    report('covariance.validate_covariances', n, seconds)
+
+
+@task
+def dispersion(n=10000):
+    """Time sampling and writing of dispersed OPMs.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import shutil
+    import tempfile
+
+    import numpy as np
+    import odmpy.dispersion
+    import odmpy.opm as opm
+
+    n = int(n)
+    header = opm.Header(originator='ESA')
+    metadata = opm.Metadata(
+        object_name='Dragon',
+        object_id='2010-026A',
+        center_name='EARTH',
+        ref_frame=opm.RefFrame.GCRF,
+        time_system=opm.TimeSystem.UTC)
+    parent = opm.Opm(header, metadata, opm.Data(
+        state_vector=opm.DataBlockStateVector(
+            datetime(2014, 11, 12), 6655.9942, -40218.5751, -82.9177,
+            3.11548208, 0.47042605, -0.00101495),
+        covariance_matrix=opm.DataBlockCovarianceMatrix.from_array(
+            np.diag([1.0, 4.0, 9.0, 1e-6, 1e-6, 1e-6]))))
+
+    start = timeit.default_timer()
+    samples = odmpy.dispersion.Dispersion.from_opm(parent, n, seed=0)
+    report('dispersion.from_opm', n, timeit.default_timer() - start)
+
+    directory = tempfile.mkdtemp()
+    try:
+        start = timeit.default_timer()
+        samples.write_files(directory)
+        report('dispersion.write_files', n, timeit.default_timer() - start)
+    finally:
+        shutil.rmtree(directory)
+
+
+@task
+def maneuver(n=10000, repeat=3):
+    """Time application of one RTN maneuver to each of a fleet of OPMs.
+
+    Requires numpy (pip install odmpy[numpy])
+    """
+    import numpy as np
+    import odmpy.maneuver
+    import odmpy.opm as opm
+
+    n = int(n)
+    rng = np.random.RandomState(0)
+    epoch = datetime(2014, 11, 12)
+    header = opm.Header(originator='ESA')
+    metadata = opm.Metadata(
+        object_name='Dragon',
+        object_id='2010-026A',
+        center_name='EARTH',
+        ref_frame=opm.RefFrame.GCRF,
+        time_system=opm.TimeSystem.UTC)
+    spacecraft = opm.DataBlockSpacecraftParameters(1000, 10, 2.2, 10, 1.3)
+    fleet = [opm.Opm(header, metadata, opm.Data(
+        state_vector=opm.DataBlockStateVector(
+            epoch, 7000, 0, 0, 0, 7.5, 0),
+        spacecraft_parameters=spacecraft,
+        maneuver_parameters=opm.DataBlockManeuverParameters(
+            epoch, 10, -1, opm.RefFrame.RTN, *dv)))
+        for dv in rng.normal(0, 0.01, size=(n, 3)).tolist()]
+
+    seconds = min(timeit.repeat(
+        lambda: odmpy.maneuver.apply_maneuvers(fleet),
+        number=1, repeat=int(repeat)))
+    report('maneuver.apply_maneuvers', n, seconds)
+
+
+@task
+def construction(n=10000, repeat=3):
+    """Time construction of OPMs one at a time and with Opm.from_records."""
+    import random
+
+    import odmpy.opm as opm
+
+    n = int(n)
+    epoch = datetime(2014, 11, 12)
+    header = dict(originator='ESA', creation_date=epoch)
+    metadata = dict(
+        object_name='Dragon',
+        object_id='2010-026A',
+        center_name='EARTH',
+        ref_frame=opm.RefFrame.GCRF,
+        time_system=opm.TimeSystem.UTC)
+    spacecraft = dict(mass=1000, solar_rad_area=10, solar_rad_coeff=2.2,
+                      drag_area=10, drag_coeff=1.3)
+    records = [(epoch,) + tuple(random.uniform(-7000, 7000)
+                                for _ in range(6))
+               for _ in range(n)]
+
+    def one_at_a_time():
+        for record in records:
+            o = opm.Opm(
+                opm.Header(**header), opm.Metadata(**metadata),
+                opm.Data(opm.DataBlockStateVector(*record),
+                         spacecraft_parameters=opm.
+                         DataBlockSpacecraftParameters(**spacecraft)))
+            o.data.state_vector.block.validate_keywords()
+            o.data.spacecraft_parameters.block.validate_keywords()
+
+    fields = ['state_vector.' + name for name in
+              ('epoch', 'x', 'y', 'z', 'x_dot', 'y_dot', 'z_dot')]
+    defaults = dict(header=header, metadata=metadata,
+                    spacecraft_parameters=spacecraft)
+
+    seconds = min(timeit.repeat(one_at_a_time, number=1, repeat=int(repeat)))
+    report('Opm', n, seconds)
+    seconds = min(timeit.repeat(
+        lambda: opm.Opm.from_records(records, fields, defaults=defaults),
+        number=1, repeat=int(repeat)))
+    report('Opm.from_records', n, seconds)
+
+
+@task
+def batch_write(n=2000):
+    """Time writing OPMs with a sync per file and with catalog.BatchWriter."""
+    import os
+    import shutil
+    import tempfile
+
+    import odmpy.catalog as catalog
+    import odmpy.opm as opm
+
+    n = int(n)
+    epoch = datetime(2014, 11, 12)
+    opms = opm.Opm.from_records(
+        [('{:04d}-{:03d}A'.format(1958 + i % 60, i % 1000), float(i))
+         for i in range(n)],
+        ['OBJECT_ID', 'X'],
+        defaults=dict(
+            header=dict(originator='ESA', creation_date=epoch),
+            metadata=dict(object_name='Dragon', object_id=None,
+                          center_name='EARTH', ref_frame=opm.RefFrame.GCRF,
+                          time_system=opm.TimeSystem.UTC),
+            state_vector=dict(epoch=epoch, x=None, y=0, z=0, x_dot=0,
+                              y_dot=7.5, z_dot=0)))
+
+    directory = tempfile.mkdtemp()
+    try:
+        start = timeit.default_timer()
+        for i, o in enumerate(opms):
+            path = os.path.join(directory, '{}.opm'.format(i))
+            with open(path + '.tmp', 'w') as fp:
+                o.write(fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(path + '.tmp', path)
+        report('fsync per file', n, timeit.default_timer() - start)
+
+        start = timeit.default_timer()
+        with catalog.BatchWriter(directory) as batch:
+            for i, o in enumerate(opms):
+                batch.add('{}.opm'.format(i), o.write)
+        report('catalog.BatchWriter', n, timeit.default_timer() - start)
+    finally:
+        shutil.rmtree(directory)
+
+
+@task
+def index(n=2000, lookups=1000):
+    """Time indexing an archive of OPM files and looking up the latest OPM."""
+    import os
+    import random
+    import shutil
+    import tempfile
+
+    import odmpy.catalog as catalog
+    import odmpy.opm as opm
+
+    n = int(n)
+    epoch = datetime(2014, 11, 12)
+    object_ids = ['{:04d}-{:03d}A'.format(1958 + i % 60, i % 1000)
+                  for i in range(n)]
+    opms = opm.Opm.from_records(
+        [(object_id, float(i)) for i, object_id in enumerate(object_ids)],
+        ['OBJECT_ID', 'X'],
+        defaults=dict(
+            header=dict(originator='ESA', creation_date=epoch),
+            metadata=dict(object_name='Dragon', object_id=None,
+                          center_name='EARTH', ref_frame=opm.RefFrame.GCRF,
+                          time_system=opm.TimeSystem.UTC),
+            state_vector=dict(epoch=epoch, x=None, y=0, z=0, x_dot=0,
+                              y_dot=7.5, z_dot=0)))
+
+    directory = tempfile.mkdtemp()
+    try:
+        catalog.regenerate(opms, directory, layout=catalog.HashLayout())
+        with catalog.Index() as archive:
+            start = timeit.default_timer()
+            archive.update(directory)
+            report('Index.update', n, timeit.default_timer() - start)
+
+            start = timeit.default_timer()
+            archive.update(directory)
+            report('Index.update (unchanged)', n,
+                   timeit.default_timer() - start)
+
+            lookups = int(lookups)
+            start = timeit.default_timer()
+            for object_id in random.sample(object_ids, lookups):
+                archive.latest(object_id)
+            report('Index.latest', lookups, timeit.default_timer() - start)
+    finally:
+        shutil.rmtree(directory)
+
+
+@task
+def scan(n=2000, workers=8):
+    """Time scanning a directory of OPM files for a few keywords, compared
+    with reading each file in full."""
+    import os
+    import shutil
+    import tempfile
+
+    import odmpy.catalog as catalog
+    import odmpy.kvn as kvn
+    import odmpy.opm as opm
+
+    n = int(n)
+    epoch = datetime(2014, 11, 12)
+    opms = opm.Opm.from_records(
+        [('{:04d}-{:03d}A'.format(1958 + i % 60, i % 1000), float(i))
+         for i in range(n)],
+        ['OBJECT_ID', 'X'],
+        defaults=dict(
+            header=dict(originator='ESA', creation_date=epoch),
+            metadata=dict(object_name='Dragon', object_id=None,
+                          center_name='EARTH', ref_frame=opm.RefFrame.GCRF,
+                          time_system=opm.TimeSystem.UTC),
+            state_vector=dict(epoch=epoch, x=None, y=0, z=0, x_dot=0,
+                              y_dot=7.5, z_dot=0)))
+
+    directory = tempfile.mkdtemp()
+    try:
+        catalog.regenerate(opms, directory, layout=catalog.HashLayout())
+
+        start = timeit.default_timer()
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if name.endswith('.opm'):
+                    with open(os.path.join(root, name)) as fp:
+                        kvn.load(fp)
+        report('kvn.load', n, timeit.default_timer() - start)
+
+        start = timeit.default_timer()
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if name.endswith('.opm'):
+                    kvn.scan(os.path.join(root, name))
+        report('kvn.scan', n, timeit.default_timer() - start)
+
+        start = timeit.default_timer()
+        list(kvn.scan_directory(directory, workers=int(workers)))
+        report('kvn.scan_directory', n, timeit.default_timer() - start)
+    finally:
+        shutil.rmtree(directory)
+
+
+@task
+def lazy(n=2000, repeat=3):
+    """Time reading OPMs with every data block, compared with lazy reading
+    of the metadata and state vector only."""
+    import os
+
+    import odmpy.kvn as kvn
+
+    n = int(n)
+    path = os.path.join(os.path.dirname(__file__), '..', 'odmpy', 'tests',
+                        'valid.opm.txt')
+    with open(path) as fp:
+        text = fp.read()
+
+    def eager():
+        for _ in range(n):
+            kvn.loads(text)
+
+    def lazy():
+        for _ in range(n):
+            opm_obj = kvn.loads(text, lazy=True)
+            opm_obj.metadata.object_id.value
+            opm_obj.data.state_vector.block.x.value
+
+    report('kvn.loads', n, min(timeit.repeat(eager, number=1,
+                                             repeat=int(repeat))))
+    report('kvn.loads (lazy)', n, min(timeit.repeat(lazy, number=1,
+                                                    repeat=int(repeat))))
+
+
+@task
+def disk_cache(n=2000, repeat=3):
+    """Time reading OPM files with a warm DiskCache, compared with parsing
+    them."""
+    import os
+    import shutil
+    import tempfile
+
+    import odmpy.cache as cache
+    import odmpy.kvn as kvn
+
+    n = int(n)
+    valid = os.path.join(os.path.dirname(__file__), '..', 'odmpy', 'tests',
+                         'valid.opm.txt')
+    directory = tempfile.mkdtemp()
+    try:
+        paths = [os.path.join(directory, '{}.opm'.format(i)) for i in range(n)]
+        for path in paths:
+            shutil.copy(valid, path)
+
+        def parse():
+            for path in paths:
+                with open(path) as fp:
+                    kvn.load(fp)
+
+        disk_cache = cache.DiskCache(os.path.join(directory, 'cache'))
+
+        def cached():
+            for path in paths:
+                disk_cache.load(path)
+
+        start = timeit.default_timer()
+        cached()
+        report('DiskCache.load (cold)', n, timeit.default_timer() - start)
+        report('kvn.load', n, min(timeit.repeat(parse, number=1,
+                                                repeat=int(repeat))))
+        report('DiskCache.load (warm)', n, min(timeit.repeat(
+            cached, number=1, repeat=int(repeat))))
+    finally:
+        shutil.rmtree(directory)
+
+
+@task
+def message_cache(n=20000, objects=1000, hot=100):
+    """Time serving requests for OPMs, mostly for a few hot objects, with a
+    MessageCache holding about `hot` OPMs."""
+    import os
+    import random
+
+    import odmpy.cache as cache
+    import odmpy.kvn as kvn
+
+    n = int(n)
+    objects = int(objects)
+    path = os.path.join(os.path.dirname(__file__), '..', 'odmpy', 'tests',
+                        'valid.opm.txt')
+    with open(path) as fp:
+        text = fp.read()
+    size = cache.estimate_size(kvn.loads(text))
+
+    rng = random.Random(0)
+    requests = [int(rng.paretovariate(1.2)) % objects for _ in range(n)]
+
+    start = timeit.default_timer()
+    for _ in requests:
+        kvn.loads(text)
+    report('kvn.loads', n, timeit.default_timer() - start)
+
+    message_cache = cache.MessageCache(max_size=int(hot) * size)
+    start = timeit.default_timer()
+    for key in requests:
+        message_cache.fetch(key, lambda: kvn.loads(text))
+    report('MessageCache.fetch', n, timeit.default_timer() - start)
+    print(message_cache.stats)
+
+
+@task
+def binary(n=2000, repeat=3):
+    """Time encoding and decoding OPMs in the binary format, compared with
+    writing and reading KVN."""
+    import io
+    import os
+
+    import odmpy.binary
+    import odmpy.kvn as kvn
+
+    n = int(n)
+    repeat = int(repeat)
+    path = os.path.join(os.path.dirname(__file__), '..', 'odmpy', 'tests',
+                        'valid.opm.txt')
+    with open(path) as fp:
+        opm_obj = kvn.load(fp)
+    text = ''.join(line + '\n' for line in opm_obj.output())
+    data = odmpy.binary.dumps(opm_obj)
+
+    def best(function):
+        return min(timeit.repeat(lambda: [function() for _ in range(n)],
+                                 number=1, repeat=repeat))
+
+    report('Opm.write', n, best(lambda: opm_obj.write(io.StringIO())))
+    report('kvn.loads', n, best(lambda: kvn.loads(text)))
+    report('binary.dumps', n, best(lambda: odmpy.binary.dumps(opm_obj)))
+    report('binary.loads', n, best(lambda: odmpy.binary.loads(data)))
+    print('KVN {} bytes, binary {} bytes'.format(len(text.encode('utf-8')),
+                                                 len(data)))
+
+
+@task
+def ndm(n=2000, repeat=3):
+    """Time writing an NDM/XML batch of OPMs, compared with writing KVN."""
+    import io
+    import os
+
+    import odmpy.kvn as kvn
+    import odmpy.ndm
+
+    n = int(n)
+    repeat = int(repeat)
+    path = os.path.join(os.path.dirname(__file__), '..', 'odmpy', 'tests',
+                        'valid.opm.txt')
+    with open(path) as fp:
+        opm_obj = kvn.load(fp)
+
+    def kvn_batch():
+        fp = io.StringIO()
+        for _ in range(n):
+            opm_obj.write(fp)
+
+    def ndm_batch():
+        odmpy.ndm.write_ndm(io.StringIO(), (opm_obj for _ in range(n)))
+
+    for name, function in [('Opm.write', kvn_batch),
+                           ('ndm.write_ndm', ndm_batch)]:
+        report(name, n, min(timeit.repeat(function, number=1, repeat=repeat)))